@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:01
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_member_counts(apps, schema_editor):
+    DistributionGroup = apps.get_model('groups', 'DistributionGroup')
+    GroupMember = apps.get_model('groups', 'GroupMember')
+    counts = GroupMember.objects.filter(group=OuterRef('pk')).order_by().values('group').annotate(
+        total=Count('id')
+    ).values('total')
+    DistributionGroup.objects.update(member_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='distributiongroup',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of members, updated as members are added and removed'),
+        ),
+        migrations.RunPython(fill_member_counts, migrations.RunPython.noop),
+    ]
@@ -3,9 +3,28 @@ Distribution Group models for Group Choice application.
 """
 import uuid
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.conf import settings
 
 
+class DistributionGroupQuerySet(models.QuerySet):
+    """QuerySet for DistributionGroup model."""
+
+    def reconcile_member_counts(self):
+        """Reset member_count where it disagrees with the members. Returns the number fixed."""
+        counts = GroupMember.objects.filter(group=OuterRef('pk')).order_by().values('group').annotate(
+            total=Count('id')
+        ).values('total')
+        actual = Coalesce(Subquery(counts), Value(0))
+        stale = self.annotate(actual=actual).exclude(member_count=F('actual'))
+        return DistributionGroup.objects.filter(pk__in=stale.values('pk')).update(member_count=actual)
+
+    def for_listing(self):
+        """Load only the columns DistributionGroupListSerializer renders."""
+        return self.only('id', 'name', 'description', 'member_count', 'created_at')
+
+
 class DistributionGroup(models.Model):
     """Distribution Group model for reusable survey distribution lists."""
 
@@ -19,9 +38,20 @@ class DistributionGroup(models.Model):
         related_name='owned_distribution_groups'
     )
 
+    member_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text='Number of members, updated as members are added and removed'
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = DistributionGroupQuerySet.as_manager()
+
+    # Updated in place with F() expressions; save() never writes them back
+    COUNTER_FIELDS = ['member_count']
+
     class Meta:
         db_table = 'distribution_groups'
         ordering = ['name']
@@ -30,10 +60,29 @@ class DistributionGroup(models.Model):
     def __str__(self):
         return f"{self.name} ({self.owner.username})"
 
-    @property
-    def member_count(self):
-        """Return the count of members in this group."""
-        return self.members.count()
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # A stale in-memory counter must not overwrite newer members
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        from apps.surveys.models import SurveyAudience
+
+        # The group's surveys outlive it, but its members stop seeing them
+        SurveyAudience.remove_members(self.pk)
+        return super().delete(*args, **kwargs)
+
+    def adjust_member_count(self, delta):
+        """Add `delta` to the stored member count, here and in the database."""
+        if delta:
+            DistributionGroup.objects.filter(pk=self.pk).update(
+                member_count=Greatest(F('member_count') + delta, 0)
+            )
+            self.member_count = max(self.member_count + delta, 0)
 
     def add_member(self, email, user=None):
         """Add a member to the group by email."""
@@ -47,9 +96,69 @@ class DistributionGroup(models.Model):
             member.save()
         return member
 
+    def add_members(self, emails, chunk_size=1000):
+        """
+        Add many members to the group by email.
+
+        Emails are normalized and deduplicated in memory, then handled in
+        chunks: one query finds existing members, one links registered
+        users, one bulk insert adds the rest and one more finds which rows
+        it actually inserted. Returns the new members.
+        """
+        added = []
+        seen = set()
+        chunk = []
+        for email in emails:
+            email = email.strip().lower()
+            if not email or email in seen:
+                continue
+            seen.add(email)
+            chunk.append(email)
+            if len(chunk) >= chunk_size:
+                added.extend(self._add_member_chunk(chunk))
+                chunk = []
+        if chunk:
+            added.extend(self._add_member_chunk(chunk))
+        return added
+
+    def _add_member_chunk(self, emails):
+        from apps.users.models import User
+
+        existing = set(self.members.filter(email__in=emails).values_list('email', flat=True))
+        emails = [email for email in emails if email not in existing]
+        if not emails:
+            return []
+        user_ids = dict(User.objects.filter(email__in=emails).values_list('email', 'id'))
+        members = [
+            GroupMember(group=self, email=email, user_id=user_ids.get(email))
+            for email in emails
+        ]
+        # A concurrent import may have added some of these since the check above;
+        # ids are generated here, so re-selecting them finds the rows actually inserted
+        GroupMember.objects.bulk_create(members, ignore_conflicts=True)
+        inserted = set(GroupMember.objects.filter(
+            pk__in=[member.pk for member in members]
+        ).values_list('pk', flat=True))
+        members = [member for member in members if member.pk in inserted]
+        if not members:
+            return []
+        self.adjust_member_count(len(members))
+
+        from apps.surveys.models import SurveyAudience
+        SurveyAudience.add_members(self.pk, [member.user_id for member in members if member.user_id])
+        return members
+
     def remove_member(self, email):
-        """Remove a member from the group by email."""
-        self.members.filter(email=email.lower()).delete()
+        """Remove a member from the group by email. Returns the number removed."""
+        from apps.surveys.models import SurveyAudience
+
+        members = self.members.filter(email=email.lower())
+        user_ids = [user_id for user_id in members.values_list('user_id', flat=True) if user_id]
+        deleted, _ = members.delete()
+        self.adjust_member_count(-deleted)
+        if user_ids:
+            SurveyAudience.remove_members(self.pk, user_ids)
+        return deleted
 
 
 class GroupMember(models.Model):
@@ -99,4 +208,18 @@ class GroupMember(models.Model):
             except User.DoesNotExist:
                 pass
 
+        adding = self._state.adding
         super().save(*args, **kwargs)
+        if adding:
+            self.group.adjust_member_count(1)
+        if self.user_id:
+            from apps.surveys.models import SurveyAudience
+            SurveyAudience.add_members(self.group_id, [self.user_id])
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.group.adjust_member_count(-1)
+        if self.user_id:
+            from apps.surveys.models import SurveyAudience
+            SurveyAudience.remove_members(self.group_id, [self.user_id])
+        return result
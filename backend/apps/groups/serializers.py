@@ -64,7 +64,6 @@ class GroupMemberCreateSerializer(serializers.Serializer):
 class DistributionGroupSerializer(serializers.ModelSerializer):
     """Serializer for DistributionGroup model."""
 
-    members = GroupMemberSerializer(many=True, read_only=True)
     member_count = serializers.ReadOnlyField()
     owner_name = serializers.SerializerMethodField()
 
@@ -72,7 +71,7 @@ class DistributionGroupSerializer(serializers.ModelSerializer):
         model = DistributionGroup
         fields = [
             'id', 'name', 'description', 'owner', 'owner_name',
-            'members', 'member_count', 'created_at', 'updated_at'
+            'member_count', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'owner', 'created_at', 'updated_at']
 
@@ -111,8 +110,7 @@ class DistributionGroupCreateSerializer(serializers.ModelSerializer):
         group = DistributionGroup.objects.create(**validated_data)
 
         # Add members
-        for email in member_emails:
-            group.add_member(email)
+        group.add_members(member_emails)
 
         return group
 
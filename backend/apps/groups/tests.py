@@ -1,6 +1,7 @@
 """
 Tests for the groups app.
 """
+from unittest import mock
 from django.test import TestCase
 from rest_framework.test import APITestCase
 from rest_framework import status
@@ -70,6 +71,22 @@ class DistributionGroupModelTests(TestCase):
         group.remove_member('member@example.com')
         self.assertEqual(group.member_count, 0)
 
+    def test_member_count_is_stored(self):
+        """Test that the member counter follows adds and deletes without COUNT queries."""
+        group = DistributionGroup.objects.create(name='Test Group', owner=self.user)
+        group.add_members(['a@example.com', 'b@example.com'])
+        GroupMember.objects.create(group=group, email='c@example.com')
+        group.members.get(email='a@example.com').delete()
+
+        # Saving a stale instance must not write its counter back
+        stale = DistributionGroup.objects.get(pk=group.pk)
+        group.add_member('d@example.com')
+        stale.description = 'Renamed'
+        stale.save()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(DistributionGroup.objects.get(pk=group.pk).member_count, 3)
+
 
 class DistributionGroupAPITests(APITestCase):
     """Tests for distribution group API endpoints."""
@@ -126,8 +143,49 @@ class DistributionGroupAPITests(APITestCase):
         data = {'email': 'newmember@example.com'}
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        group.refresh_from_db()
         self.assertEqual(group.member_count, 1)
 
+    def test_group_queries_do_not_grow_with_page_size(self):
+        """Test that listing and retrieving groups take a fixed number of queries."""
+        self.client.force_authenticate(user=self.user)
+        for i in range(5):
+            group = DistributionGroup.objects.create(name=f'Group {i}', owner=self.user)
+            group.add_members([f'member{j}@example.com' for j in range(3)] + ['other@example.com'])
+
+        # page count, page
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('distribution-group-list'))
+        self.assertEqual([group['member_count'] for group in response.data['results']], [4] * 5)
+
+        # group joined with its owner
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('distribution-group-detail', args=[group.id]))
+        self.assertEqual(response.data['member_count'], 4)
+
+        # group, members joined with their users
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('distribution-group-members', args=[group.id]))
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertIn('Other User', [member['user_name'] for member in response.data['results']])
+
+    def test_members_are_paged_by_cursor(self):
+        """Test that group members are listed a page at a time, by email."""
+        self.client.force_authenticate(user=self.user)
+        group = DistributionGroup.objects.create(name='Large Group', owner=self.user)
+        group.add_members([f'member{i:02}@example.com' for i in range(25)])
+
+        response = self.client.get(reverse('distribution-group-members', args=[group.id]))
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(response.data['results'][0]['email'], 'member00@example.com')
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(
+            [member['email'] for member in response.data['results']],
+            [f'member{i}@example.com' for i in range(20, 25)]
+        )
+        self.assertIsNone(response.data['next'])
+
     def test_cannot_modify_other_users_group(self):
         """Test that users cannot modify others' groups."""
         self.client.force_authenticate(user=self.user)
@@ -139,3 +197,105 @@ class DistributionGroupAPITests(APITestCase):
         data = {'email': 'member@example.com'}
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BulkMemberImportTests(APITestCase):
+    """Tests for adding many members at once."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123',
+            first_name='Test',
+            last_name='User'
+        )
+        self.registered = User.objects.create_user(
+            email='registered@example.com',
+            username='registered',
+            password='testpass123',
+            first_name='Registered',
+            last_name='User'
+        )
+        self.group = DistributionGroup.objects.create(name='My Group', owner=self.user)
+        self.group.add_member('existing@example.com')
+        self.client.force_authenticate(user=self.user)
+
+    def test_add_members_dedupes_and_links_users(self):
+        """Test bulk adding normalizes, dedupes and links registered users."""
+        emails = [' New@Example.com', 'new@example.com', 'existing@example.com',
+                  'registered@example.com', 'other@example.com']
+        # members, users, insert, inserted rows, count, surveys of the group
+        with self.assertNumQueries(6):
+            members = self.group.add_members(emails)
+
+        self.assertEqual(
+            sorted(member.email for member in members),
+            ['new@example.com', 'other@example.com', 'registered@example.com']
+        )
+        self.assertEqual(self.group.member_count, 4)
+        self.assertEqual(
+            self.group.members.get(email='registered@example.com').user, self.registered
+        )
+
+    def test_add_members_skips_concurrently_added_emails(self):
+        """Test that members inserted by someone else mid-import are not counted or returned."""
+        bulk_create = GroupMember.objects.bulk_create
+
+        def racing_bulk_create(members, **kwargs):
+            GroupMember.objects.create(group=self.group, email='racer@example.com')
+            return bulk_create(members, **kwargs)
+
+        with mock.patch.object(GroupMember.objects, 'bulk_create', side_effect=racing_bulk_create):
+            members = self.group.add_members(['racer@example.com', 'new@example.com'])
+
+        self.assertEqual([member.email for member in members], ['new@example.com'])
+        self.assertEqual(self.group.member_count, 3)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.member_count, 3)
+
+    def test_add_members_bulk_queues_invitations(self):
+        """Test the bulk endpoint queues invitations for unregistered members only."""
+        from apps.notifications.models import OutboundEmail
+
+        url = reverse('distribution-group-add-members-bulk', args=[self.group.id])
+        data = {'emails': ['a@example.com', 'A@example.com', 'existing@example.com',
+                           'registered@example.com']}
+        response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['added'], ['a@example.com', 'registered@example.com'])
+        self.assertEqual(response.data['skipped'], ['existing@example.com'])
+        self.assertEqual(
+            list(OutboundEmail.objects.values_list('to_email', flat=True)), ['a@example.com']
+        )
+        self.assertIn('register?email=a@example.com', OutboundEmail.objects.get().body)
+
+    def test_import_members_from_csv(self):
+        """Test importing members from an uploaded CSV file."""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        content = (
+            'name,email\n'
+            'Alice,alice@example.com\n'
+            'Bob,BOB@example.com\n'
+            'Existing,existing@example.com\n'
+            'Broken,not@an@email\n'
+            'No email,\n'
+            'Alice again,alice@example.com\n'
+        )
+        upload = SimpleUploadedFile('members.csv', content.encode(), content_type='text/csv')
+        url = reverse('distribution-group-import-members', args=[self.group.id])
+        response = self.client.post(url, {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['added'], 2)
+        self.assertEqual(response.data['skipped'], 2)
+        self.assertEqual(response.data['invalid'], ['not@an@email'])
+        self.assertTrue(self.group.members.filter(email='bob@example.com').exists())
+
+    def test_import_members_requires_file(self):
+        """Test that the CSV import rejects requests without a file."""
+        url = reverse('distribution-group-import-members', args=[self.group.id])
+        response = self.client.post(url, {}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,9 +1,15 @@
 """
 Views for the groups app.
 """
+import io
+import csv
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_email
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 
 from .models import DistributionGroup, GroupMember
@@ -16,6 +22,13 @@ from .serializers import (
     GroupMemberCreateSerializer,
 )
 from apps.users.permissions import IsSuperUser
+from apps.surveys.utils import queue_invitation_email, queue_invitation_emails
+
+
+class MemberCursorPagination(CursorPagination):
+    """Keyset pagination of a group's members by email (unique within a group)."""
+
+    ordering = 'email'
 
 
 class DistributionGroupViewSet(viewsets.ModelViewSet):
@@ -29,10 +42,16 @@ class DistributionGroupViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         # Super users can see all groups
-        if user.is_super():
-            return DistributionGroup.objects.all()
-        # Regular users can only see their own groups
-        return DistributionGroup.objects.filter(owner=user)
+        groups = DistributionGroup.objects.all()
+        if not user.is_super():
+            # Regular users can only see their own groups
+            groups = groups.filter(owner=user)
+
+        if self.action == 'list':
+            return groups.for_listing()
+        if self.action == 'retrieve':
+            return groups.select_related('owner')
+        return groups
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -50,6 +69,15 @@ class DistributionGroupViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("You don't have permission to delete this group.")
         instance.delete()
 
+    @action(detail=True, methods=['get'])
+    def members(self, request, pk=None):
+        """List the group's members, paged by cursor."""
+        group = self.get_object()
+        # No view: the viewset's ordering fields are group fields
+        paginator = MemberCursorPagination()
+        page = paginator.paginate_queryset(group.members.select_related('user'), request)
+        return paginator.get_paginated_response(GroupMemberSerializer(page, many=True).data)
+
     @action(detail=True, methods=['post'])
     def add_member(self, request, pk=None):
         """Add a member to the group."""
@@ -77,10 +105,9 @@ class DistributionGroupViewSet(viewsets.ModelViewSet):
 
         member = group.add_member(email, user)
 
-        # Send invitation email if user doesn't exist
+        # Queue an invitation email if the user doesn't exist
         if not user:
-            from apps.surveys.utils import send_invitation_email
-            send_invitation_email(email, request.user, group=group)
+            queue_invitation_email(email, request.user, group=group)
 
         return Response(
             GroupMemberSerializer(member).data,
@@ -106,7 +133,7 @@ class DistributionGroupViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        deleted_count, _ = group.members.filter(email__iexact=email).delete()
+        deleted_count = group.remove_member(email)
 
         if deleted_count == 0:
             return Response(
@@ -138,24 +165,81 @@ class DistributionGroupViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        added = []
-        skipped = []
-
-        for email in emails:
-            email = email.lower().strip()
-            if group.members.filter(email__iexact=email).exists():
-                skipped.append(email)
-            else:
-                member = group.add_member(email)
-                added.append(email)
+        emails = [email.lower().strip() for email in emails]
+        members = group.add_members(emails)
+        added = {member.email for member in members}
+        skipped = [email for email in dict.fromkeys(emails) if email and email not in added]
 
-                # Send invitation email if user doesn't exist
-                if not member.user:
-                    from apps.surveys.utils import send_invitation_email
-                    send_invitation_email(email, request.user, group=group)
+        # Queue invitation emails to addresses without an account
+        queue_invitation_emails(
+            [member.email for member in members if not member.user_id],
+            request.user,
+            group=group
+        )
 
         return Response({
-            'added': added,
+            'added': [member.email for member in members],
             'skipped': skipped,
             'message': f'Added {len(added)} members, skipped {len(skipped)} duplicates.'
         })
+
+    @action(detail=True, methods=['post'], parser_classes=[MultiPartParser])
+    def import_members(self, request, pk=None):
+        """
+        Add members from an uploaded CSV file.
+
+        The file is read row by row; the first cell of each row that looks
+        like an email address is used, so header rows and extra columns are
+        ignored. Only counts are returned, plus the rejected addresses.
+        """
+        group = self.get_object()
+
+        # Check ownership
+        if group.owner != request.user and not request.user.is_super():
+            return Response(
+                {'error': "You don't have permission to modify this group."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response(
+                {'error': 'A CSV file is required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        invalid = []
+        total = 0
+
+        def read_emails():
+            nonlocal total
+            rows = csv.reader(io.TextIOWrapper(upload.file, encoding='utf-8-sig', errors='replace'))
+            for row in rows:
+                email = next((cell.strip() for cell in row if '@' in cell), None)
+                if email is None:
+                    continue
+                try:
+                    validate_email(email)
+                except DjangoValidationError:
+                    invalid.append(email)
+                    continue
+                total += 1
+                yield email
+
+        members = group.add_members(read_emails())
+        queue_invitation_emails(
+            [member.email for member in members if not member.user_id],
+            request.user,
+            group=group
+        )
+
+        skipped = total - len(members)
+        return Response({
+            'added': len(members),
+            'skipped': skipped,
+            'invalid': invalid,
+            'message': (
+                f'Added {len(members)} members, skipped {skipped} duplicates, '
+                f'rejected {len(invalid)} invalid addresses.'
+            )
+        })
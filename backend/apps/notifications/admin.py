@@ -0,0 +1,17 @@
+"""
+Admin configuration for the notifications app.
+"""
+from django.contrib import admin
+from .models import OutboundEmail
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    """Admin configuration for OutboundEmail model."""
+
+    list_display = ['to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['to_email', 'subject']
+    ordering = ['-created_at']
+
+    readonly_fields = ['created_at', 'sent_at', 'attempts', 'last_error']
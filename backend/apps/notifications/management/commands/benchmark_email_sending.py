@@ -0,0 +1,122 @@
+"""
+Benchmark outbox sending against a local stand-in SMTP server.
+
+Compares one connection per message (how emails used to be sent) with
+batches sent over a reused connection. Nothing touches the database.
+"""
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from apps.notifications.models import OutboundEmail
+from .send_queued_emails import send_batch, chunks
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept and discard messages."""
+
+    def handle(self):
+        # Stands in for the TCP/TLS handshake and greeting of a real server
+        time.sleep(self.server.connect_delay)
+        self.wfile.write(b'220 localhost ESMTP sink\r\n')
+        in_data = False
+        for line in self.rfile:
+            if in_data:
+                if line == b'.\r\n':
+                    in_data = False
+                    self.server.count_message()
+                    self.wfile.write(b'250 OK\r\n')
+                continue
+            command = line[:4].upper()
+            if command == b'DATA':
+                in_data = True
+                self.wfile.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+            elif command == b'QUIT':
+                self.wfile.write(b'221 Bye\r\n')
+                return
+            else:
+                self.wfile.write(b'250 OK\r\n')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, connect_delay):
+        super().__init__(('127.0.0.1', 0), SMTPSinkHandler)
+        self.connect_delay = connect_delay
+        self.received = 0
+        self._lock = threading.Lock()
+
+    def count_message(self):
+        with self._lock:
+            self.received += 1
+
+
+class Command(BaseCommand):
+    help = 'Compare per-message and reused-connection email sending throughput.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument(
+            '--connect-delay',
+            type=float,
+            default=0.05,
+            help='Seconds the stand-in server takes to greet a new connection'
+        )
+
+    def handle(self, *args, **options):
+        sink = SMTPSink(options['connect_delay'])
+        threading.Thread(target=sink.serve_forever, daemon=True).start()
+
+        def connect():
+            return get_connection(
+                'django.core.mail.backends.smtp.EmailBackend',
+                host='127.0.0.1',
+                port=sink.server_address[1],
+                username='',
+                password='',
+                use_tls=False,
+                use_ssl=False
+            )
+
+        emails = [
+            OutboundEmail(
+                to_email=f'member{i}@example.com',
+                subject='New Survey: Benchmark',
+                body='Take the survey here: http://localhost:3000/survey/1',
+                html_body='<p>Take the survey <a href="http://localhost:3000/survey/1">here</a></p>'
+            )
+            for i in range(options['messages'])
+        ]
+
+        try:
+            self._measure('connection per message', sink, options['workers'],
+                          [[email] for email in emails], connect)
+            self._measure(f"reused, batches of {options['batch_size']}", sink, options['workers'],
+                          chunks(emails, options['batch_size']), connect)
+        finally:
+            sink.shutdown()
+            sink.server_close()
+
+    def _measure(self, label, sink, workers, batches, connect):
+        sink.received = 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = [
+                error
+                for batch_results in pool.map(lambda batch: send_batch(batch, connect()), batches)
+                for error in batch_results
+            ]
+        elapsed = time.perf_counter() - started
+        failed = sum(error is not None for error in results)
+        self.stdout.write(
+            f"{label:<28} {sink.received / elapsed:8.0f} messages/s   "
+            f"({sink.received} sent, {failed} failed)"
+        )
@@ -0,0 +1,99 @@
+"""
+Worker that drains the email outbox.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from apps.notifications.models import OutboundEmail
+
+
+def send_batch(emails, connection=None):
+    """
+    Send outbox emails over one mail server connection.
+
+    Returns one entry per email: None if it was sent, else the error text.
+    After a failure the connection is reopened for the next email.
+    """
+    connection = connection or get_connection()
+    results = []
+    try:
+        for email in emails:
+            try:
+                connection.open()  # no-op while the session is up
+                connection.send_messages([email.to_message(connection)])
+                results.append(None)
+            except Exception as e:
+                results.append(str(e) or e.__class__.__name__)
+                connection.close()
+    finally:
+        connection.close()
+    return results
+
+
+def chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Send queued emails with a pool of worker threads, each reusing one '
+        'mail server connection per batch, retrying failures with backoff. '
+        'Runs until stopped unless --once is given; start more processes to '
+        'send faster.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.EMAIL_OUTBOX_WORKERS,
+            help='Mail server connections used concurrently by this process'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            help='Emails sent over one connection before it is closed'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5,
+            help='Seconds to wait when no email is due'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once no email is due instead of polling'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                # Claim enough to keep every connection busy for one batch
+                emails = OutboundEmail.claim(batch_size * options['workers'])
+                if not emails:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                # Threads only talk to the mail server; the database is
+                # updated from this thread.
+                batches = chunks(emails, batch_size)
+                sent = []
+                for batch, results in zip(batches, pool.map(send_batch, batches)):
+                    for email, error in zip(batch, results):
+                        if error is None:
+                            sent.append(email)
+                        else:
+                            email.mark_failed(error)
+                OutboundEmail.mark_sent(sent)
+                self.stdout.write(f"Sent {len(sent)} of {len(emails)} emails")
+
+        self.stdout.write(self.style.SUCCESS('Outbox drained.'))
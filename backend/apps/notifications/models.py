@@ -0,0 +1,116 @@
+"""
+Notification models for Group Choice application.
+"""
+import uuid
+from datetime import timedelta
+from django.db import models, transaction
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.utils import timezone
+
+# How long a worker may hold claimed emails before another worker may
+# take them over (e.g. after the first one crashed mid-batch).
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+class OutboundEmail(models.Model):
+    """
+    An email waiting in the outbox, or the record of one that was sent.
+
+    The API only inserts rows (once its transaction has committed); the
+    send_queued_emails worker sends them, so requests never wait on SMTP.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENDING = 'sending', 'Sending'
+        SENT = 'sent', 'Sent'
+        FAILED = 'failed', 'Failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=300)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text='When the email is next due, or when a worker\'s claim on it runs out'
+    )
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'outbound_emails'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.to_email}: {self.subject} ({self.get_status_display()})"
+
+    def to_message(self, connection=None):
+        """Build the Django email message for this row."""
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[self.to_email],
+            connection=connection
+        )
+        if self.html_body:
+            message.attach_alternative(self.html_body, 'text/html')
+        return message
+
+    @classmethod
+    def claim(cls, limit):
+        """
+        Claim up to `limit` due emails for this worker and return them.
+
+        Rows locked by another worker are skipped (where the database
+        supports it), and claims that ran out are picked up again.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            emails = list(
+                cls.objects.select_for_update(skip_locked=True).filter(
+                    status__in=[cls.Status.PENDING, cls.Status.SENDING],
+                    next_attempt_at__lte=now
+                ).order_by('next_attempt_at')[:limit]
+            )
+            cls.objects.filter(pk__in=[email.pk for email in emails]).update(
+                status=cls.Status.SENDING,
+                next_attempt_at=now + CLAIM_LEASE
+            )
+        return emails
+
+    @classmethod
+    def mark_sent(cls, emails):
+        """Record that the given emails were sent."""
+        cls.objects.filter(pk__in=[email.pk for email in emails]).update(
+            status=cls.Status.SENT,
+            sent_at=timezone.now(),
+            last_error=''
+        )
+
+    def mark_failed(self, error):
+        """Schedule a retry with exponential backoff, or give up after the last attempt."""
+        self.attempts += 1
+        self.last_error = error
+        if self.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            self.status = self.Status.FAILED
+        else:
+            self.status = self.Status.PENDING
+            self.next_attempt_at = timezone.now() + timedelta(
+                seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (self.attempts - 1)
+            )
+        self.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
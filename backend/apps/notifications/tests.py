@@ -0,0 +1,197 @@
+"""
+Tests for the notifications app.
+"""
+from io import StringIO
+from datetime import timedelta
+from unittest import mock
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from apps.users.models import User
+from apps.groups.models import DistributionGroup
+from apps.surveys.models import Survey
+from apps.surveys.utils import create_anonymous_invitations, queue_survey_notifications
+from . import utils as notification_utils
+from .models import OutboundEmail
+from .management.commands import send_queued_emails
+
+SEND_MESSAGES = 'django.core.mail.backends.locmem.EmailBackend.send_messages'
+
+
+class OutboxQueueTests(APITestCase):
+    """Tests for queueing survey notifications in the outbox."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            password='testpass123',
+            first_name='Author',
+            last_name='User'
+        )
+        self.group = DistributionGroup.objects.create(name='Team', owner=self.author)
+        for i in range(3):
+            self.group.add_member(f'member{i}@example.com')
+        self.client.force_authenticate(user=self.author)
+
+    def test_survey_creation_queues_emails_after_commit(self):
+        """Test that creating a survey queues one email per member without sending any."""
+        data = {
+            'title': 'Team Survey',
+            'question': 'Where should we eat?',
+            'survey_type': 'ranked_choice',
+            'distribution_group': str(self.group.id),
+            'choices': ['Pizza', 'Tacos']
+        }
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.post(reverse('survey-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        emails = OutboundEmail.objects.all()
+        self.assertEqual(
+            sorted(email.to_email for email in emails),
+            ['member0@example.com', 'member1@example.com', 'member2@example.com']
+        )
+        self.assertTrue(all(email.subject == 'New Survey: Team Survey' for email in emails))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_templates_rendered_once_per_survey(self):
+        """Test that templates are rendered per survey and only names and links vary."""
+        member = User.objects.create_user(
+            email='registered@example.com',
+            username='registered',
+            password='testpass123',
+            first_name='Rita',
+            last_name='Member'
+        )
+        self.group.add_member(member.email, member)
+        survey = Survey.objects.create(
+            title='<b>Lunch</b>',
+            question='Where should we eat?',
+            survey_type=Survey.SurveyType.RANKED_CHOICE,
+            author=self.author,
+            distribution_group=self.group
+        )
+        self.assertEqual(create_anonymous_invitations(survey), 4)
+        invitations = survey.anonymous_invitations.filter(user__isnull=True)
+
+        with mock.patch.object(notification_utils, 'render_to_string',
+                               wraps=notification_utils.render_to_string) as render:
+            queue_survey_notifications(survey)
+        # Text and HTML, for registered and anonymous recipients
+        self.assertEqual(render.call_count, 4)
+
+        rita = OutboundEmail.objects.get(to_email='registered@example.com')
+        self.assertIn('Hi Rita,', rita.body)
+        self.assertIn('Hi Rita,', rita.html_body)
+        self.assertIn('&lt;b&gt;Lunch&lt;/b&gt;', rita.html_body)
+        self.assertIn('"<b>Lunch</b>"', rita.body)
+        self.assertNotIn('one-time use link', rita.body)
+
+        for invitation in invitations:
+            email = OutboundEmail.objects.get(to_email=invitation.email)
+            self.assertIn(invitation.survey_url, email.body)
+            self.assertIn(f'href="{invitation.survey_url}"', email.html_body)
+
+    def test_notifications_queued_in_chunks(self):
+        """Test that the outbox is filled a chunk at a time without dropping anyone."""
+        survey = Survey.objects.create(
+            title='Team Survey',
+            question='What do you prefer?',
+            survey_type=Survey.SurveyType.RANKED_CHOICE,
+            author=self.author,
+            distribution_group=self.group
+        )
+        create_anonymous_invitations(survey)
+
+        with mock.patch.object(OutboundEmail.objects, 'bulk_create',
+                               wraps=OutboundEmail.objects.bulk_create) as bulk_create:
+            queue_survey_notifications(survey, chunk_size=2)
+        self.assertEqual([len(call.args[0]) for call in bulk_create.call_args_list], [2, 1])
+        self.assertEqual(
+            sorted(OutboundEmail.objects.values_list('to_email', flat=True)),
+            ['member0@example.com', 'member1@example.com', 'member2@example.com']
+        )
+
+
+class SendQueuedEmailsTests(TestCase):
+    """Tests for the send_queued_emails worker."""
+
+    def setUp(self):
+        for i in range(5):
+            OutboundEmail.objects.create(
+                to_email=f'user{i}@example.com',
+                subject='Hello',
+                body='Plain body',
+                html_body='<p>HTML body</p>'
+            )
+
+    def test_worker_sends_pending_emails(self):
+        """Test that the worker sends every due email over one connection per batch."""
+        with mock.patch.object(
+            send_queued_emails, 'get_connection', wraps=send_queued_emails.get_connection
+        ) as get_connection:
+            call_command(
+                'send_queued_emails', '--once', '--workers', '2', '--batch-size', '3',
+                stdout=StringIO()
+            )
+        self.assertEqual(get_connection.call_count, 2)
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.Status.SENT).exists())
+        self.assertFalse(OutboundEmail.objects.filter(sent_at__isnull=True).exists())
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_RETRY_DELAY=60)
+    def test_failed_emails_retry_with_backoff(self):
+        """Test that failures are retried later and given up on after the last attempt."""
+        with mock.patch(SEND_MESSAGES, side_effect=OSError('refused')):
+            call_command('send_queued_emails', '--once', stdout=StringIO())
+
+        email = OutboundEmail.objects.first()
+        self.assertEqual(email.status, OutboundEmail.Status.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.last_error, 'refused')
+        self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        with mock.patch(SEND_MESSAGES, side_effect=OSError('refused')):
+            call_command('send_queued_emails', '--once', stdout=StringIO())
+        self.assertEqual(
+            OutboundEmail.objects.filter(status=OutboundEmail.Status.FAILED).count(), 5
+        )
+
+    def test_failure_does_not_stop_the_batch(self):
+        """Test that one rejected recipient does not hold back the rest of its batch."""
+        real_send = send_queued_emails.get_connection().__class__.send_messages
+
+        def send_messages(connection, messages):
+            if messages[0].to == ['user2@example.com']:
+                raise OSError('mailbox unavailable')
+            return real_send(connection, messages)
+
+        with mock.patch(SEND_MESSAGES, send_messages):
+            call_command('send_queued_emails', '--once', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(
+            OutboundEmail.objects.get(status=OutboundEmail.Status.PENDING).to_email,
+            'user2@example.com'
+        )
+
+    def test_expired_claims_are_taken_over(self):
+        """Test that emails claimed by a crashed worker are sent once the claim runs out."""
+        claimed = OutboundEmail.claim(2)
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(len(OutboundEmail.claim(10)), 3)
+        self.assertEqual(OutboundEmail.claim(10), [])
+
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        call_command('send_queued_emails', '--once', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 5)
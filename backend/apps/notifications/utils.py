@@ -0,0 +1,32 @@
+"""
+Utility functions for the notifications app.
+"""
+import re
+from django.template.loader import render_to_string
+from django.utils.html import escape
+
+
+class PreparedTemplate:
+    """
+    A template rendered once, with a few per-recipient fields left open.
+
+    The open fields are rendered as markers and split out, so filling them
+    in for each recipient is a string join rather than a template render.
+    Values are HTML-escaped for .html templates, as autoescape would.
+    """
+
+    def __init__(self, template_name, context, fields):
+        rendered = render_to_string(
+            template_name,
+            {**context, **{field: f"@@{field}@@" for field in fields}}
+        )
+        # Literal text at even indices, field names at odd ones
+        self._parts = re.split(f"@@({'|'.join(map(re.escape, fields))})@@", rendered)
+        self._escape = template_name.endswith('.html')
+
+    def render(self, **values):
+        parts = list(self._parts)
+        for i in range(1, len(parts), 2):
+            value = str(values[parts[i]])
+            parts[i] = escape(value) if self._escape else value
+        return ''.join(parts)
@@ -4,7 +4,8 @@ Admin configuration for the surveys app.
 from django.contrib import admin
 from .models import (
     Survey, SurveyChoice, SurveyResponse,
-    RankedChoiceAnswer, FiveStonesAnswer, AnonymousInvitation
+    RankedChoiceAnswer, FiveStonesAnswer, AnonymousInvitation, ResultTally,
+    StonesAllocationTally, ResponseCounter
 )
 
 
@@ -50,12 +51,15 @@ class SurveyAdmin(admin.ModelAdmin):
             'fields': ('author', 'distribution_group', 'theme')
         }),
         ('Settings', {
-            'fields': ('is_anonymous', 'results_public', 'deadline', 'is_active')
+            'fields': ('is_anonymous', 'results_public', 'deadline', 'is_active', 'ballot_storage')
         }),
     )
 
     readonly_fields = ['created_at', 'updated_at']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_response_count()
+
 
 @admin.register(SurveyChoice)
 class SurveyChoiceAdmin(admin.ModelAdmin):
@@ -77,7 +81,7 @@ class SurveyResponseAdmin(admin.ModelAdmin):
     ordering = ['-submitted_at']
     autocomplete_fields = ['survey', 'user']
 
-    readonly_fields = ['submitted_at', 'ip_address']
+    readonly_fields = ['submitted_at', 'ip_address', 'packed_ranking', 'stones_allocation']
 
 
 @admin.register(RankedChoiceAnswer)
@@ -111,3 +115,39 @@ class AnonymousInvitationAdmin(admin.ModelAdmin):
     autocomplete_fields = ['survey', 'user']
 
     readonly_fields = ['token', 'created_at', 'used_at']
+
+
+@admin.register(ResultTally)
+class ResultTallyAdmin(admin.ModelAdmin):
+    """Admin configuration for ResultTally model."""
+
+    list_display = ['survey', 'choice', 'value', 'shard', 'count']
+    list_filter = ['shard']
+    search_fields = ['survey__title', 'choice__text']
+    ordering = ['survey', 'choice', 'value', 'shard']
+
+    readonly_fields = ['survey', 'choice', 'value', 'shard', 'count']
+
+
+@admin.register(StonesAllocationTally)
+class StonesAllocationTallyAdmin(admin.ModelAdmin):
+    """Admin configuration for StonesAllocationTally model."""
+
+    list_display = ['survey', 'code', 'shard', 'count']
+    list_filter = ['shard']
+    search_fields = ['survey__title']
+    ordering = ['survey', 'code', 'shard']
+
+    readonly_fields = ['survey', 'code', 'shard', 'count']
+
+
+@admin.register(ResponseCounter)
+class ResponseCounterAdmin(admin.ModelAdmin):
+    """Admin configuration for ResponseCounter model."""
+
+    list_display = ['survey', 'shard', 'responses', 'ballots']
+    list_filter = ['shard']
+    search_fields = ['survey__title']
+    ordering = ['survey', 'shard']
+
+    readonly_fields = ['survey', 'shard', 'responses', 'ballots']
@@ -0,0 +1,222 @@
+"""
+Caching helpers for the surveys app.
+"""
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from django.core.cache import cache
+from django.utils import timezone
+
+RESULTS_TIMEOUT = 60 * 60
+RESULTS_LOCK_TIMEOUT = 30
+RESULTS_WAIT_INTERVAL = 0.05
+
+RESULTS_HITS_KEY = 'survey-results:hits'
+RESULTS_MISSES_KEY = 'survey-results:misses'
+DEFAULT_THEME_KEY = 'themes:default'
+
+# Edits to the survey itself invalidate its definition straight away; this
+# bounds how long changes to its theme, group or author name take to show.
+DEFINITION_TIMEOUT = 5 * 60
+
+
+def _results_key(survey, raw, version=None):
+    if version is None:
+        version = survey.results_version
+    detail = 'raw' if raw else 'compact'
+    return f"survey-results:{survey.pk}:{version}:{detail}"
+
+
+def _increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_survey_results(survey, raw=False):
+    """
+    Return survey results, computing them at most once per results version.
+
+    When many requests miss at the same time, only the one that takes the
+    lock recomputes; the others wait for its result to appear in the cache.
+    """
+    key = _results_key(survey, raw)
+    results = cache.get(key)
+    if results is not None:
+        _increment(RESULTS_HITS_KEY)
+        return results
+
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + RESULTS_LOCK_TIMEOUT
+    locked = cache.add(lock_key, 1, RESULTS_LOCK_TIMEOUT)
+    while not locked:
+        time.sleep(RESULTS_WAIT_INTERVAL)
+        results = cache.get(key)
+        if results is not None:
+            _increment(RESULTS_HITS_KEY)
+            return results
+        if time.monotonic() > deadline:
+            # The lock holder is stuck; compute without it
+            break
+        locked = cache.add(lock_key, 1, RESULTS_LOCK_TIMEOUT)
+
+    try:
+        results = cache.get(key)
+        if results is not None:
+            _increment(RESULTS_HITS_KEY)
+            return results
+
+        _increment(RESULTS_MISSES_KEY)
+        results = survey.get_results(raw=raw)
+        cache.set(key, results, RESULTS_TIMEOUT)
+        return results
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+
+def get_survey_results_delta(survey, since_version):
+    """
+    Return only what changed in the results since `since_version`.
+
+    Each changed choice is listed with its id and the fields that differ,
+    and the ids of choices removed since then (replaced by the author) are
+    listed in `removed`. The client's copy of that version is taken from the results cache; if it
+    has been evicted the full results are returned with `since_version` unset.
+    """
+    results = get_survey_results(survey)
+    previous = cache.get(_results_key(survey, raw=False, version=since_version))
+    if previous is None:
+        return results
+
+    previous_by_id = {result['id']: result for result in previous['results']}
+    changed = []
+    for result in results['results']:
+        before = previous_by_id.get(result['id'], {})
+        fields = {key: value for key, value in result.items() if before.get(key) != value}
+        if fields:
+            changed.append({'id': result['id'], **fields})
+
+    current_ids = {result['id'] for result in results['results']}
+    return {
+        **results,
+        'since_version': since_version,
+        'results': changed,
+        'removed': [choice_id for choice_id in previous_by_id if choice_id not in current_ids],
+    }
+
+
+def results_cache_stats():
+    """Return the results cache hit and miss counters."""
+    counters = cache.get_many([RESULTS_HITS_KEY, RESULTS_MISSES_KEY])
+    return {
+        'hits': counters.get(RESULTS_HITS_KEY, 0),
+        'misses': counters.get(RESULTS_MISSES_KEY, 0),
+    }
+
+
+@dataclass(frozen=True)
+class SurveyDefinition:
+    """
+    The parts of a survey that only change when the survey is edited.
+
+    `data` is the SurveySerializer output as of `updated_at`; its
+    response_count is a snapshot and may lag by up to DEFINITION_TIMEOUT.
+    """
+
+    id: object
+    updated_at: datetime
+    survey_type: str
+    is_active: bool
+    is_anonymous: bool
+    deadline: datetime
+    author_id: object
+    choice_ids: tuple
+    choice_id_set: frozenset
+    data: dict
+
+    @property
+    def is_expired(self):
+        return self.deadline is not None and timezone.now() > self.deadline
+
+    def payload(self):
+        """Return a copy of `data` with its time-dependent fields brought up to date."""
+        return {**self.data, 'is_expired': self.is_expired}
+
+    @classmethod
+    def load(cls, survey_id):
+        """Build the definition from the database, or return None if there is no such survey."""
+        from .models import Survey
+        from .serializers import SurveySerializer
+
+        survey = Survey.objects.with_response_count().select_related(
+            'author', 'theme__created_by', 'distribution_group'
+        ).prefetch_related('choices').filter(pk=survey_id).first()
+        if survey is None:
+            return None
+
+        choice_ids = tuple(choice.id for choice in survey.choices.all())
+        return cls(
+            id=survey.id,
+            updated_at=survey.updated_at,
+            survey_type=survey.survey_type,
+            is_active=survey.is_active,
+            is_anonymous=survey.is_anonymous,
+            deadline=survey.deadline,
+            author_id=survey.author_id,
+            choice_ids=choice_ids,
+            choice_id_set=frozenset(choice_ids),
+            data=dict(SurveySerializer(survey).data),
+        )
+
+
+def _definition_version_key(survey_id):
+    return f"survey-definition:{survey_id}:version"
+
+
+def _definition_key(survey_id, version):
+    return f"survey-definition:{survey_id}:{version}"
+
+
+def get_survey_definition(survey_id):
+    """
+    Return the cached SurveyDefinition of a survey, or None if it does not exist.
+
+    Definitions are stored per (survey id, updated_at); a version key points
+    at the current one, so a cache hit costs no database queries.
+    """
+    version = cache.get(_definition_version_key(survey_id))
+    if version is not None:
+        definition = cache.get(_definition_key(survey_id, version))
+        if definition is not None:
+            return definition
+
+    definition = SurveyDefinition.load(survey_id)
+    if definition is not None:
+        version = definition.updated_at.isoformat()
+        cache.set_many({
+            _definition_key(survey_id, version): definition,
+            _definition_version_key(survey_id): version,
+        }, DEFINITION_TIMEOUT)
+    return definition
+
+
+def invalidate_survey_definition(survey_id):
+    """Make the next get_survey_definition() reload the survey."""
+    cache.delete(_definition_version_key(survey_id))
+
+
+def get_default_theme_data():
+    """Return the serialized default theme (or None), cached for DEFINITION_TIMEOUT."""
+    from apps.themes.models import Theme
+    from apps.themes.serializers import ThemeSerializer
+
+    data = cache.get(DEFAULT_THEME_KEY)
+    if data is None:
+        theme = Theme.get_default()
+        # An empty dict caches "no default theme"
+        data = dict(ThemeSerializer(theme).data) if theme else {}
+        cache.set(DEFAULT_THEME_KEY, data, DEFINITION_TIMEOUT)
+    return data or None
@@ -0,0 +1,133 @@
+"""
+Streaming ballot exports (CSV and NDJSON) for the surveys app.
+"""
+import csv
+import io
+import json
+
+from .models import Survey, RankedChoiceAnswer, FiveStonesAnswer, STONE_ALLOCATIONS
+
+# Ballots read from the database cursor (and written out) at a time
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Left out of anonymous surveys' exports
+RESPONDENT_COLUMNS = ['response_id', 'submitted_at', 'respondent', 'email']
+
+# Spreadsheets run cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+
+def export_columns(survey, choices):
+    """Return the column names: respondent details (unless anonymous), then one per choice."""
+    columns = [] if survey.is_anonymous else list(RESPONDENT_COLUMNS)
+    seen = set(columns)
+    for choice in choices:
+        name = choice.text
+        if name in seen:
+            name = f"{choice.text} ({choice.order})"
+        seen.add(name)
+        columns.append(name)
+    return columns
+
+
+def ballot_chunks(survey, choices, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield lists of ballot rows, newest first, matching export_columns().
+
+    Responses are read from a single cursor as values, never as model
+    instances. Packed ballots are decoded in place; each chunk costs one
+    more query only if it holds ballots still stored as answer rows.
+    """
+    fields = ['id', 'packed_ranking', 'stones_allocation']
+    if not survey.is_anonymous:
+        fields += [
+            'submitted_at', 'user__first_name', 'user__last_name', 'user__email', 'anonymous_email'
+        ]
+    responses = survey.responses.order_by('-submitted_at', '-id').values_list(*fields)
+
+    batch = []
+    for response in responses.iterator(chunk_size=chunk_size):
+        batch.append(response)
+        if len(batch) == chunk_size:
+            yield _ballot_rows(survey, choices, batch)
+            batch = []
+    if batch:
+        yield _ballot_rows(survey, choices, batch)
+
+
+def _ballot_rows(survey, choices, batch):
+    ranked = survey.survey_type == Survey.SurveyType.RANKED_CHOICE
+    empty = [None] * len(choices)
+
+    unpacked = [
+        response_id for response_id, packed_ranking, stones_allocation, *_ in batch
+        if (not packed_ranking if ranked else stones_allocation is None)
+    ]
+    answers = {}
+    if unpacked:
+        if ranked:
+            rows = RankedChoiceAnswer.objects.values_list('response_id', 'choice_id', 'rank')
+        else:
+            rows = FiveStonesAnswer.objects.values_list('response_id', 'choice_id', 'stones')
+        index = {choice.id: i for i, choice in enumerate(choices)}
+        for response_id, choice_id, value in rows.filter(response_id__in=unpacked).order_by():
+            answers.setdefault(response_id, list(empty))[index[choice_id]] = value
+
+    ballots = []
+    for response_id, packed_ranking, stones_allocation, *respondent in batch:
+        if ranked and packed_ranking:
+            values = list(empty)
+            for rank, choice_index in enumerate(packed_ranking, start=1):
+                values[int(choice_index)] = rank
+        elif not ranked and stones_allocation is not None:
+            values = list(STONE_ALLOCATIONS[stones_allocation])
+        else:
+            values = answers.get(response_id, empty)
+
+        if respondent:
+            submitted_at, first_name, last_name, user_email, anonymous_email = respondent
+            name = f"{first_name} {last_name}".strip() if user_email else ''
+            values = [
+                str(response_id), submitted_at.isoformat(), name, user_email or anonymous_email, *values
+            ]
+        ballots.append(values)
+    return ballots
+
+
+def escape_formulas(row):
+    """Quote text cells a spreadsheet would otherwise evaluate as a formula."""
+    return [
+        f"'{value}" if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value
+        for value in row
+    ]
+
+
+def export_ballots(survey, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield a survey's ballots as CSV or NDJSON text, chunk_size ballots per piece."""
+    choices = list(survey.choices.all())
+    columns = export_columns(survey, choices)
+
+    if export_format == 'ndjson':
+        for rows in ballot_chunks(survey, choices, chunk_size):
+            yield ''.join(
+                json.dumps(dict(zip(columns, row))) + '\n'
+                for row in rows
+            )
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(escape_formulas(columns))
+    for rows in ballot_chunks(survey, choices, chunk_size):
+        writer.writerows(escape_formulas(row) for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Only the header when there are no ballots
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,97 @@
+"""
+Benchmark ranked choice ballot storage: answer rows vs packed rankings.
+
+Ballots are written one at a time, the way the respond endpoint writes
+them, inside a transaction that is rolled back at the end.
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.users.models import User
+from apps.surveys.models import Survey, SurveyChoice, SurveyResponse, RankedChoiceAnswer
+from .benchmark_results import Rollback
+
+
+def database_size():
+    """Return the bytes used by ballot storage, or None if not measurable."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('SELECT SUM(pgsize) FROM dbstat')
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT pg_total_relation_size('survey_responses') + "
+                "pg_total_relation_size('ranked_choice_answers')"
+            )
+        else:
+            return None
+        return cursor.fetchone()[0]
+
+
+class Command(BaseCommand):
+    help = 'Compare insert throughput and table size of row and packed ballot storage.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ballots', type=int, default=5000)
+        parser.add_argument('--choices', type=int, default=10)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                author = User.objects.create_user(
+                    email='benchmark@example.com',
+                    username='benchmark-author',
+                    first_name='Benchmark',
+                    last_name='Author'
+                )
+                for storage in Survey.BallotStorage:
+                    self._run(author, storage, options['ballots'], options['choices'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, author, storage, ballot_count, choice_count):
+        survey = Survey.objects.create(
+            title=f'Benchmark ({storage.label})',
+            question='Benchmark question',
+            survey_type=Survey.SurveyType.RANKED_CHOICE,
+            author=author,
+            ballot_storage=storage
+        )
+        choice_ids = [
+            choice.id for choice in SurveyChoice.objects.bulk_create([
+                SurveyChoice(survey=survey, text=f'Option {i}', order=i)
+                for i in range(1, choice_count + 1)
+            ])
+        ]
+        ballots = [
+            list(zip(random.sample(choice_ids, choice_count), range(1, choice_count + 1)))
+            for _ in range(ballot_count)
+        ]
+
+        size_before = database_size()
+        started = time.perf_counter()
+        for ballot in ballots:
+            response = SurveyResponse.objects.create(
+                survey=survey,
+                packed_ranking=SurveyResponse.pack_ranking(choice_ids, ballot)
+            )
+            if storage == Survey.BallotStorage.ROWS:
+                for choice_id, rank in ballot:
+                    RankedChoiceAnswer.objects.create(
+                        response=response,
+                        choice_id=choice_id,
+                        rank=rank
+                    )
+        elapsed = time.perf_counter() - started
+        size_after = database_size()
+
+        size = 'n/a'
+        if size_before is not None:
+            size = f"{(size_after - size_before) / 1024:.0f} KiB"
+        self.stdout.write(
+            f"{storage.label:<28} {ballot_count / elapsed:8.0f} ballots/s   "
+            f"storage {size}"
+        )
@@ -0,0 +1,98 @@
+"""
+Benchmark the streaming ballot export on a generated ranked choice survey.
+
+Everything is created inside a transaction that is rolled back at the end,
+so the command is safe to run against a development database.
+"""
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.users.models import User
+from apps.surveys.exports import EXPORT_CONTENT_TYPES, export_ballots
+from apps.surveys.models import Survey, SurveyChoice, SurveyResponse, RankedChoiceAnswer
+from .benchmark_results import Rollback
+
+
+class Command(BaseCommand):
+    help = 'Measure export throughput and peak memory for packed and row-stored ballots.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--answers', type=int, default=1000000)
+        parser.add_argument('--choices', type=int, default=10)
+
+    def handle(self, *args, **options):
+        ballot_count = options['answers'] // options['choices']
+        try:
+            with transaction.atomic():
+                author = User.objects.create_user(
+                    email='benchmark@example.com',
+                    username='benchmark-author',
+                    first_name='Benchmark',
+                    last_name='Author'
+                )
+                for storage in Survey.BallotStorage:
+                    survey = self._generate(author, storage, ballot_count, options['choices'])
+                    for export_format in EXPORT_CONTENT_TYPES:
+                        self._measure(survey, storage, export_format, ballot_count)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _generate(self, author, storage, ballot_count, choice_count):
+        self.stdout.write(
+            f"Generating {ballot_count} ballots over {choice_count} choices ({storage.label})..."
+        )
+        survey = Survey.objects.create(
+            title=f'Benchmark ({storage.label})',
+            question='Benchmark question',
+            survey_type=Survey.SurveyType.RANKED_CHOICE,
+            author=author,
+            ballot_storage=storage
+        )
+        choices = SurveyChoice.objects.bulk_create([
+            SurveyChoice(survey=survey, text=f'Option {i}', order=i)
+            for i in range(1, choice_count + 1)
+        ])
+        choice_ids = [choice.id for choice in choices]
+
+        batch_size = 1000
+        for start in range(0, ballot_count, batch_size):
+            ballots = [
+                list(zip(random.sample(choice_ids, choice_count), range(1, choice_count + 1)))
+                for _ in range(min(batch_size, ballot_count - start))
+            ]
+            # Row-stored ballots are the legacy kind, with no packed copy
+            responses = SurveyResponse.objects.bulk_create([
+                SurveyResponse(
+                    survey=survey,
+                    anonymous_email=f'voter{start + i}@example.com',
+                    packed_ranking=(
+                        SurveyResponse.pack_ranking(choice_ids, ballot)
+                        if storage == Survey.BallotStorage.PACKED else ''
+                    )
+                )
+                for i, ballot in enumerate(ballots)
+            ])
+            if storage == Survey.BallotStorage.ROWS:
+                RankedChoiceAnswer.objects.bulk_create([
+                    RankedChoiceAnswer(response=response, choice_id=choice_id, rank=rank)
+                    for response, ballot in zip(responses, ballots)
+                    for choice_id, rank in ballot
+                ], batch_size=batch_size * choice_count)
+        return survey
+
+    def _measure(self, survey, storage, export_format, ballot_count):
+        tracemalloc.start()
+        started = time.perf_counter()
+        size = sum(len(chunk) for chunk in export_ballots(survey, export_format))
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(
+            f"{storage.label:<28} {export_format:<7} {ballot_count / elapsed:8.0f} ballots/s   "
+            f"{size / 1024 / 1024:7.1f} MiB out   peak memory {peak / 1024 / 1024:6.1f} MiB"
+        )
@@ -0,0 +1,90 @@
+"""
+Benchmark invitation generation for large distribution groups.
+
+Everything is created inside a transaction that is rolled back at the end,
+so the command is safe to run against a development database.
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.users.models import User
+from apps.groups.models import DistributionGroup, GroupMember
+from apps.surveys.models import Survey, AnonymousInvitation
+from apps.surveys.utils import create_anonymous_invitations
+from .benchmark_results import Rollback
+
+
+def legacy_create_anonymous_invitations(survey):
+    """The per-member path: a get_or_create (SELECT + INSERT) for every member."""
+    invitations = []
+    for member in survey.distribution_group.members.all():
+        invitation, created = AnonymousInvitation.objects.get_or_create(
+            survey=survey,
+            email=member.email,
+            defaults={
+                'user': member.user,
+                'expires_at': survey.deadline or timezone.now() + timedelta(days=30)
+            }
+        )
+        if created:
+            invitations.append(invitation)
+    return invitations
+
+
+class Command(BaseCommand):
+    help = 'Compare per-member and bulk invitation generation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, nargs='+', default=[10000, 100000])
+        parser.add_argument(
+            '--legacy-limit',
+            type=int,
+            default=10000,
+            help='Skip the per-member path for larger groups'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                author = User.objects.create_user(
+                    email='benchmark@example.com',
+                    username='benchmark-author',
+                    first_name='Benchmark',
+                    last_name='Author'
+                )
+                for member_count in options['members']:
+                    group = DistributionGroup.objects.create(
+                        name=f'Benchmark {member_count}', owner=author
+                    )
+                    GroupMember.objects.bulk_create([
+                        GroupMember(group=group, email=f'member{i}@example.com')
+                        for i in range(member_count)
+                    ], batch_size=1000)
+
+                    if member_count <= options['legacy_limit']:
+                        self._measure(f'{member_count} members, per-member', author, group,
+                                      legacy_create_anonymous_invitations)
+                    self._measure(f'{member_count} members, bulk', author, group,
+                                  create_anonymous_invitations)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _measure(self, label, author, group, func):
+        survey = Survey.objects.create(
+            title='Benchmark Survey',
+            question='Benchmark question',
+            author=author,
+            distribution_group=group
+        )
+        started = time.perf_counter()
+        func(survey)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label:<32} {elapsed:8.2f} s   "
+            f"{survey.anonymous_invitations.count() / elapsed:9.0f} invitations/s"
+        )
@@ -0,0 +1,105 @@
+"""
+Benchmark survey results computation on generated data.
+
+Everything is created inside a transaction that is rolled back at the end,
+so the command is safe to run against a development database.
+"""
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.users.models import User
+from apps.surveys.models import (
+    Survey, SurveyChoice, SurveyResponse, RankedChoiceAnswer, ResultTally
+)
+
+
+class Rollback(Exception):
+    """Raised to discard the generated benchmark data."""
+
+
+def legacy_borda_histograms(survey):
+    """The pre-aggregation path: load every answer as a model instance."""
+    histograms = {choice_id: [] for choice_id in survey.choices.values_list('id', flat=True)}
+    for answer in RankedChoiceAnswer.objects.filter(response__survey=survey).select_related('choice'):
+        histograms[answer.choice_id].append(answer.rank)
+    return histograms
+
+
+class Command(BaseCommand):
+    help = 'Compare results computation paths on a generated ranked choice survey.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--responses', type=int, default=10000)
+        parser.add_argument('--choices', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                survey = self._generate(options['responses'], options['choices'])
+                choice_ids = list(survey.choices.values_list('id', flat=True))
+
+                self._measure('legacy (model instances)', options['repeat'],
+                              lambda: legacy_borda_histograms(survey))
+                self._measure('aggregate (GROUP BY)', options['repeat'],
+                              lambda: survey._counted_histograms(choice_ids))
+                self._measure('tallies', options['repeat'], survey.get_results)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _generate(self, response_count, choice_count):
+        self.stdout.write(f"Generating {response_count} responses over {choice_count} choices...")
+        author = User.objects.create_user(
+            email='benchmark@example.com',
+            username='benchmark-author',
+            first_name='Benchmark',
+            last_name='Author'
+        )
+        survey = Survey.objects.create(
+            title='Benchmark Survey',
+            question='Benchmark question',
+            survey_type=Survey.SurveyType.RANKED_CHOICE,
+            author=author
+        )
+        choices = SurveyChoice.objects.bulk_create([
+            SurveyChoice(survey=survey, text=f'Option {i}', order=i)
+            for i in range(1, choice_count + 1)
+        ])
+
+        batch_size = 1000
+        for start in range(0, response_count, batch_size):
+            responses = SurveyResponse.objects.bulk_create([
+                SurveyResponse(survey=survey)
+                for _ in range(min(batch_size, response_count - start))
+            ])
+            answers = []
+            for response in responses:
+                order = random.sample(choices, len(choices))
+                answers.extend(
+                    RankedChoiceAnswer(response=response, choice=choice, rank=rank)
+                    for rank, choice in enumerate(order, start=1)
+                )
+            RankedChoiceAnswer.objects.bulk_create(answers, batch_size=batch_size)
+
+        ResultTally.rebuild(survey)
+        return survey
+
+    def _measure(self, label, repeat, func):
+        timings = []
+        peak = 0
+        for _ in range(repeat):
+            tracemalloc.start()
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        self.stdout.write(
+            f"{label:<28} best {min(timings) * 1000:9.1f} ms   "
+            f"peak memory {peak / 1024:9.1f} KiB"
+        )
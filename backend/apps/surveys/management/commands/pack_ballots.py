@@ -0,0 +1,118 @@
+"""
+Migrate surveys to packed ballot storage.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.surveys.models import Survey, SurveyResponse, RankedChoiceAnswer, FiveStonesAnswer
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill SurveyResponse.packed_ranking (Ranked Choice) or '
+        'SurveyResponse.stones_allocation (5 Stones) from the answer rows and '
+        'switch the surveys to packed storage. Partial or invalid ballots are '
+        'reported and keep their answer rows. With --drop-rows the answer '
+        'rows of packed responses are deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'survey_ids',
+            nargs='*',
+            help='Surveys to migrate (default: all surveys)'
+        )
+        parser.add_argument(
+            '--drop-rows',
+            action='store_true',
+            help='Delete answer rows once their ballots are packed'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        surveys = Survey.objects.all()
+        if options['survey_ids']:
+            surveys = surveys.filter(id__in=options['survey_ids'])
+
+        for survey in surveys.iterator():
+            packed, skipped = self._pack_survey(survey, options['batch_size'])
+            for response_id in skipped:
+                self.stdout.write(self.style.WARNING(
+                    f"Skipped partial or invalid ballot of response {response_id}"
+                ))
+            if options['drop_rows']:
+                if survey.survey_type == Survey.SurveyType.RANKED_CHOICE:
+                    rows = RankedChoiceAnswer.objects.exclude(response__packed_ranking='')
+                else:
+                    rows = FiveStonesAnswer.objects.exclude(response__stones_allocation__isnull=True)
+                deleted, _ = rows.filter(response__survey=survey).delete()
+                self.stdout.write(f"Dropped {deleted} answer rows of {survey.id}")
+            self.stdout.write(f"Packed {packed} ballots of {survey.id} ({survey.title})")
+
+        self.stdout.write(self.style.SUCCESS('Done.'))
+
+    @transaction.atomic
+    def _pack_survey(self, survey, batch_size):
+        choice_ids = list(survey.choices.values_list('id', flat=True))
+        if survey.survey_type == Survey.SurveyType.RANKED_CHOICE:
+            field = 'packed_ranking'
+            answers = RankedChoiceAnswer.objects.filter(
+                response__survey=survey,
+                response__packed_ranking=''
+            ).values_list('response_id', 'choice_id', 'rank')
+        else:
+            field = 'stones_allocation'
+            answers = FiveStonesAnswer.objects.filter(
+                response__survey=survey,
+                response__stones_allocation__isnull=True
+            ).values_list('response_id', 'choice_id', 'stones')
+
+        packed = 0
+        batch, skipped = [], []
+        current_id, ballot = None, []
+
+        def add(response_id, ballot):
+            response = self._packed(survey, response_id, choice_ids, ballot)
+            if response is None:
+                skipped.append(response_id)
+            else:
+                batch.append(response)
+
+        for response_id, choice_id, value in answers.order_by('response_id').iterator(chunk_size=batch_size):
+            if response_id != current_id and ballot:
+                add(current_id, ballot)
+                ballot = []
+            current_id = response_id
+            ballot.append((choice_id, value))
+            if len(batch) >= batch_size:
+                packed += self._save(batch, field)
+                batch = []
+        if ballot:
+            add(current_id, ballot)
+        packed += self._save(batch, field)
+
+        survey.ballot_storage = Survey.BallotStorage.PACKED
+        survey.save(update_fields=['ballot_storage'])
+        return packed, skipped
+
+    def _packed(self, survey, response_id, choice_ids, ballot):
+        """Return the response with its ballot packed, or None if the ballot cannot be packed."""
+        if survey.survey_type == Survey.SurveyType.RANKED_CHOICE:
+            # Only a full ranking packs without changing the results
+            ranked = sorted(choice_id for choice_id, _ in ballot)
+            ranks = sorted(rank for _, rank in ballot)
+            if ranked != sorted(choice_ids) or ranks != list(range(1, len(choice_ids) + 1)):
+                return None
+            return SurveyResponse(
+                id=response_id,
+                packed_ranking=SurveyResponse.pack_ranking(choice_ids, ballot)
+            )
+        try:
+            stones_allocation = SurveyResponse.encode_allocation(choice_ids, ballot)
+        except KeyError:
+            return None
+        return SurveyResponse(id=response_id, stones_allocation=stones_allocation)
+
+    def _save(self, batch, field):
+        SurveyResponse.objects.bulk_update(batch, [field])
+        return len(batch)
@@ -0,0 +1,52 @@
+"""
+Rebuild or verify survey result tallies from the raw answers.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.surveys.models import Survey, ResultTally, StonesAllocationTally, ResponseCounter
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount result tallies from the stored answers. Use --verify to only '
+        'report surveys whose tallies disagree. Rebuild a survey while it is '
+        'not receiving responses, as ballots landing mid-rebuild are dropped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'survey_ids',
+            nargs='*',
+            help='Surveys to process (default: all surveys)'
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Compare tallies with the raw answers without changing anything'
+        )
+
+    def handle(self, *args, **options):
+        surveys = Survey.objects.all()
+        if options['survey_ids']:
+            surveys = surveys.filter(id__in=options['survey_ids'])
+
+        mismatched = 0
+        for survey in surveys.iterator():
+            if options['verify']:
+                choices = list(survey.choices.values_list('id', 'text'))
+                ballots = survey.count_ballots()
+                tallied = survey._tallied_histograms(choices, ballots)
+                counted = survey._counted_histograms([choice_id for choice_id, _ in choices])
+                if tallied != counted or ResponseCounter.ballot_count(survey) != ballots:
+                    mismatched += 1
+                    self.stdout.write(self.style.WARNING(f"Mismatch: {survey.id} ({survey.title})"))
+            else:
+                if survey.survey_type == Survey.SurveyType.FIVE_STONES:
+                    StonesAllocationTally.rebuild(survey)
+                else:
+                    ResultTally.rebuild(survey)
+                self.stdout.write(f"Rebuilt: {survey.id} ({survey.title})")
+
+        if options['verify'] and mismatched:
+            raise CommandError(f"{mismatched} survey(s) have out of date tallies.")
+        self.stdout.write(self.style.SUCCESS('Done.'))
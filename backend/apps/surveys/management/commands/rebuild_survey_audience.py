@@ -0,0 +1,17 @@
+"""
+Recompute the survey audience index.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.surveys.models import SurveyAudience
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild SurveyAudience from survey authors, group members and '
+        'invitations, e.g. after memberships were changed with bulk queries.'
+    )
+
+    def handle(self, *args, **options):
+        rows = SurveyAudience.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the survey audience: {rows} rows."))
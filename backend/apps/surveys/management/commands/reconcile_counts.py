@@ -0,0 +1,25 @@
+"""
+Repair the stored response and member counters.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.groups.models import DistributionGroup
+from apps.surveys.models import Survey
+from apps.users.models import UserStats
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount survey response counters, DistributionGroup.member_count and '
+        'UserStats and fix the ones that drifted, e.g. after rows were '
+        'written with raw SQL or bulk_create.'
+    )
+
+    def handle(self, *args, **options):
+        surveys = Survey.objects.reconcile_response_counts()
+        groups = DistributionGroup.objects.reconcile_member_counts()
+        users = UserStats.reconcile()
+        self.stdout.write(f"Fixed {surveys} survey response counts")
+        self.stdout.write(f"Fixed {groups} group member counts")
+        self.stdout.write(f"Fixed {users} user stats")
+        self.stdout.write(self.style.SUCCESS('Done.'))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:19
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0003_add_url_to_choice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultTally',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('value', models.PositiveSmallIntegerField(help_text='Rank (Ranked Choice) or stones (5 Stones) received')),
+                ('shard', models.PositiveSmallIntegerField(default=0)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('choice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='result_tallies', to='surveys.surveychoice')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='result_tallies', to='surveys.survey')),
+            ],
+            options={
+                'db_table': 'result_tallies',
+                'unique_together': {('choice', 'value', 'shard')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0004_add_result_tallies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='results_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, help_text='Incremented whenever the results may have changed'),
+        ),
+    ]
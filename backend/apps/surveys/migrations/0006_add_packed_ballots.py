@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0005_add_results_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='ballot_storage',
+            field=models.CharField(choices=[('rows', 'One row per answer'), ('packed', 'Packed into the response')], default='rows', help_text='Whether ballots also get one answer row per choice', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='surveyresponse',
+            name='packed_ranking',
+            field=models.CharField(blank=True, help_text='Ranked choice ballot as choice order indices, first-ranked first', max_length=10),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:38
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0006_add_packed_ballots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveyresponse',
+            name='stones_allocation',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='5 Stones ballot as an index into STONE_ALLOCATIONS', null=True),
+        ),
+        migrations.CreateModel(
+            name='StonesAllocationTally',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('code', models.PositiveSmallIntegerField(help_text='Index into STONE_ALLOCATIONS')),
+                ('shard', models.PositiveSmallIntegerField(default=0)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocation_tallies', to='surveys.survey')),
+            ],
+            options={
+                'db_table': 'stones_allocation_tallies',
+                'unique_together': {('survey', 'code', 'shard')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:41
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Q
+
+
+def delete_duplicate_responses(apps, schema_editor):
+    # Keep each user's earliest response to a survey (by id on ties); the
+    # answers of the others go with them
+    SurveyResponse = apps.get_model('surveys', 'SurveyResponse')
+    earlier = SurveyResponse.objects.filter(
+        survey=OuterRef('survey'),
+        user=OuterRef('user'),
+    ).filter(
+        Q(submitted_at__lt=OuterRef('submitted_at'))
+        | Q(submitted_at=OuterRef('submitted_at'), id__lt=OuterRef('id'))
+    )
+    SurveyResponse.objects.filter(user__isnull=False).filter(Exists(earlier)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0007_add_stones_allocations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_responses, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='surveyresponse',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('survey', 'user'), name='unique_survey_response_per_user'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:01
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Q
+
+
+def fill_response_counters(apps, schema_editor):
+    # One shard per survey holding its responses, and those with a ballot
+    # over the current choices
+    Survey = apps.get_model('surveys', 'Survey')
+    ResponseCounter = apps.get_model('surveys', 'ResponseCounter')
+    RankedChoiceAnswer = apps.get_model('surveys', 'RankedChoiceAnswer')
+    FiveStonesAnswer = apps.get_model('surveys', 'FiveStonesAnswer')
+
+    ranked = ~Q(packed_ranking='') | Exists(RankedChoiceAnswer.objects.filter(response=OuterRef('pk')))
+    stones = Q(stones_allocation__isnull=False) | Exists(FiveStonesAnswer.objects.filter(response=OuterRef('pk')))
+    counters = []
+    for survey in Survey.objects.only('id', 'survey_type').iterator():
+        held = stones if survey.survey_type == 'five_stones' else ranked
+        responses = survey.responses.count()
+        if responses:
+            counters.append(ResponseCounter(
+                survey=survey, responses=responses, ballots=survey.responses.filter(held).count()
+            ))
+    ResponseCounter.objects.bulk_create(counters, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0008_unique_survey_response_per_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponseCounter',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('shard', models.PositiveSmallIntegerField(default=0)),
+                ('responses', models.IntegerField(default=0)),
+                ('ballots', models.IntegerField(default=0)),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='response_counters', to='surveys.survey')),
+            ],
+            options={
+                'db_table': 'response_counters',
+                'unique_together': {('survey', 'shard')},
+            },
+        ),
+        migrations.RunPython(fill_response_counters, migrations.RunPython.noop),
+    ]
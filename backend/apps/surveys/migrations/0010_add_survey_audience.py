@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:09
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_survey_audience(apps, schema_editor):
+    Survey = apps.get_model('surveys', 'Survey')
+    AnonymousInvitation = apps.get_model('surveys', 'AnonymousInvitation')
+    SurveyAudience = apps.get_model('surveys', 'SurveyAudience')
+
+    sources = [
+        ('author', Survey.objects.values_list('author_id', 'id')),
+        ('member', Survey.objects.filter(
+            distribution_group__members__user__isnull=False
+        ).values_list('distribution_group__members__user_id', 'id')),
+        ('invited', AnonymousInvitation.objects.filter(
+            user__isnull=False
+        ).values_list('user_id', 'survey_id')),
+    ]
+    for relation, rows in sources:
+        batch = [
+            SurveyAudience(user_id=user_id, survey_id=survey_id, relation=relation)
+            for user_id, survey_id in rows.iterator()
+        ]
+        SurveyAudience.objects.bulk_create(batch, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0003_add_member_count'),
+        ('surveys', '0009_add_response_counters'),
+        ('themes', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyAudience',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('relation', models.CharField(choices=[('author', 'Author'), ('member', 'Distribution group member'), ('invited', 'Invited')], max_length=10)),
+            ],
+            options={
+                'db_table': 'survey_audience',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='survey',
+            index=models.Index(fields=['created_at'], name='surveys_created_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='surveyaudience',
+            name='survey',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audience', to='surveys.survey'),
+        ),
+        migrations.AddField(
+            model_name='surveyaudience',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='survey_audience', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='surveyaudience',
+            unique_together={('user', 'survey', 'relation')},
+        ),
+        migrations.RunPython(fill_survey_audience, migrations.RunPython.noop),
+    ]
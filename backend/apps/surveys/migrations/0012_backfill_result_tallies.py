@@ -0,0 +1,101 @@
+from django.db import migrations
+from django.db.models import Count, F
+
+# Every way to place 5 stones on 3 choices, as in apps.surveys.models
+STONE_ALLOCATIONS = [
+    (first, second, 5 - first - second)
+    for first in range(6)
+    for second in range(6 - first)
+]
+ALLOCATION_CODES = {allocation: code for code, allocation in enumerate(STONE_ALLOCATIONS)}
+
+
+def ranked_choice_tallies(apps, survey, choice_ids):
+    ResultTally = apps.get_model('surveys', 'ResultTally')
+    RankedChoiceAnswer = apps.get_model('surveys', 'RankedChoiceAnswer')
+
+    counts = {}
+    packed = survey.responses.exclude(packed_ranking='').values_list(
+        'packed_ranking'
+    ).annotate(count=Count('id')).order_by()
+    for packed_ranking, count in packed:
+        for rank, index in enumerate(packed_ranking, start=1):
+            key = (choice_ids[int(index)], rank)
+            counts[key] = counts.get(key, 0) + count
+
+    rows = RankedChoiceAnswer.objects.filter(
+        response__survey=survey,
+        response__packed_ranking=''
+    ).values_list('choice_id', 'rank').annotate(count=Count('id')).order_by()
+    for choice_id, rank, count in rows:
+        # Legacy ballots may skip ranks; anything past last place counts as last
+        key = (choice_id, min(rank, len(choice_ids)))
+        counts[key] = counts.get(key, 0) + count
+
+    ResultTally.objects.bulk_create([
+        ResultTally(survey=survey, choice_id=choice_id, value=rank, shard=0, count=counts.get((choice_id, rank), 0))
+        for choice_id in choice_ids
+        for rank in range(1, len(choice_ids) + 1)
+    ], batch_size=1000)
+
+
+def five_stones_tallies(apps, survey, choice_ids):
+    StonesAllocationTally = apps.get_model('surveys', 'StonesAllocationTally')
+    FiveStonesAnswer = apps.get_model('surveys', 'FiveStonesAnswer')
+
+    counts = dict(
+        survey.responses.filter(stones_allocation__isnull=False).values_list(
+            'stones_allocation'
+        ).annotate(count=Count('id')).order_by()
+    )
+
+    answers = FiveStonesAnswer.objects.filter(
+        response__survey=survey,
+        response__stones_allocation__isnull=True
+    ).order_by('response_id').values_list('response_id', 'choice_id', 'stones')
+    ballots = {}
+    for response_id, choice_id, stones in answers.iterator():
+        ballot = ballots.setdefault(response_id, {})
+        ballot[choice_id] = stones
+        if len(ballot) == len(choice_ids):
+            ballot = ballots.pop(response_id)
+            allocation = tuple(ballot[choice_id] for choice_id in choice_ids)
+            if allocation in ALLOCATION_CODES:
+                code = ALLOCATION_CODES[allocation]
+                counts[code] = counts.get(code, 0) + 1
+
+    StonesAllocationTally.objects.bulk_create([
+        StonesAllocationTally(survey=survey, code=code, shard=0, count=counts.get(code, 0))
+        for code in range(len(STONE_ALLOCATIONS))
+    ])
+
+
+def backfill_result_tallies(apps, schema_editor):
+    # Surveys answered before the tallies existed have none, and surveys whose
+    # choices were replaced may have drifted; recount every survey once
+    Survey = apps.get_model('surveys', 'Survey')
+    ResultTally = apps.get_model('surveys', 'ResultTally')
+    StonesAllocationTally = apps.get_model('surveys', 'StonesAllocationTally')
+
+    for survey in Survey.objects.only('id', 'survey_type').iterator():
+        choice_ids = list(survey.choices.order_by('order').values_list('id', flat=True))
+        if survey.survey_type == 'five_stones':
+            StonesAllocationTally.objects.filter(survey=survey).delete()
+            five_stones_tallies(apps, survey, choice_ids)
+        else:
+            ResultTally.objects.filter(survey=survey).delete()
+            ranked_choice_tallies(apps, survey, choice_ids)
+
+    # Results cached under the old versions may have come from stale tallies
+    Survey.objects.update(results_version=F('results_version') + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0011_index_response_submitted_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_result_tallies, migrations.RunPython.noop),
+    ]
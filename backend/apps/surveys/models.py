@@ -2,11 +2,113 @@
 Survey models for Group Choice application.
 """
 import uuid
+import random
 import secrets
-from django.db import models
+import logging
+from django.db import models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .cache import invalidate_survey_definition
+from .streams import results_broadcaster
+
+logger = logging.getLogger(__name__)
+
+# Every way to place 5 stones on 3 choices, in choice order. A 5 Stones
+# ballot is stored as its index in this list (its allocation code).
+STONE_ALLOCATIONS = [
+    (first, second, 5 - first - second)
+    for first in range(6)
+    for second in range(6 - first)
+]
+ALLOCATION_CODES = {allocation: code for code, allocation in enumerate(STONE_ALLOCATIONS)}
+
+
+class SurveyQuerySet(models.QuerySet):
+    """QuerySet for Survey model."""
+
+    def visible_to(self, user, relation=None):
+        """
+        Filter to surveys the user authored or was invited to.
+
+        Reads the SurveyAudience index; pass a relation to only keep
+        surveys the user sees for that reason.
+        """
+        # Super users can see all surveys
+        if user.is_super() and relation is None:
+            return self
+
+        audience = SurveyAudience.objects.filter(user=user)
+        if relation is not None:
+            audience = audience.filter(relation=relation)
+        return self.filter(id__in=audience.values('survey_id'))
+
+    def for_listing(self):
+        """Load only the columns SurveyListSerializer renders, with the author joined."""
+        return self.select_related('author').only(
+            'id', 'title', 'survey_type', 'is_anonymous', 'results_public',
+            'deadline', 'is_active', 'created_at',
+            'author__id', 'author__first_name', 'author__last_name'
+        ).with_response_count()
+
+    def with_response_count(self):
+        """Annotate response_count, summed over the survey's ResponseCounter shards."""
+        return self.annotate(response_count=Greatest(_counted_responses(), Value(0)))
+
+    def with_response_status(self, user):
+        """
+        Annotate has_responded: whether the user has answered each survey.
+
+        Responses to anonymous surveys, and those sent through an invitation
+        link, are not linked to the user; they use up the user's invitation
+        instead, so a used invitation counts as a response. An anonymous
+        survey answered without an invitation cannot be traced to the user.
+        """
+        return self.annotate(has_responded=Exists(
+            SurveyResponse.objects.filter(survey=OuterRef('pk'), user=user)
+        ) | Exists(
+            AnonymousInvitation.objects.filter(
+                Q(user=user) | Q(email=user.email.lower()),
+                survey=OuterRef('pk'),
+                is_used=True
+            )
+        ))
+
+    def reconcile_response_counts(self):
+        """Reset the response counters where they disagree with the responses. Returns the number fixed."""
+        counts = SurveyResponse.objects.filter(survey=OuterRef('pk')).order_by().values('survey').annotate(
+            total=Count('id')
+        ).values('total')
+        stale = list(self.annotate(
+            stored=_counted_responses(), actual=Coalesce(Subquery(counts), Value(0))
+        ).exclude(stored=F('actual')).values_list('pk', 'actual'))
+
+        # Only the response counts move to shard 0; the ballot counts are left alone
+        survey_ids = [pk for pk, _ in stale]
+        with transaction.atomic():
+            ResponseCounter.objects.bulk_create([
+                ResponseCounter(survey_id=survey_id) for survey_id in survey_ids
+            ], batch_size=1000, ignore_conflicts=True)
+            counters = ResponseCounter.objects.filter(survey_id__in=survey_ids)
+            counters.exclude(shard=0).update(responses=0)
+            counters.filter(shard=0).update(responses=Coalesce(Subquery(
+                SurveyResponse.objects.filter(survey=OuterRef('survey')).order_by().values('survey').annotate(
+                    total=Count('id')
+                ).values('total')
+            ), Value(0)))
+        return len(stale)
+
+
+def _counted_responses():
+    """The sum of a survey's response counter shards, as an expression for annotations."""
+    totals = ResponseCounter.objects.filter(survey=OuterRef('pk')).order_by().values('survey').annotate(
+        total=Sum('responses')
+    ).values('total')
+    return Coalesce(Subquery(totals), Value(0))
 
 
 class Survey(models.Model):
@@ -16,6 +118,10 @@ class Survey(models.Model):
         RANKED_CHOICE = 'ranked_choice', 'Ranked Choice'
         FIVE_STONES = 'five_stones', '5 Stones'
 
+    class BallotStorage(models.TextChoices):
+        ROWS = 'rows', 'One row per answer'
+        PACKED = 'packed', 'Packed into the response'
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=200)
     question = models.TextField()
@@ -64,14 +170,34 @@ class Survey(models.Model):
         help_text='Deadline for survey responses'
     )
 
+    ballot_storage = models.CharField(
+        max_length=10,
+        choices=BallotStorage.choices,
+        default=BallotStorage.ROWS,
+        help_text='Whether ballots also get one answer row per choice'
+    )
+
     # Status
     is_active = models.BooleanField(default=True)
+    results_version = models.PositiveBigIntegerField(
+        default=0,
+        editable=False,
+        help_text='Incremented whenever the results may have changed'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SurveyQuerySet.as_manager()
+
+    # Updated in place with F() expressions; save() never writes them back
+    COUNTER_FIELDS = ['results_version']
+
     class Meta:
         db_table = 'surveys'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='surveys_created_at_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.get_survey_type_display()})"
@@ -83,11 +209,6 @@ class Survey(models.Model):
             return timezone.now() > self.deadline
         return False
 
-    @property
-    def response_count(self):
-        """Get the count of responses."""
-        return self.responses.count()
-
     @property
     def share_url(self):
         """Get the shareable URL for this survey."""
@@ -112,29 +233,221 @@ class Survey(models.Model):
 
         return False
 
-    def get_results(self):
-        """Calculate and return survey results."""
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        survey = super().from_db(db, field_names, values)
+        survey._saved_audience = survey._audience_key()
+        return survey
+
+    def _audience_key(self):
+        """The fields that decide the survey's author and member audience (None if deferred)."""
+        return (self.__dict__.get('author_id'), self.__dict__.get('distribution_group_id'))
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if not adding and kwargs.get('update_fields') is None:
+            # A stale in-memory counter must not overwrite newer responses;
+            # deferred fields were never loaded, so they are left alone too
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+        self._invalidate_definition()
+
+        if adding or self._audience_key() != getattr(self, '_saved_audience', None):
+            SurveyAudience.sync_survey(self)
+            self._saved_audience = self._audience_key()
+
+    def delete(self, *args, **kwargs):
+        self._invalidate_definition()
+        return super().delete(*args, **kwargs)
+
+    def _invalidate_definition(self):
+        """Drop the cached definition now and again once the change is committed."""
+        survey_id = self.pk
+        invalidate_survey_definition(survey_id)
+        transaction.on_commit(lambda: invalidate_survey_definition(survey_id))
+
+    @cached_property
+    def response_count(self):
+        """Number of responses, from the counter shards unless annotated by with_response_count()."""
+        return Survey.objects.filter(pk=self.pk).with_response_count().values_list(
+            'response_count', flat=True
+        ).first() or 0
+
+    def adjust_response_count(self, delta):
+        """Add `delta` to the stored response count, in the database and here if already read."""
+        if delta:
+            ResponseCounter.adjust(self.pk, delta)
+            if 'response_count' in self.__dict__:
+                self.response_count = max(self.response_count + delta, 0)
+
+    def bump_results_version(self):
+        """Move to a new results version, and notify live streams, after commit."""
+        survey_id = self.pk
+
+        def bump():
+            Survey.objects.filter(pk=survey_id).update(results_version=F('results_version') + 1)
+            results_broadcaster.publish(survey_id)
+
+        transaction.on_commit(bump)
+
+    def get_results(self, raw=False):
+        """
+        Calculate and return survey results.
+
+        Each choice carries a fixed-size histogram (ranks 1..N or stones 0..5).
+        With raw=True the per-response `rankings`/`distribution` lists are
+        included as well.
+        """
+        choices = list(self.choices.values_list('id', 'text'))
+        total_responses = ResponseCounter.ballot_count(self)
+
+        histograms = self._tallied_histograms(choices, total_responses)
+        if histograms is None:
+            histograms = self._counted_histograms([choice_id for choice_id, _ in choices])
+            # Every counted ballot covers every choice
+            total_responses = max((sum(histogram.values()) for histogram in histograms.values()), default=0)
+
+        if self.survey_type == self.SurveyType.RANKED_CHOICE:
+            return self._calculate_borda_count(choices, histograms, total_responses, raw)
+        else:
+            return self._calculate_five_stones_results(choices, histograms, total_responses, raw)
+
+    def count_ballots(self):
+        """
+        Count the responses holding a ballot over the current choices.
+
+        Replacing the choices clears the responses' packed ballots and deletes
+        their answer rows, so earlier responses are left out. Reads every
+        response; ResponseCounter.ballot_count() is the maintained figure.
+        """
         if self.survey_type == self.SurveyType.RANKED_CHOICE:
-            return self._calculate_borda_count()
+            packed = ~Q(packed_ranking='')
+            rows = RankedChoiceAnswer.objects.filter(response=OuterRef('pk'))
         else:
-            return self._calculate_five_stones_results()
+            packed = Q(stones_allocation__isnull=False)
+            rows = FiveStonesAnswer.objects.filter(response=OuterRef('pk'))
+        return self.responses.filter(packed | Exists(rows)).count()
 
-    def _calculate_borda_count(self):
+    def _tallied_histograms(self, choices, total_responses):
+        """
+        Read per-choice {value: count} histograms from the result tallies.
+
+        Every ballot covers every choice, so each choice's histogram must sum
+        to the ballot count. Returns None if the tallies disagree (e.g. the
+        answers were written outside the respond endpoint).
+        """
+        if self.survey_type == self.SurveyType.FIVE_STONES:
+            allocations = dict(
+                self.allocation_tallies.values_list('code').annotate(total=Sum('count')).order_by()
+            )
+            if sum(allocations.values()) == total_responses:
+                return self._allocation_histograms([choice_id for choice_id, _ in choices], allocations)
+            return self._stale_tallies()
+
+        histograms = {choice_id: {} for choice_id, _ in choices}
+        rows = self.result_tallies.values('choice_id', 'value').annotate(total=Sum('count'))
+        for row in rows:
+            if row['total']:
+                histograms[row['choice_id']][row['value']] = row['total']
+
+        for choice_id, histogram in histograms.items():
+            if sum(histogram.values()) != total_responses:
+                return self._stale_tallies()
+        return histograms
+
+    def _stale_tallies(self):
+        """Log that the tallies need rebuilding and signal the raw-answer fallback."""
+        logger.warning(
+            f"Result tallies for survey {self.id} are out of date; "
+            f"counting raw answers. Run rebuild_result_tallies to fix."
+        )
+        return None
+
+    @staticmethod
+    def _allocation_histograms(choice_ids, allocations, histograms=None):
+        """Add {code: count} 5 Stones allocations to per-choice {stones: count} histograms."""
+        if histograms is None:
+            histograms = {choice_id: {} for choice_id in choice_ids}
+        for code, count in allocations.items():
+            if not count:
+                continue
+            for choice_id, stones in zip(choice_ids, STONE_ALLOCATIONS[code]):
+                histogram = histograms[choice_id]
+                histogram[stones] = histogram.get(stones, 0) + count
+        return histograms
+
+    def _counted_histograms(self, choice_ids):
+        """
+        Build per-choice {value: count} histograms from the raw answers.
+
+        Counting happens in the database with a GROUP BY over the answer
+        table (and over packed rankings or allocation codes), so memory stays flat however many
+        responses exist. `choice_ids` must be in choice order.
+        """
+        histograms = {choice_id: {} for choice_id in choice_ids}
+
+        if self.survey_type == self.SurveyType.RANKED_CHOICE:
+            # Packed ballots: one group per distinct ranking
+            packed = self.responses.exclude(packed_ranking='').values_list(
+                'packed_ranking'
+            ).annotate(count=Count('id')).order_by()
+            for packed_ranking, count in packed:
+                for rank, index in enumerate(packed_ranking, start=1):
+                    histogram = histograms[choice_ids[int(index)]]
+                    histogram[rank] = histogram.get(rank, 0) + count
+
+            rows = RankedChoiceAnswer.objects.filter(
+                response__survey=self,
+                response__packed_ranking=''
+            ).values_list('choice_id', 'rank')
+        else:
+            # Coded ballots: one group per allocation
+            allocations = self.responses.filter(stones_allocation__isnull=False).values_list(
+                'stones_allocation'
+            ).annotate(count=Count('id')).order_by()
+            self._allocation_histograms(choice_ids, dict(allocations), histograms)
+
+            rows = FiveStonesAnswer.objects.filter(
+                response__survey=self,
+                response__stones_allocation__isnull=True
+            ).values_list('choice_id', 'stones')
+
+        ranked = self.survey_type == self.SurveyType.RANKED_CHOICE
+        for choice_id, value, count in rows.annotate(count=Count('id')).order_by():
+            if ranked:
+                # Legacy ballots may skip ranks; anything past last place counts as last
+                value = min(value, len(choice_ids))
+            histogram = histograms.setdefault(choice_id, {})
+            histogram[value] = histogram.get(value, 0) + count
+
+        return histograms
+
+    def _calculate_borda_count(self, choices, histograms, total_responses, raw=False):
         """Calculate results using Borda count method."""
-        choices = list(self.choices.values_list('id', 'text'))
         choice_count = len(choices)
-        scores = {str(choice[0]): {'text': choice[1], 'score': 0, 'rankings': []} for choice in choices}
+        scores = {
+            choice_id: {'id': str(choice_id), 'text': text, 'score': 0, 'histogram': [0] * choice_count}
+            for choice_id, text in choices
+        }
 
-        responses = RankedChoiceAnswer.objects.filter(
-            response__survey=self
-        ).select_related('choice')
+        for choice_id, histogram in histograms.items():
+            for rank, count in histogram.items():
+                # Borda count: highest rank (1) gets most points
+                points = choice_count - rank + 1
+                scores[choice_id]['score'] += points * count
+                scores[choice_id]['histogram'][rank - 1] = count
 
-        for answer in responses:
-            choice_id = str(answer.choice_id)
-            # Borda count: highest rank (1) gets most points
-            points = choice_count - answer.rank + 1
-            scores[choice_id]['score'] += points
-            scores[choice_id]['rankings'].append(answer.rank)
+        if raw:
+            for result in scores.values():
+                result['rankings'] = [
+                    rank for rank, count in enumerate(result['histogram'], start=1)
+                    for _ in range(count)
+                ]
 
         # Sort by score descending
         sorted_results = sorted(
@@ -146,23 +459,29 @@ class Survey(models.Model):
         return {
             'type': 'ranked_choice',
             'method': 'borda_count',
-            'total_responses': self.response_count,
+            'version': self.results_version,
+            'total_responses': total_responses,
             'results': sorted_results
         }
 
-    def _calculate_five_stones_results(self):
+    def _calculate_five_stones_results(self, choices, histograms, total_responses, raw=False):
         """Calculate results for 5 Stones survey."""
-        choices = list(self.choices.values_list('id', 'text'))
-        scores = {str(choice[0]): {'text': choice[1], 'stones': 0, 'distribution': []} for choice in choices}
+        scores = {
+            choice_id: {'id': str(choice_id), 'text': text, 'stones': 0, 'histogram': [0] * 6}
+            for choice_id, text in choices
+        }
 
-        responses = FiveStonesAnswer.objects.filter(
-            response__survey=self
-        ).select_related('choice')
+        for choice_id, histogram in histograms.items():
+            for stones, count in histogram.items():
+                scores[choice_id]['stones'] += stones * count
+                scores[choice_id]['histogram'][stones] = count
 
-        for answer in responses:
-            choice_id = str(answer.choice_id)
-            scores[choice_id]['stones'] += answer.stones
-            scores[choice_id]['distribution'].append(answer.stones)
+        if raw:
+            for result in scores.values():
+                result['distribution'] = [
+                    stones for stones, count in enumerate(result['histogram'])
+                    for _ in range(count)
+                ]
 
         # Sort by stones descending
         sorted_results = sorted(
@@ -173,11 +492,18 @@ class Survey(models.Model):
 
         return {
             'type': 'five_stones',
-            'total_responses': self.response_count,
-            'total_stones': self.response_count * 5,
+            'version': self.results_version,
+            'total_responses': total_responses,
+            'total_stones': total_responses * 5,
             'results': sorted_results
         }
 
+    def tally_values(self, choice_count):
+        """Return the possible answer values for a choice (ranks or stone counts)."""
+        if self.survey_type == self.SurveyType.RANKED_CHOICE:
+            return range(1, choice_count + 1)
+        return range(0, 6)
+
 
 class SurveyChoice(models.Model):
     """Choice option for a survey."""
@@ -205,6 +531,32 @@ class SurveyChoice(models.Model):
         return f"{self.survey.title}: {self.text}"
 
 
+class SurveyResponseQuerySet(models.QuerySet):
+    """QuerySet for SurveyResponse model."""
+
+    def with_answers(self, survey):
+        """
+        Join the users and prefetch the answer rows SurveyResponseSerializer renders.
+
+        Only unpacked ballots of the survey's type have their rows fetched;
+        packed ballots are decoded from the response itself.
+        """
+        ranked_answers = RankedChoiceAnswer.objects.none()
+        stones_answers = FiveStonesAnswer.objects.none()
+        if survey.survey_type == Survey.SurveyType.RANKED_CHOICE:
+            ranked_answers = RankedChoiceAnswer.objects.filter(
+                response__packed_ranking=''
+            ).select_related('choice')
+        else:
+            stones_answers = FiveStonesAnswer.objects.filter(
+                response__stones_allocation__isnull=True
+            ).select_related('choice')
+        return self.select_related('user').prefetch_related(
+            models.Prefetch('ranked_answers', queryset=ranked_answers),
+            models.Prefetch('stones_answers', queryset=stones_answers),
+        )
+
+
 class SurveyResponse(models.Model):
     """Track survey responses (who submitted)."""
 
@@ -229,15 +581,98 @@ class SurveyResponse(models.Model):
     submitted_at = models.DateTimeField(auto_now_add=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
 
+    packed_ranking = models.CharField(
+        max_length=10,
+        blank=True,
+        help_text='Ranked choice ballot as choice order indices, first-ranked first'
+    )
+    stones_allocation = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        help_text='5 Stones ballot as an index into STONE_ALLOCATIONS'
+    )
+
+    objects = SurveyResponseQuerySet.as_manager()
+
     class Meta:
         db_table = 'survey_responses'
         ordering = ['-submitted_at']
+        indexes = [
+            models.Index(fields=['survey', '-submitted_at'], name='responses_survey_submitted_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['survey', 'user'],
+                condition=Q(user__isnull=False),
+                name='unique_survey_response_per_user'
+            ),
+        ]
 
     def __str__(self):
         if self.user:
             return f"{self.survey.title} - {self.user.username}"
         return f"{self.survey.title} - {self.anonymous_email or 'Anonymous'}"
 
+    @staticmethod
+    def pack_ranking(choice_ids, ballot):
+        """Pack (choice_id, rank) pairs given the survey's choice ids in order."""
+        index = {choice_id: i for i, choice_id in enumerate(choice_ids)}
+        return ''.join(
+            str(index[choice_id])
+            for choice_id, _ in sorted(ballot, key=lambda answer: answer[1])
+        )
+
+    def unpack_ranking(self, choices):
+        """Return (choice, rank) pairs for the packed ranking, given choices in order."""
+        return [
+            (choices[int(index)], rank)
+            for rank, index in enumerate(self.packed_ranking, start=1)
+        ]
+
+    @staticmethod
+    def encode_allocation(choice_ids, ballot):
+        """Return the allocation code of (choice_id, stones) pairs given choice ids in order."""
+        stones = dict(ballot)
+        return ALLOCATION_CODES[tuple(stones[choice_id] for choice_id in choice_ids)]
+
+    def decode_allocation(self, choices):
+        """Return (choice, stones) pairs for the allocation code, given choices in order."""
+        return list(zip(choices, STONE_ALLOCATIONS[self.stones_allocation]))
+
+    def held_ballot(self):
+        """
+        Return the ballot this response holds in the tallies, or None.
+
+        That is (choice_id, rank) pairs for Ranked Choice and an allocation
+        code for 5 Stones, as passed to record_ballot(). Replacing the choices
+        clears every earlier ballot. Responses stored before ballots were
+        packed are read from their answer rows.
+        """
+        if self.survey.survey_type == Survey.SurveyType.RANKED_CHOICE:
+            choice_ids = list(self.survey.choices.values_list('id', flat=True))
+            if self.packed_ranking:
+                return [
+                    (choice_ids[int(index)], rank)
+                    for rank, index in enumerate(self.packed_ranking, start=1)
+                ]
+            # Legacy ballots may skip ranks; anything past last place counts as last
+            ballot = [
+                (choice_id, min(rank, len(choice_ids)))
+                for choice_id, rank in self.ranked_answers.values_list('choice_id', 'rank')
+            ]
+            return ballot or None
+
+        if self.stones_allocation is not None:
+            return self.stones_allocation
+        choice_ids = list(self.survey.choices.values_list('id', flat=True))
+        try:
+            return SurveyResponse.encode_allocation(
+                choice_ids, self.stones_answers.values_list('choice_id', 'stones')
+            )
+        except KeyError:
+            # Partial or invalid legacy ballots were never tallied
+            return None
+
 
 class RankedChoiceAnswer(models.Model):
     """Individual ranked choice answer."""
@@ -331,6 +766,17 @@ class AnonymousInvitation(models.Model):
             self.token = secrets.token_urlsafe(48)
         self.email = self.email.lower()
         super().save(*args, **kwargs)
+        if self.user_id:
+            SurveyAudience.add([(self.user_id, self.survey_id, SurveyAudience.Relation.INVITED)])
+
+    def delete(self, *args, **kwargs):
+        if self.user_id:
+            SurveyAudience.objects.filter(
+                user_id=self.user_id,
+                survey_id=self.survey_id,
+                relation=SurveyAudience.Relation.INVITED
+            ).delete()
+        return super().delete(*args, **kwargs)
 
     @property
     def is_valid(self):
@@ -351,3 +797,383 @@ class AnonymousInvitation(models.Model):
     def survey_url(self):
         """Get the survey URL with token."""
         return f"{settings.FRONTEND_URL}/survey/{self.survey_id}?token={self.token}"
+
+
+class ResultTally(models.Model):
+    """
+    Sharded count of how often a choice received a given rank.
+
+    Each ballot increments one bucket per choice in a randomly picked shard,
+    so concurrent respondents on the same survey rarely wait on the same row.
+    A shard always holds either every bucket for the survey or none of them.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    survey = models.ForeignKey(
+        Survey,
+        on_delete=models.CASCADE,
+        related_name='result_tallies'
+    )
+    choice = models.ForeignKey(
+        SurveyChoice,
+        on_delete=models.CASCADE,
+        related_name='result_tallies'
+    )
+    value = models.PositiveSmallIntegerField(
+        help_text='Rank (Ranked Choice) or stones (5 Stones) received'
+    )
+    shard = models.PositiveSmallIntegerField(default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'result_tallies'
+        unique_together = ['choice', 'value', 'shard']
+
+    def __str__(self):
+        return f"{self.choice_id} = {self.value}: {self.count} (shard {self.shard})"
+
+    @classmethod
+    def record_ballot(cls, survey, ballot):
+        """
+        Add one ballot to the tallies.
+
+        `ballot` is a list of (choice_id, value) pairs covering every choice.
+        Must be called inside the transaction that stores the answers.
+        """
+        shard = random.randrange(settings.RESULT_TALLY_SHARDS)
+        buckets = Q()
+        for choice_id, value in ballot:
+            buckets |= Q(choice_id=choice_id, value=value)
+
+        updated = cls.objects.filter(buckets, shard=shard).update(count=F('count') + 1)
+        if updated == len(ballot):
+            return
+
+        if updated == 0:
+            # First ballot to land in this shard: create all of its buckets
+            cls.create_buckets(survey, [choice_id for choice_id, _ in ballot], shard)
+            cls.objects.filter(buckets, shard=shard).update(count=F('count') + 1)
+        else:
+            logger.error(f"Result tally shard {shard} of survey {survey.id} is incomplete.")
+
+    @classmethod
+    def remove_ballot(cls, survey, ballot):
+        """
+        Take one ballot, as given to record_ballot(), back out of the tallies.
+
+        The ballot was added to a single shard, so it comes off a shard whose
+        buckets for it are all non-zero. Must be called inside the transaction
+        that deletes the response.
+        """
+        buckets = Q()
+        for choice_id, value in ballot:
+            buckets |= Q(choice_id=choice_id, value=value)
+
+        holding = cls.objects.filter(buckets, survey=survey, count__gt=0).values('shard').annotate(
+            buckets=Count('id')
+        ).filter(buckets=len(ballot)).order_by('shard')
+        shard = holding.values_list('shard', flat=True).first()
+        if shard is None:
+            logger.error(f"Result tallies of survey {survey.id} do not hold a deleted ballot.")
+            return
+        cls.objects.filter(buckets, survey=survey, shard=shard).update(count=F('count') - 1)
+
+    @classmethod
+    def create_buckets(cls, survey, choice_ids, shard, counts=None):
+        """Create every (choice, value) bucket of a shard, skipping existing ones."""
+        counts = counts or {}
+        cls.objects.bulk_create([
+            cls(
+                survey=survey,
+                choice_id=choice_id,
+                value=value,
+                shard=shard,
+                count=counts.get(choice_id, {}).get(value, 0)
+            )
+            for choice_id in choice_ids
+            for value in survey.tally_values(len(choice_ids))
+        ], ignore_conflicts=True)
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls, survey):
+        """Replace a survey's tallies with counts taken from its raw answers."""
+        histograms = survey._counted_histograms(list(survey.choices.values_list('id', flat=True)))
+        cls.objects.filter(survey=survey).delete()
+        cls.create_buckets(survey, list(histograms), shard=0, counts=histograms)
+        ResponseCounter.reset_ballots(survey, survey.count_ballots())
+        survey.bump_results_version()
+        return histograms
+
+
+class StonesAllocationTally(models.Model):
+    """
+    Sharded count of 5 Stones ballots per allocation code.
+
+    There are only 21 ways to place 5 stones on 3 choices, so a survey's
+    results fit in 21 cells per shard however many people respond; stone
+    totals and histograms are derived from these cells.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    survey = models.ForeignKey(
+        Survey,
+        on_delete=models.CASCADE,
+        related_name='allocation_tallies'
+    )
+    code = models.PositiveSmallIntegerField(
+        help_text='Index into STONE_ALLOCATIONS'
+    )
+    shard = models.PositiveSmallIntegerField(default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'stones_allocation_tallies'
+        unique_together = ['survey', 'code', 'shard']
+
+    def __str__(self):
+        return f"{STONE_ALLOCATIONS[self.code]}: {self.count} (shard {self.shard})"
+
+    @classmethod
+    def record_ballot(cls, survey, code):
+        """
+        Add one ballot with the given allocation code to the tallies.
+
+        Must be called inside the transaction that stores the response.
+        """
+        shard = random.randrange(settings.RESULT_TALLY_SHARDS)
+        cell = cls.objects.filter(survey=survey, code=code, shard=shard)
+        if not cell.update(count=F('count') + 1):
+            # First ballot to land in this shard: create all of its cells
+            cls.create_cells(survey, shard)
+            cell.update(count=F('count') + 1)
+
+    @classmethod
+    def remove_ballot(cls, survey, code):
+        """
+        Take one ballot with the given allocation code back out of the tallies.
+
+        Must be called inside the transaction that deletes the response.
+        """
+        pk = cls.objects.filter(survey=survey, code=code, count__gt=0).values_list('pk', flat=True).first()
+        if pk is None:
+            logger.error(f"Allocation tallies of survey {survey.id} do not hold a deleted ballot.")
+            return
+        cls.objects.filter(pk=pk).update(count=F('count') - 1)
+
+    @classmethod
+    def create_cells(cls, survey, shard, counts=None):
+        """Create every allocation cell of a shard, skipping existing ones."""
+        counts = counts or {}
+        cls.objects.bulk_create([
+            cls(survey=survey, code=code, shard=shard, count=counts.get(code, 0))
+            for code in range(len(STONE_ALLOCATIONS))
+        ], ignore_conflicts=True)
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls, survey):
+        """Replace a survey's allocation tallies with counts taken from its responses."""
+        counts = dict(
+            survey.responses.filter(stones_allocation__isnull=False).values_list(
+                'stones_allocation'
+            ).annotate(count=Count('id')).order_by()
+        )
+
+        # Responses stored before allocation codes existed only have answer rows
+        choice_ids = list(survey.choices.values_list('id', flat=True))
+        answers = FiveStonesAnswer.objects.filter(
+            response__survey=survey,
+            response__stones_allocation__isnull=True
+        ).order_by('response_id').values_list('response_id', 'choice_id', 'stones')
+        ballots = {}
+        for response_id, choice_id, stones in answers.iterator():
+            ballot = ballots.setdefault(response_id, [])
+            ballot.append((choice_id, stones))
+            if len(ballot) == len(choice_ids):
+                code = SurveyResponse.encode_allocation(choice_ids, ballots.pop(response_id))
+                counts[code] = counts.get(code, 0) + 1
+
+        cls.objects.filter(survey=survey).delete()
+        cls.create_cells(survey, shard=0, counts=counts)
+        ResponseCounter.reset_ballots(survey, survey.count_ballots())
+        survey.bump_results_version()
+        return counts
+
+
+class ResponseCounter(models.Model):
+    """
+    Sharded count of a survey's responses, and of the ballots in its tallies.
+
+    Each response adds one to a randomly picked shard instead of updating
+    the survey row, so concurrent respondents on the same survey rarely wait
+    on each other; the counts are sums over the shards. A deletion may
+    subtract from any shard, so a single shard can go negative.
+
+    `ballots` only counts responses over the current choices: it is reset
+    when the choices are replaced and set when the tallies are rebuilt.
+    get_results() checks the tallies against it.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    survey = models.ForeignKey(
+        Survey,
+        on_delete=models.CASCADE,
+        related_name='response_counters'
+    )
+    shard = models.PositiveSmallIntegerField(default=0)
+    responses = models.IntegerField(default=0)
+    ballots = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'response_counters'
+        unique_together = ['survey', 'shard']
+
+    def __str__(self):
+        return f"{self.survey_id}: {self.responses} (shard {self.shard})"
+
+    @classmethod
+    def adjust(cls, survey_id, delta, ballots=None):
+        """Add `delta` responses, `ballots` of them holding a ballot (default all), to a shard."""
+        if ballots is None:
+            ballots = delta
+        changes = {'responses': F('responses') + delta, 'ballots': F('ballots') + ballots}
+        shard = random.randrange(settings.RESULT_TALLY_SHARDS)
+        counter = cls.objects.filter(survey_id=survey_id, shard=shard)
+        if counter.update(**changes):
+            return
+
+        if delta > 0:
+            # First response to land in this shard
+            cls.objects.bulk_create([cls(survey_id=survey_id, shard=shard)], ignore_conflicts=True)
+            counter.update(**changes)
+        else:
+            # Take it off the largest shard
+            pk = cls.objects.filter(survey_id=survey_id).order_by('-responses').values_list(
+                'pk', flat=True
+            ).first()
+            cls.objects.filter(pk=pk).update(**changes)
+
+    @classmethod
+    def ballot_count(cls, survey):
+        """Return the number of ballots the survey's tallies should hold."""
+        return cls.objects.filter(survey=survey).aggregate(total=Sum('ballots'))['total'] or 0
+
+    @classmethod
+    def reset_ballots(cls, survey, count=0):
+        """Set the survey's ballot count, keeping all of it in shard 0."""
+        cls.objects.filter(survey=survey).update(ballots=0)
+        if count:
+            cls.objects.bulk_create([cls(survey=survey, shard=0)], ignore_conflicts=True)
+            cls.objects.filter(survey=survey, shard=0).update(ballots=count)
+
+
+class SurveyAudience(models.Model):
+    """
+    Who can see a survey and why: one row per (user, survey, relation).
+
+    Kept up to date as surveys are created or moved to another group, group
+    memberships change and invitations are linked to accounts, so the
+    surveys visible to a user are one indexed lookup on this table.
+    rebuild_survey_audience recomputes it from scratch.
+    """
+
+    class Relation(models.TextChoices):
+        AUTHOR = 'author', 'Author'
+        MEMBER = 'member', 'Distribution group member'
+        INVITED = 'invited', 'Invited'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='survey_audience'
+    )
+    survey = models.ForeignKey(
+        Survey,
+        on_delete=models.CASCADE,
+        related_name='audience'
+    )
+    relation = models.CharField(max_length=10, choices=Relation.choices)
+
+    class Meta:
+        db_table = 'survey_audience'
+        unique_together = ['user', 'survey', 'relation']
+
+    def __str__(self):
+        return f"{self.user_id} {self.relation} {self.survey_id}"
+
+    @classmethod
+    def add(cls, rows, batch_size=1000):
+        """Insert (user_id, survey_id, relation) rows, skipping existing ones."""
+        batch = []
+        for user_id, survey_id, relation in rows:
+            batch.append(cls(user_id=user_id, survey_id=survey_id, relation=relation))
+            if len(batch) >= batch_size:
+                cls.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        if batch:
+            cls.objects.bulk_create(batch, ignore_conflicts=True)
+
+    @classmethod
+    def sync_survey(cls, survey):
+        """Replace the author and member rows of a new or reassigned survey."""
+        from apps.groups.models import GroupMember
+
+        cls.objects.filter(survey=survey).exclude(relation=cls.Relation.INVITED).delete()
+        rows = [(survey.author_id, survey.pk, cls.Relation.AUTHOR)]
+        if survey.distribution_group_id:
+            user_ids = GroupMember.objects.filter(
+                group_id=survey.distribution_group_id,
+                user__isnull=False
+            ).values_list('user_id', flat=True)
+            rows.extend((user_id, survey.pk, cls.Relation.MEMBER) for user_id in user_ids)
+        cls.add(rows)
+
+    @classmethod
+    def add_members(cls, group_id, user_ids):
+        """Give users who joined a group the member relation to its surveys."""
+        if not user_ids:
+            return
+        survey_ids = list(Survey.objects.filter(distribution_group_id=group_id).values_list('id', flat=True))
+        cls.add(
+            (user_id, survey_id, cls.Relation.MEMBER)
+            for survey_id in survey_ids
+            for user_id in user_ids
+        )
+
+    @classmethod
+    def remove_members(cls, group_id, user_ids=None):
+        """Drop the member relation of users (default: everyone) who left a group."""
+        rows = cls.objects.filter(
+            survey__distribution_group_id=group_id,
+            relation=cls.Relation.MEMBER
+        )
+        if user_ids is not None:
+            rows = rows.filter(user_id__in=user_ids)
+        rows.delete()
+
+    @classmethod
+    def add_user(cls, user):
+        """Add the rows of a user whose memberships and invitations were just linked."""
+        survey_ids = Survey.objects.filter(
+            distribution_group__members__user=user
+        ).values_list('id', flat=True)
+        cls.add((user.pk, survey_id, cls.Relation.MEMBER) for survey_id in survey_ids)
+        survey_ids = user.anonymous_invitations.values_list('survey_id', flat=True)
+        cls.add((user.pk, survey_id, cls.Relation.INVITED) for survey_id in survey_ids)
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls):
+        """Recompute every row from survey authors, group members and invitations."""
+        cls.objects.all().delete()
+        authors = Survey.objects.values_list('author_id', 'id')
+        cls.add((user_id, survey_id, cls.Relation.AUTHOR) for user_id, survey_id in authors.iterator())
+        members = Survey.objects.filter(
+            distribution_group__members__user__isnull=False
+        ).values_list('distribution_group__members__user_id', 'id')
+        cls.add((user_id, survey_id, cls.Relation.MEMBER) for user_id, survey_id in members.iterator())
+        invited = AnonymousInvitation.objects.filter(user__isnull=False).values_list('user_id', 'survey_id')
+        cls.add((user_id, survey_id, cls.Relation.INVITED) for user_id, survey_id in invited.iterator())
+        return cls.objects.count()
@@ -2,12 +2,15 @@
 Serializers for the surveys app.
 """
 from rest_framework import serializers
-from django.db import transaction
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from .models import (
     Survey, SurveyChoice, SurveyResponse,
-    RankedChoiceAnswer, FiveStonesAnswer, AnonymousInvitation
+    RankedChoiceAnswer, FiveStonesAnswer, AnonymousInvitation, ResultTally,
+    StonesAllocationTally, ResponseCounter
 )
+from .cache import get_survey_definition
 from apps.themes.serializers import ThemeSerializer
 from apps.groups.serializers import DistributionGroupListSerializer
 
@@ -114,6 +117,7 @@ class SurveyCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         choices_data = validated_data.pop('choices')
         validated_data['author'] = self.context['request'].user
+        validated_data['ballot_storage'] = settings.SURVEY_BALLOT_STORAGE
 
         survey = Survey.objects.create(**validated_data)
 
@@ -131,9 +135,9 @@ class SurveyCreateSerializer(serializers.ModelSerializer):
             from .utils import create_anonymous_invitations
             create_anonymous_invitations(survey)
 
-        # Send notification emails
-        from .utils import send_survey_notifications
-        send_survey_notifications(survey, is_new=True)
+        # Queue notification emails once the survey is committed
+        from .utils import queue_survey_notifications
+        transaction.on_commit(lambda: queue_survey_notifications(survey, is_new=True))
 
         return survey
 
@@ -181,15 +185,14 @@ class SurveyUpdateSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         choices_data = validated_data.pop('choices', None)
 
-        # Update survey fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-
-        # Update choices if provided
+        # Replace choices (if provided) and their ballots before saving, so the
+        # definition dropped by save() is only rebuilt with the new choices
         if choices_data is not None:
-            # Delete existing choices
+            # Delete existing choices (their answer rows go with them)
             instance.choices.all().delete()
+            instance.responses.update(packed_ranking='', stones_allocation=None)
+            instance.allocation_tallies.all().delete()
+            ResponseCounter.reset_ballots(instance)
 
             # Create new choices
             for i, choice_data in enumerate(choices_data):
@@ -199,10 +202,16 @@ class SurveyUpdateSerializer(serializers.ModelSerializer):
                     url=choice_data.get('url', ''),
                     order=i + 1
                 )
+            instance.bump_results_version()
 
-        # Send update notifications
-        from .utils import send_survey_notifications
-        send_survey_notifications(instance, is_new=False)
+        # Update survey fields
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save()
+
+        # Queue update notifications once the changes are committed
+        from .utils import queue_survey_notifications
+        transaction.on_commit(lambda: queue_survey_notifications(instance, is_new=False))
 
         return instance
 
@@ -213,18 +222,28 @@ class SurveyListSerializer(serializers.ModelSerializer):
     author_name = serializers.SerializerMethodField()
     response_count = serializers.ReadOnlyField()
     is_expired = serializers.ReadOnlyField()
+    has_responded = serializers.SerializerMethodField()
+    can_respond = serializers.SerializerMethodField()
 
     class Meta:
         model = Survey
         fields = [
             'id', 'title', 'survey_type', 'author', 'author_name',
             'is_anonymous', 'results_public', 'deadline',
-            'is_active', 'is_expired', 'response_count', 'created_at'
+            'is_active', 'is_expired', 'response_count', 'created_at',
+            'has_responded', 'can_respond'
         ]
 
     def get_author_name(self, obj):
         return obj.author.full_name
 
+    def get_has_responded(self, obj):
+        # Set by SurveyQuerySet.with_response_status()
+        return getattr(obj, 'has_responded', False)
+
+    def get_can_respond(self, obj):
+        return not self.get_has_responded(obj) and obj.is_active and not obj.is_expired
+
 
 class RankedChoiceAnswerSerializer(serializers.Serializer):
     """Serializer for ranked choice answers."""
@@ -240,6 +259,20 @@ class FiveStonesAnswerSerializer(serializers.Serializer):
     stones = serializers.IntegerField(min_value=0, max_value=5)
 
 
+INVALID_TOKEN_ERROR = {
+    'error_code': 'INVALID_TOKEN',
+    'message': "This survey link has already been used or is invalid. Each invitation link can only be used once."
+}
+ALREADY_RESPONDED_ERROR = {
+    'error_code': 'ALREADY_RESPONDED',
+    'message': "You have already submitted a response to this survey. Each person can only respond once."
+}
+SURVEY_CHANGED_ERROR = {
+    'error_code': 'SURVEY_CHANGED',
+    'message': "This survey's choices have changed since it was loaded. Please reload it and respond again."
+}
+
+
 class SurveyResponseCreateSerializer(serializers.Serializer):
     """Serializer for submitting survey responses."""
 
@@ -266,20 +299,22 @@ class SurveyResponseCreateSerializer(serializers.Serializer):
             })
 
         # Validate based on survey type
+        definition = get_survey_definition(survey.pk)
+        attrs['choice_ids'] = definition.choice_ids
         if survey.survey_type == Survey.SurveyType.RANKED_CHOICE:
             if 'ranked_answers' not in attrs or not attrs['ranked_answers']:
                 raise serializers.ValidationError(
                     "Ranked answers are required for this survey type."
                 )
-            self._validate_ranked_answers(attrs['ranked_answers'], survey)
+            self._validate_ranked_answers(attrs['ranked_answers'], definition.choice_id_set)
         else:
             if 'stones_answers' not in attrs or not attrs['stones_answers']:
                 raise serializers.ValidationError(
                     "Stones answers are required for this survey type."
                 )
-            self._validate_stones_answers(attrs['stones_answers'], survey)
+            self._validate_stones_answers(attrs['stones_answers'], definition.choice_id_set)
 
-        # Check for duplicate responses
+        # Duplicate responses are caught when the response is saved
         if token:
             invitation = AnonymousInvitation.objects.filter(
                 survey=survey,
@@ -287,18 +322,9 @@ class SurveyResponseCreateSerializer(serializers.Serializer):
                 is_used=False
             ).first()
             if not invitation:
-                raise serializers.ValidationError({
-                    'error_code': 'INVALID_TOKEN',
-                    'message': "This survey link has already been used or is invalid. Each invitation link can only be used once."
-                })
+                raise serializers.ValidationError(INVALID_TOKEN_ERROR)
             attrs['invitation'] = invitation
-        elif user:
-            if SurveyResponse.objects.filter(survey=survey, user=user).exists():
-                raise serializers.ValidationError({
-                    'error_code': 'ALREADY_RESPONDED',
-                    'message': "You have already submitted a response to this survey. Each person can only respond once."
-                })
-        else:
+        elif not user:
             raise serializers.ValidationError({
                 'error_code': 'AUTH_REQUIRED',
                 'message': "Please sign in to take this survey, or use the unique link from your invitation email."
@@ -306,9 +332,8 @@ class SurveyResponseCreateSerializer(serializers.Serializer):
 
         return attrs
 
-    def _validate_ranked_answers(self, answers, survey):
-        """Validate ranked choice answers."""
-        choice_ids = set(survey.choices.values_list('id', flat=True))
+    def _validate_ranked_answers(self, answers, choice_ids):
+        """Validate ranked choice answers against the set of choice ids."""
         answer_choice_ids = set()
         ranks = set()
 
@@ -336,10 +361,13 @@ class SurveyResponseCreateSerializer(serializers.Serializer):
             raise serializers.ValidationError(
                 "All choices must be ranked."
             )
+        if ranks != set(range(1, len(choice_ids) + 1)):
+            raise serializers.ValidationError(
+                "Ranks must run from 1 to the number of choices."
+            )
 
-    def _validate_stones_answers(self, answers, survey):
-        """Validate 5 stones answers."""
-        choice_ids = set(survey.choices.values_list('id', flat=True))
+    def _validate_stones_answers(self, answers, choice_ids):
+        """Validate 5 stones answers against the set of choice ids."""
         answer_choice_ids = set()
         total_stones = 0
 
@@ -383,34 +411,72 @@ class SurveyResponseCreateSerializer(serializers.Serializer):
         else:
             ip_address = request.META.get('REMOTE_ADDR')
 
-        # Create response record
-        response = SurveyResponse.objects.create(
-            survey=survey,
-            user=user if not survey.is_anonymous else None,
-            anonymous_email=invitation.email if invitation else '',
-            ip_address=ip_address if not survey.is_anonymous else None
-        )
-
-        # Create answers
+        packed_ranking = ''
+        stones_allocation = None
         if survey.survey_type == Survey.SurveyType.RANKED_CHOICE:
-            for answer_data in validated_data['ranked_answers']:
-                RankedChoiceAnswer.objects.create(
-                    response=response,
-                    choice_id=answer_data['choice_id'],
-                    rank=answer_data['rank']
-                )
+            ballot = [
+                (answer_data['choice_id'], answer_data['rank'])
+                for answer_data in validated_data['ranked_answers']
+            ]
+            packed_ranking = SurveyResponse.pack_ranking(validated_data['choice_ids'], ballot)
         else:
-            for answer_data in validated_data['stones_answers']:
-                FiveStonesAnswer.objects.create(
-                    response=response,
-                    choice_id=answer_data['choice_id'],
-                    stones=answer_data['stones']
-                )
-
-        # Mark invitation as used
+            ballot = [
+                (answer_data['choice_id'], answer_data['stones'])
+                for answer_data in validated_data['stones_answers']
+            ]
+            stones_allocation = SurveyResponse.encode_allocation(validated_data['choice_ids'], ballot)
+
+        # The answers were validated against the cached definition; choices
+        # replaced since then would misplace a packed ballot
+        if tuple(survey.choices.values_list('id', flat=True)) != validated_data['choice_ids']:
+            raise serializers.ValidationError(SURVEY_CHANGED_ERROR)
+
+        # Claim the invitation; only one request can flip is_used
         if invitation:
-            invitation.mark_used()
-        elif user:
+            claimed = AnonymousInvitation.objects.filter(
+                pk=invitation.pk,
+                is_used=False
+            ).update(is_used=True, used_at=timezone.now())
+            if not claimed:
+                raise serializers.ValidationError(INVALID_TOKEN_ERROR)
+
+        # Create response record (the unique constraint rejects duplicates)
+        try:
+            response = SurveyResponse.objects.create(
+                survey=survey,
+                user=user if not survey.is_anonymous else None,
+                anonymous_email=invitation.email if invitation else '',
+                ip_address=ip_address if not survey.is_anonymous else None,
+                packed_ranking=packed_ranking,
+                stones_allocation=stones_allocation
+            )
+        except IntegrityError:
+            raise serializers.ValidationError(ALREADY_RESPONDED_ERROR)
+
+        # Create answers and update the running result tallies (a choice
+        # deleted by a concurrent edit fails their foreign keys)
+        try:
+            if survey.ballot_storage == Survey.BallotStorage.ROWS:
+                if survey.survey_type == Survey.SurveyType.RANKED_CHOICE:
+                    RankedChoiceAnswer.objects.bulk_create([
+                        RankedChoiceAnswer(response=response, choice_id=choice_id, rank=rank)
+                        for choice_id, rank in ballot
+                    ])
+                else:
+                    FiveStonesAnswer.objects.bulk_create([
+                        FiveStonesAnswer(response=response, choice_id=choice_id, stones=stones)
+                        for choice_id, stones in ballot
+                    ])
+
+            if survey.survey_type == Survey.SurveyType.RANKED_CHOICE:
+                ResultTally.record_ballot(survey, ballot)
+            else:
+                StonesAllocationTally.record_ballot(survey, stones_allocation)
+        except IntegrityError:
+            raise serializers.ValidationError(SURVEY_CHANGED_ERROR)
+        survey.bump_results_version()
+
+        if user and not invitation:
             # Also mark any invitation for this user's email as used
             # This prevents double-responding via token after responding while logged in
             AnonymousInvitation.objects.filter(
@@ -423,7 +489,12 @@ class SurveyResponseCreateSerializer(serializers.Serializer):
 
 
 class SurveyResponseSerializer(serializers.ModelSerializer):
-    """Serializer for viewing survey responses."""
+    """
+    Serializer for viewing survey responses.
+
+    Expects responses loaded with SurveyResponseQuerySet.with_answers() and
+    the survey's choices, in order, as the `choices` context.
+    """
 
     user_name = serializers.SerializerMethodField()
     ranked_answers = serializers.SerializerMethodField()
@@ -442,14 +513,26 @@ class SurveyResponseSerializer(serializers.ModelSerializer):
         return None
 
     def get_ranked_answers(self, obj):
-        answers = obj.ranked_answers.select_related('choice').all()
+        if obj.packed_ranking:
+            choices = self.context.get('choices') or list(obj.survey.choices.all())
+            return [
+                {'choice': choice.text, 'rank': rank}
+                for choice, rank in obj.unpack_ranking(choices)
+            ]
+        answers = obj.ranked_answers.all()
         return [
             {'choice': answer.choice.text, 'rank': answer.rank}
             for answer in answers
         ]
 
     def get_stones_answers(self, obj):
-        answers = obj.stones_answers.select_related('choice').all()
+        if obj.stones_allocation is not None:
+            choices = self.context.get('choices') or list(obj.survey.choices.all())
+            return [
+                {'choice': choice.text, 'stones': stones}
+                for choice, stones in obj.decode_allocation(choices)
+            ]
+        answers = obj.stones_answers.all()
         return [
             {'choice': answer.choice.text, 'stones': answer.stones}
             for answer in answers
@@ -470,11 +553,45 @@ class AnonymousInvitationSerializer(serializers.ModelSerializer):
         ]
 
 
+class ChoiceResultSerializer(serializers.Serializer):
+    """
+    Serializer for one choice's aggregated results.
+
+    In delta results (?since_version=N) only `id` and the changed fields are set.
+    """
+
+    id = serializers.UUIDField()
+    text = serializers.CharField(required=False)
+    score = serializers.IntegerField(required=False, help_text='Borda points (ranked choice)')
+    stones = serializers.IntegerField(required=False, help_text='Total stones (5 stones)')
+    histogram = serializers.ListField(
+        child=serializers.IntegerField(), required=False,
+        help_text='Responses per rank 1..N (ranked choice) or per stone count 0..5 (5 stones)'
+    )
+    rankings = serializers.ListField(
+        child=serializers.IntegerField(), required=False,
+        help_text='Every rank received, only with ?detail=raw'
+    )
+    distribution = serializers.ListField(
+        child=serializers.IntegerField(), required=False,
+        help_text='Every stone count received, only with ?detail=raw'
+    )
+
+
 class SurveyResultsSerializer(serializers.Serializer):
     """Serializer for survey results."""
 
     type = serializers.CharField()
     method = serializers.CharField(required=False)
+    version = serializers.IntegerField()
+    since_version = serializers.IntegerField(
+        required=False,
+        help_text='Set when `results` only lists choices changed since this version'
+    )
     total_responses = serializers.IntegerField()
     total_stones = serializers.IntegerField(required=False)
-    results = serializers.ListField()
+    results = ChoiceResultSerializer(many=True)
+    removed = serializers.ListField(
+        child=serializers.UUIDField(), required=False,
+        help_text='With `since_version`: ids of the choices removed since that version'
+    )
@@ -0,0 +1,69 @@
+"""
+Signal receivers that keep the stored counters in step with surveys and responses.
+
+They run for cascades and queryset deletes too, which overridden save()
+and delete() methods would miss.
+
+Responses cascading from a deleted survey skip the per-response work: their
+counters and tallies go with the survey, and their respondents' stats are
+adjusted once for the whole survey.
+"""
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.users.models import UserStats
+from .models import Survey, SurveyResponse, ResponseCounter, ResultTally, StonesAllocationTally
+
+
+@receiver(post_save, sender=Survey)
+def survey_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.adjust(instance.author_id, authored_surveys=1)
+
+
+@receiver(pre_delete, sender=Survey)
+def survey_deleting(sender, instance, **kwargs):
+    respondents = instance.responses.filter(user__isnull=False).values('user_id')
+    UserStats.adjust_many(respondents, responses_submitted=-1)
+
+
+@receiver(post_delete, sender=Survey)
+def survey_deleted(sender, instance, **kwargs):
+    UserStats.adjust(instance.author_id, authored_surveys=-1)
+
+
+@receiver(post_save, sender=SurveyResponse)
+def response_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        instance.survey.adjust_response_count(1)
+        UserStats.adjust(instance.user_id, responses_submitted=1)
+
+
+def _deleted_with_survey(origin):
+    """Whether a response deletion cascades from its survey (or the survey's author)."""
+    if origin is None:
+        return False
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is not SurveyResponse
+
+
+@receiver(pre_delete, sender=SurveyResponse)
+def response_deleting(sender, instance, origin=None, **kwargs):
+    if _deleted_with_survey(origin):
+        return
+    # Legacy ballots are read from answer rows, which go before post_delete
+    ballot = instance.held_ballot()
+    if ballot is not None:
+        if instance.survey.survey_type == Survey.SurveyType.RANKED_CHOICE:
+            ResultTally.remove_ballot(instance.survey, ballot)
+        else:
+            StonesAllocationTally.remove_ballot(instance.survey, ballot)
+    ResponseCounter.adjust(instance.survey_id, -1, ballots=0 if ballot is None else -1)
+
+
+@receiver(post_delete, sender=SurveyResponse)
+def response_deleted(sender, instance, origin=None, **kwargs):
+    if _deleted_with_survey(origin):
+        return
+    UserStats.adjust(instance.user_id, responses_submitted=-1)
@@ -0,0 +1,128 @@
+"""
+Live results streaming (Server-Sent Events) for the surveys app.
+"""
+import json
+import time
+import asyncio
+import threading
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Seconds between keepalives; also how stale a snapshot may get when the
+# response that changed it was handled by another process.
+STREAM_HEARTBEAT = 15
+
+
+class ResultsBroadcaster:
+    """
+    In-process pub/sub that fans one results snapshot out to every stream.
+
+    Writers call publish() once a response has committed. All streams
+    watching that survey wake up, the first to ask for the new snapshot
+    computes it and the others await the same future, so any number of
+    watchers costs one recomputation per change.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # survey_id -> {loop: set of asyncio.Event}
+        self._subscribers = {}
+        # The following are only touched from the event loop thread
+        self._snapshots = {}  # survey_id -> (version, payload, fetched_at)
+        self._pending = {}  # survey_id -> asyncio.Future
+
+    def subscribe(self, survey_id, event):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers.setdefault(survey_id, {}).setdefault(loop, set()).add(event)
+
+    def unsubscribe(self, survey_id, event):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            loops = self._subscribers.get(survey_id, {})
+            events = loops.get(loop, set())
+            events.discard(event)
+            if not events:
+                loops.pop(loop, None)
+            if not loops:
+                self._subscribers.pop(survey_id, None)
+                self._snapshots.pop(survey_id, None)
+
+    def publish(self, survey_id):
+        """Tell every stream of a survey that its results changed. Thread-safe."""
+        with self._lock:
+            loops = list(self._subscribers.get(survey_id, {}))
+        for loop in loops:
+            loop.call_soon_threadsafe(self._invalidate, survey_id, loop)
+
+    def _invalidate(self, survey_id, loop):
+        self._snapshots.pop(survey_id, None)
+        with self._lock:
+            events = list(self._subscribers.get(survey_id, {}).get(loop, ()))
+        for event in events:
+            event.set()
+
+    async def snapshot(self, survey_id, max_age=STREAM_HEARTBEAT):
+        """Return (version, payload) for a survey, loading it at most once at a time."""
+        cached = self._snapshots.get(survey_id)
+        if cached and time.monotonic() - cached[2] < max_age:
+            return cached[:2]
+
+        pending = self._pending.get(survey_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._load(survey_id, cached))
+            self._pending[survey_id] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(survey_id, None))
+        return await asyncio.shield(pending)
+
+    async def _load(self, survey_id, cached):
+        version, payload = await sync_to_async(load_results_snapshot)(
+            survey_id, cached[:2] if cached else None
+        )
+        self._snapshots[survey_id] = (version, payload, time.monotonic())
+        return version, payload
+
+
+def load_results_snapshot(survey_id, previous=None):
+    """Return (version, serialized results), reusing `previous` if still current."""
+    from .cache import get_survey_results
+    from .models import Survey
+    from .serializers import SurveyResultsSerializer
+
+    survey = Survey.objects.get(pk=survey_id)
+    if previous and previous[0] == survey.results_version:
+        return previous
+    results = get_survey_results(survey)
+    return survey.results_version, SurveyResultsSerializer(results).data
+
+
+results_broadcaster = ResultsBroadcaster()
+
+
+async def results_events(survey_id, broadcaster=results_broadcaster):
+    """Yield SSE messages: a results event per new version, keepalives otherwise."""
+    from .models import Survey
+
+    event = asyncio.Event()
+    broadcaster.subscribe(survey_id, event)
+    try:
+        last_version = None
+        while True:
+            event.clear()
+            try:
+                version, payload = await broadcaster.snapshot(survey_id)
+            except Survey.DoesNotExist:
+                return
+            if version != last_version:
+                last_version = version
+                data = json.dumps(payload, cls=DjangoJSONEncoder)
+                yield f"event: results\nid: {version}\ndata: {data}\n\n"
+            else:
+                yield ": keepalive\n\n"
+
+            try:
+                await asyncio.wait_for(event.wait(), STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        broadcaster.unsubscribe(survey_id, event)
@@ -1,14 +1,63 @@
 """
 Tests for the surveys app.
 """
-from django.test import TestCase
+import csv
+import json
+import asyncio
+import threading
+from io import StringIO
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.exceptions import ValidationError
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Q
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
 from apps.users.models import User
 from apps.themes.models import Theme
-from apps.groups.models import DistributionGroup
-from .models import Survey, SurveyChoice, SurveyResponse, RankedChoiceAnswer, FiveStonesAnswer
+from apps.groups.models import DistributionGroup, GroupMember
+from .models import (
+    Survey, SurveyChoice, SurveyResponse, RankedChoiceAnswer, FiveStonesAnswer, ResultTally,
+    StonesAllocationTally, AnonymousInvitation, SurveyAudience, ResponseCounter, STONE_ALLOCATIONS
+)
+from .serializers import SurveyResponseCreateSerializer
+from .cache import get_survey_results, results_cache_stats, get_survey_definition
+from .streams import ResultsBroadcaster, results_broadcaster, results_events
+
+
+class SurveyFixtures:
+    """Users, and surveys with their choices, shared by the test cases below."""
+
+    def create_user(self, username):
+        return User.objects.create_user(
+            email=f'{username}@example.com',
+            username=username,
+            password='testpass123',
+            first_name=username.capitalize(),
+            last_name='User'
+        )
+
+    def create_survey(self, author, choices=('Option 1', 'Option 2', 'Option 3'), **fields):
+        """Create a survey with the given choice texts, in order. Returns (survey, choices)."""
+        fields = {
+            'title': 'Ranked Survey',
+            'question': 'Rank these options',
+            'survey_type': Survey.SurveyType.RANKED_CHOICE,
+            **fields
+        }
+        survey = Survey.objects.create(author=author, **fields)
+        return survey, [
+            SurveyChoice.objects.create(survey=survey, text=text, order=i)
+            for i, text in enumerate(choices, start=1)
+        ]
 
 
 class SurveyModelTests(TestCase):
@@ -107,6 +156,41 @@ class SurveyModelTests(TestCase):
         # Option A should have highest stones (3)
         self.assertEqual(results['results'][0]['stones'], 3)
 
+    def test_gapped_legacy_ranking_counts_as_last_place(self):
+        """Test that a legacy rank past the number of choices counts as last place."""
+        survey = Survey.objects.create(title='Ranked Survey', question='Rank these', author=self.user)
+        choices = [
+            SurveyChoice.objects.create(survey=survey, text=f'Option {i}', order=i)
+            for i in range(1, 4)
+        ]
+        response = SurveyResponse.objects.create(survey=survey, user=self.user)
+        for choice, rank in zip(choices, [1, 2, 4]):
+            RankedChoiceAnswer.objects.create(response=response, choice=choice, rank=rank)
+
+        results = survey.get_results()
+        histograms = {result['text']: result['histogram'] for result in results['results']}
+        self.assertEqual(histograms['Option 3'], [0, 0, 1])
+        self.assertEqual(results['results'][-1]['score'], 1)
+
+        ResultTally.rebuild(survey)
+        self.assertEqual(survey.get_results()['results'], results['results'])
+
+    def test_save_writes_loaded_fields_only(self):
+        """Test that saving leaves the results version and deferred fields alone without loading them."""
+        survey = Survey.objects.create(title='Survey', question='Question', author=self.user)
+        Survey.objects.filter(pk=survey.pk).update(results_version=3, description='Newer')
+
+        survey = Survey.objects.only('id', 'title', 'author_id', 'distribution_group_id').get(pk=survey.pk)
+        survey.title = 'Renamed'
+        with CaptureQueriesContext(connection) as queries:
+            survey.save()
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('SELECT', ' '.join(query['sql'] for query in queries.captured_queries))
+
+        survey = Survey.objects.get(pk=survey.pk)
+        self.assertEqual((survey.title, survey.description, survey.results_version), ('Renamed', 'Newer', 3))
+
 
 class SurveyAPITests(APITestCase):
     """Tests for survey API endpoints."""
@@ -178,6 +262,327 @@ class SurveyAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)
 
+    def test_list_reads_stored_response_counts(self):
+        """Test that listing surveys does not count responses per survey."""
+        self.client.force_authenticate(user=self.user)
+        for i in range(3):
+            survey = Survey.objects.create(
+                title=f'Survey {i}',
+                question='Test question',
+                author=self.user
+            )
+            for _ in range(i):
+                SurveyResponse.objects.create(survey=survey)
+
+        url = reverse('survey-list')
+        # one keyset page, no COUNT
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        counts = {survey['title']: survey['response_count'] for survey in response.data['results']}
+        self.assertEqual(counts, {'Survey 0': 0, 'Survey 1': 1, 'Survey 2': 2})
+
+    def test_my_surveys_queries_do_not_grow_with_surveys(self):
+        """Test that the my-surveys view takes a fixed number of queries."""
+        group = DistributionGroup.objects.create(name='Group', owner=self.other_user)
+        group.add_member(self.user.email)
+        for i in range(3):
+            Survey.objects.create(title=f'Mine {i}', question='Question', author=self.user)
+            Survey.objects.create(
+                title=f'Invited {i}', question='Question', author=self.other_user,
+                distribution_group=group
+            )
+
+        self.client.force_authenticate(user=self.user)
+        # authored, invited
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('my-surveys'))
+        self.assertEqual(len(response.data['authored']), 3)
+        self.assertEqual(len(response.data['invited']), 3)
+        self.assertEqual(response.data['invited'][0]['author_name'], 'Other User')
+
+    def test_listings_include_response_status(self):
+        """Test that listed surveys carry has_responded/can_respond for the user."""
+        answered = Survey.objects.create(title='Answered', question='Question', author=self.other_user)
+        SurveyResponse.objects.create(survey=answered, user=self.user)
+        SurveyResponse.objects.create(
+            survey=Survey.objects.create(title='Pending', question='Question', author=self.other_user),
+            user=self.other_user
+        )
+        Survey.objects.create(title='Closed', question='Question', author=self.other_user, is_active=False)
+        SurveyAudience.add(
+            (self.user.id, survey_id, SurveyAudience.Relation.MEMBER)
+            for survey_id in Survey.objects.values_list('id', flat=True)
+        )
+
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('survey-list'))
+        status_by_title = {
+            survey['title']: (survey['has_responded'], survey['can_respond'])
+            for survey in response.data['results']
+        }
+        self.assertEqual(status_by_title, {
+            'Answered': (True, False),
+            'Pending': (False, True),
+            'Closed': (False, False),
+        })
+
+        response = self.client.get(reverse('my-surveys'), {'type': 'invited'})
+        self.assertEqual(
+            {survey['title'] for survey in response.data['invited'] if survey['has_responded']},
+            {'Answered'}
+        )
+
+    def test_my_surveys_pages_each_list_by_cursor(self):
+        """Test that my-surveys pages authored and invited surveys separately."""
+        for i in range(25):
+            Survey.objects.create(title=f'Mine {i}', question='Question', author=self.user)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('my-surveys'))
+        self.assertEqual(len(response.data['authored']), 20)
+        self.assertEqual(response.data['invited'], [])
+        self.assertIsNone(response.data['invited_next'])
+
+        next_url = response.data['authored_next']
+        self.assertIn('authored_cursor=', next_url)
+        response = self.client.get(next_url)
+        self.assertNotIn('invited', response.data)
+        self.assertEqual(len(response.data['authored']), 5)
+        self.assertIsNone(response.data['authored_next'])
+
+    def test_responses_are_paged_by_cursor(self):
+        """Test that individual responses are returned a page at a time."""
+        survey = Survey.objects.create(title='Survey', question='Question', author=self.user)
+        for _ in range(25):
+            SurveyResponse.objects.create(survey=survey)
+
+        self.client.force_authenticate(user=self.user)
+        url = reverse('survey-responses', args=[survey.id])
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertNotIn('count', response.data)
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+    def _survey_with_row_ballots(self, count):
+        survey = Survey.objects.create(title='Survey', question='Question', author=self.user)
+        choices = [
+            SurveyChoice.objects.create(survey=survey, text=f'Option {i}', order=i)
+            for i in range(1, 4)
+        ]
+        for i in range(count):
+            response = SurveyResponse.objects.create(survey=survey, user=User.objects.create_user(
+                email=f'voter{i}@example.com',
+                username=f'voter{i}',
+                first_name='Voter',
+                last_name=str(i)
+            ))
+            for rank, choice in enumerate(choices, start=1):
+                RankedChoiceAnswer.objects.create(response=response, choice=choice, rank=rank)
+        return survey
+
+    def test_responses_queries_do_not_grow_with_page_size(self):
+        """Test that a page of responses loads users and answers up front."""
+        survey = self._survey_with_row_ballots(5)
+
+        self.client.force_authenticate(user=self.user)
+        # survey, choices, page with users, answers with choices
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('survey-responses', args=[survey.id]))
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(
+            response.data['results'][0]['ranked_answers'],
+            [{'choice': f'Option {i}', 'rank': i} for i in range(1, 4)]
+        )
+        self.assertTrue(response.data['results'][0]['user_name'].startswith('Voter'))
+
+    async def test_export_streams_all_responses(self):
+        """Test that the export streams every response as one JSON array."""
+        survey = await sync_to_async(self._survey_with_row_ballots)(3)
+        token = str(AccessToken.for_user(self.user))
+        url = reverse('survey-responses-export', args=[survey.id])
+
+        response = await self.async_client.get(url, headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        exported = json.loads(body)
+        self.assertEqual(len(exported), 3)
+        self.assertEqual([answer['rank'] for answer in exported[0]['ranked_answers']], [1, 2, 3])
+
+        other_token = str(AccessToken.for_user(self.other_user))
+        response = await self.async_client.get(url, headers={'Authorization': f'Bearer {other_token}'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        # Tokens in the URL are only accepted by the results stream
+        response = await self.async_client.get(url, {'access_token': token})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_chunks_form_one_array(self):
+        """Test that responses split over several chunks still form valid JSON."""
+        from .views import _response_export_chunks
+
+        survey = self._survey_with_row_ballots(5)
+        chunks = list(_response_export_chunks(survey, chunk_size=2))
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(len(json.loads(''.join(chunks))), 5)
+
+    async def test_export_streams_one_csv_row_per_ballot(self):
+        """Test the CSV export: choices as columns, row and packed ballots alike."""
+        def create_survey():
+            survey = self._survey_with_row_ballots(2)
+            choice_ids = list(survey.choices.values_list('id', flat=True))
+            SurveyResponse.objects.create(
+                survey=survey,
+                anonymous_email='guest@example.com',
+                packed_ranking=SurveyResponse.pack_ranking(choice_ids, zip(choice_ids, [3, 1, 2]))
+            )
+            return survey
+
+        survey = await sync_to_async(create_survey)()
+        token = str(AccessToken.for_user(self.user))
+        url = reverse('survey-export', args=[survey.id])
+
+        headers = {'Authorization': f'Bearer {token}'}
+        response = await self.async_client.get(url, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        header, *rows = list(csv.reader(StringIO(body)))
+        self.assertEqual(
+            header,
+            ['response_id', 'submitted_at', 'respondent', 'email', 'Option 1', 'Option 2', 'Option 3']
+        )
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0][3:], ['guest@example.com', '3', '1', '2'])
+        self.assertEqual(rows[1][4:], ['1', '2', '3'])
+        self.assertTrue(rows[1][2].startswith('Voter'))
+
+        response = await self.async_client.get(url, {'format': 'xml'}, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_of_anonymous_survey_omits_respondents(self):
+        """Test that anonymous surveys export ballots only."""
+        from .exports import export_ballots
+
+        survey = Survey.objects.create(
+            title='Stones', question='Question', author=self.user,
+            survey_type=Survey.SurveyType.FIVE_STONES, is_anonymous=True
+        )
+        for i in range(1, 4):
+            SurveyChoice.objects.create(survey=survey, text=f'Option {i}', order=i)
+        SurveyResponse.objects.create(
+            survey=survey,
+            anonymous_email='guest@example.com',
+            stones_allocation=STONE_ALLOCATIONS.index((1, 1, 3))
+        )
+
+        lines = ''.join(export_ballots(survey, 'ndjson')).splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [{'Option 1': 1, 'Option 2': 1, 'Option 3': 3}]
+        )
+
+    def test_csv_export_escapes_formulas(self):
+        """Test that choice texts and names starting like formulas are quoted in CSV."""
+        from .exports import export_ballots
+
+        survey = Survey.objects.create(title='Survey', question='Question', author=self.user)
+        choices = [
+            SurveyChoice.objects.create(survey=survey, text=text, order=i)
+            for i, text in enumerate(['=HYPERLINK("http://x")', '+1', 'Plain'], start=1)
+        ]
+        voter = User.objects.create_user(
+            email='voter@example.com', username='voter', first_name='@Voter', last_name='User'
+        )
+        choice_ids = [choice.id for choice in choices]
+        SurveyResponse.objects.create(
+            survey=survey,
+            user=voter,
+            packed_ranking=SurveyResponse.pack_ranking(choice_ids, zip(choice_ids, [1, 2, 3]))
+        )
+
+        header, row = list(csv.reader(StringIO(''.join(export_ballots(survey, 'csv')))))
+        self.assertEqual(header[4:], ['\'=HYPERLINK("http://x")', "'+1", 'Plain'])
+        self.assertEqual(row[2:], ["'@Voter User", 'voter@example.com', '1', '2', '3'])
+
+        # NDJSON is data, not a spreadsheet, and stays as entered
+        line = json.loads(''.join(export_ballots(survey, 'ndjson')))
+        self.assertEqual(line['respondent'], '@Voter User')
+
+    def test_response_status_counts_used_invitations(self):
+        """Test that responses not linked to the user are found through their used invitation."""
+        anonymous = Survey.objects.create(
+            title='Anonymous', question='Question', author=self.other_user, is_anonymous=True
+        )
+        by_link = Survey.objects.create(title='By link', question='Question', author=self.other_user)
+        for survey in [anonymous, by_link]:
+            SurveyResponse.objects.create(survey=survey)
+            SurveyAudience.add([(self.user.id, survey.id, SurveyAudience.Relation.MEMBER)])
+        AnonymousInvitation.objects.create(survey=anonymous, email=self.user.email, is_used=True)
+        AnonymousInvitation.objects.create(
+            survey=by_link, email='link@example.com', user=self.user, is_used=True
+        )
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('survey-list'))
+        status_by_title = {
+            survey['title']: (survey['has_responded'], survey['can_respond'])
+            for survey in response.data['results']
+        }
+        self.assertEqual(status_by_title, {'Anonymous': (True, False), 'By link': (True, False)})
+        response = self.client.get(reverse('survey-check-response-status', args=[anonymous.id]))
+        self.assertEqual(response.data, {'can_respond': False, 'has_responded': True})
+
+    def test_response_count_follows_deletes_and_reconciles(self):
+        """Test response_count on delete, and the reconcile_counts command after drift."""
+        survey = Survey.objects.create(title='Survey', question='Test question', author=self.user)
+        responses = [SurveyResponse.objects.create(survey=survey) for _ in range(3)]
+        responses[0].delete()
+        self.assertEqual(Survey.objects.get(pk=survey.pk).response_count, 2)
+
+        SurveyResponse.objects.filter(survey=survey).delete()
+        self.assertEqual(Survey.objects.get(pk=survey.pk).response_count, 0)
+
+        # Counters changed behind the models' back are fixed when reconciled
+        ResponseCounter.objects.filter(survey=survey).update(responses=5)
+        call_command('reconcile_counts', stdout=StringIO())
+        self.assertEqual(Survey.objects.get(pk=survey.pk).response_count, 0)
+        self.assertEqual(set(survey.response_counters.values_list('responses', flat=True)), {0})
+
+    def test_survey_deletion_skips_per_response_work(self):
+        """Test that deleting a survey takes the same queries however many responses it has."""
+        def deletion_queries(responses):
+            survey = Survey.objects.create(title='Survey', question='Test question', author=self.user)
+            for i in range(responses):
+                voter = User.objects.create_user(
+                    email=f'voter{responses}-{i}@example.com', username=f'voter{responses}-{i}', password='x'
+                )
+                SurveyResponse.objects.create(survey=survey, user=voter)
+            with CaptureQueriesContext(connection) as queries:
+                survey.delete()
+            self.assertFalse(ResponseCounter.objects.filter(survey_id=survey.pk).exists())
+            return len(queries)
+
+        self.assertEqual(deletion_queries(1), deletion_queries(4))
+
+    @override_settings(RESULT_TALLY_SHARDS=4)
+    def test_response_count_is_sharded(self):
+        """Test that responses are counted in shards rather than on the survey row."""
+        survey = Survey.objects.create(title='Survey', question='Test question', author=self.user)
+        with mock.patch('apps.surveys.models.random.randrange', side_effect=[0, 1, 1, 3, 2]):
+            responses = [SurveyResponse.objects.create(survey=survey) for _ in range(4)]
+            responses[0].delete()
+
+        # The deletion's shard does not exist yet, so it comes off the largest one
+        self.assertEqual(
+            dict(survey.response_counters.values_list('shard', 'responses')), {0: 1, 1: 1, 3: 1}
+        )
+        self.assertEqual(Survey.objects.with_response_count().get(pk=survey.pk).response_count, 3)
+
     def test_submit_ranked_choice_response(self):
         """Test submitting a ranked choice response."""
         # Create survey with choices
@@ -421,3 +826,889 @@ class AnonymousInvitationTests(APITestCase):
         }
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_invitations_for_group(self):
+        """Test bulk invitation creation skips members already invited."""
+        from .models import AnonymousInvitation
+        from .utils import create_anonymous_invitations
+
+        group = DistributionGroup.objects.create(name='Invitees', owner=self.user)
+        GroupMember.objects.bulk_create([
+            GroupMember(group=group, email='invited@example.com'),
+            GroupMember(group=group, email='Member1@example.com'),
+            GroupMember(group=group, email='member2@example.com'),
+            GroupMember(group=group, email='member3@example.com', user=self.user),
+        ])
+        self.survey.distribution_group = group
+        self.survey.save()
+
+        self.assertEqual(create_anonymous_invitations(self.survey, chunk_size=2), 3)
+        self.assertEqual(create_anonymous_invitations(self.survey, chunk_size=2), 0)
+
+        invitations = AnonymousInvitation.objects.filter(survey=self.survey)
+        self.assertEqual(invitations.count(), 4)
+        self.assertEqual(len(set(invitations.values_list('token', flat=True))), 4)
+        self.assertTrue(invitations.filter(email='member1@example.com').exists())
+        self.assertEqual(invitations.get(email='member3@example.com').user, self.user)
+
+
+class ResultTallyTests(SurveyFixtures, APITestCase):
+    """Tests for incrementally maintained result tallies."""
+
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.survey, self.choices = self.create_survey(self.author)
+        self.voters = [self.create_user(f'voter{i}') for i in range(3)]
+
+    def _respond(self, voter, order):
+        self.client.force_authenticate(user=voter)
+        url = reverse('survey-respond', args=[self.survey.id])
+        data = {
+            'ranked_answers': [
+                {'choice_id': str(self.choices[index].id), 'rank': rank}
+                for rank, index in enumerate(order, start=1)
+            ]
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_responses_update_tallies(self):
+        """Test that each submitted ballot is added to the tallies."""
+        self._respond(self.voters[0], [0, 1, 2])
+        self._respond(self.voters[1], [0, 2, 1])
+        self._respond(self.voters[2], [1, 0, 2])
+
+        histograms = self.survey._tallied_histograms(
+            list(self.survey.choices.values_list('id', 'text')), 3
+        )
+        self.assertEqual(histograms, self.survey._counted_histograms([choice.id for choice in self.choices]))
+        self.assertEqual(histograms[self.choices[0].id], {1: 2, 2: 1})
+
+        results = self.survey.get_results()
+        self.assertEqual(results['total_responses'], 3)
+        self.assertEqual(results['results'][0]['text'], 'Option 1')
+        self.assertEqual(results['results'][0]['score'], 8)
+        self.assertEqual(results['results'][0]['histogram'], [2, 1, 0])
+        self.assertNotIn('rankings', results['results'][0])
+
+    def test_results_endpoint_detail_raw(self):
+        """Test that raw per-response lists are only returned on request."""
+        self._respond(self.voters[0], [0, 1, 2])
+        self._respond(self.voters[1], [1, 0, 2])
+        self.client.force_authenticate(user=self.author)
+        url = reverse('survey-results', args=[self.survey.id])
+
+        compact = self.client.get(url).data['results']
+        self.assertEqual(
+            {result['text']: result['histogram'] for result in compact},
+            {'Option 1': [1, 1, 0], 'Option 2': [1, 1, 0], 'Option 3': [0, 0, 2]}
+        )
+        self.assertNotIn('rankings', compact[0])
+
+        raw = self.client.get(url, {'detail': 'raw'}).data['results']
+        self.assertEqual(
+            {result['text']: result['rankings'] for result in raw},
+            {'Option 1': [1, 2], 'Option 2': [1, 2], 'Option 3': [3, 3]}
+        )
+
+    def test_results_fall_back_to_raw_answers(self):
+        """Test that stale tallies are ignored in favour of the raw answers."""
+        self._respond(self.voters[0], [0, 1, 2])
+        self._respond(self.voters[1], [2, 1, 0])
+        ResultTally.objects.filter(survey=self.survey).delete()
+
+        results = self.survey.get_results()
+        scores = {result['text']: result['score'] for result in results['results']}
+        self.assertEqual(scores, {'Option 1': 4, 'Option 2': 4, 'Option 3': 4})
+
+    def test_rebuild_command_restores_tallies(self):
+        """Test rebuilding tallies from the raw answers."""
+        self._respond(self.voters[0], [0, 1, 2])
+        self._respond(self.voters[1], [1, 0, 2])
+        ResultTally.objects.filter(survey=self.survey).update(count=0)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_result_tallies', str(self.survey.id), '--verify', stdout=StringIO())
+
+        call_command('rebuild_result_tallies', str(self.survey.id), stdout=StringIO())
+        call_command('rebuild_result_tallies', str(self.survey.id), '--verify', stdout=StringIO())
+        self.assertEqual(
+            self.survey._tallied_histograms(list(self.survey.choices.values_list('id', 'text')), 2),
+            self.survey._counted_histograms([choice.id for choice in self.choices])
+        )
+
+    def test_replaced_choices_keep_tallies_current(self):
+        """Test that responses to replaced choices do not make the new tallies look stale."""
+        self._respond(self.voters[0], [0, 1, 2])
+        self._respond(self.voters[1], [1, 0, 2])
+        self.client.force_authenticate(user=self.author)
+        url = reverse('survey-detail', args=[self.survey.id])
+        response = self.client.patch(url, {'choices': [{'text': 'New A'}, {'text': 'New B'}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.choices = list(self.survey.choices.all())
+        self._respond(self.voters[2], [1, 0])
+
+        with self.assertNoLogs('apps.surveys.models', level='WARNING'):
+            results = self.survey.get_results()
+        self.assertEqual(results['total_responses'], 1)
+        self.assertEqual(results['results'][0]['text'], 'New B')
+        call_command('rebuild_result_tallies', str(self.survey.id), '--verify', stdout=StringIO())
+
+    def test_results_read_maintained_ballot_count(self):
+        """Test that results take the ballot count from the counters instead of counting responses."""
+        for voter in self.voters:
+            self._respond(voter, [0, 1, 2])
+
+        with CaptureQueriesContext(connection) as queries:
+            results = self.survey.get_results()
+        self.assertEqual(results['total_responses'], 3)
+        self.assertFalse([query for query in queries.captured_queries if 'COUNT(' in query['sql']])
+
+    @override_settings(RESULT_TALLY_SHARDS=4)
+    def test_deleted_ballots_leave_the_tallies(self):
+        """Test that deleting responses takes their ballots out and keeps the tallies in use."""
+        self._respond(self.voters[0], [0, 1, 2])
+        self._respond(self.voters[1], [2, 1, 0])
+        self._respond(self.voters[2], [0, 2, 1])
+        SurveyResponse.objects.create(survey=self.survey)
+        ResponseCounter.reset_ballots(self.survey, 3)
+
+        # One ballot, and the response that never held one
+        SurveyResponse.objects.filter(Q(user=self.voters[1]) | Q(user__isnull=True)).delete()
+        self.assertEqual(ResponseCounter.ballot_count(self.survey), 2)
+        with self.assertNoLogs('apps.surveys.models', level='WARNING'):
+            results = self.survey.get_results()
+        self.assertEqual(results['total_responses'], 2)
+        self.assertEqual(
+            {result['text']: result['histogram'] for result in results['results']},
+            {'Option 1': [2, 0, 0], 'Option 2': [0, 1, 1], 'Option 3': [0, 1, 1]}
+        )
+        call_command('rebuild_result_tallies', str(self.survey.id), '--verify', stdout=StringIO())
+
+
+class ResultsCacheTests(SurveyFixtures, APITestCase):
+    """Tests for the versioned results cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = self.create_user('author')
+        self.voter = self.create_user('voter')
+        self.survey, (self.choice1, self.choice2) = self.create_survey(
+            self.author, ['Option A', 'Option B']
+        )
+        self.url = reverse('survey-results', args=[self.survey.id])
+
+    def test_results_cached_until_version_changes(self):
+        """Test that results are recomputed only after a new response."""
+        self.client.force_authenticate(user=self.author)
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['version'], 0)
+        self.assertEqual(results_cache_stats(), {'hits': 0, 'misses': 1})
+
+        self.client.get(self.url)
+        self.assertEqual(results_cache_stats(), {'hits': 1, 'misses': 1})
+
+        self.client.force_authenticate(user=self.voter)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('survey-respond', args=[self.survey.id]), {
+                'ranked_answers': [
+                    {'choice_id': str(self.choice1.id), 'rank': 2},
+                    {'choice_id': str(self.choice2.id), 'rank': 1}
+                ]
+            }, format='json')
+        self.survey.refresh_from_db()
+        self.assertEqual(self.survey.results_version, 1)
+
+        self.client.force_authenticate(user=self.author)
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['version'], 1)
+        self.assertEqual(response.data['total_responses'], 1)
+        self.assertEqual(results_cache_stats(), {'hits': 1, 'misses': 2})
+
+    def test_waiting_request_uses_computed_results(self):
+        """Test that a request blocked on the lock reuses the cached results."""
+        key = f"survey-results:{self.survey.pk}:0:compact"
+        cache.add(f"{key}:lock", 1)
+        timer = threading.Timer(0.2, cache.set, args=[key, {'cached': True}])
+        timer.start()
+        self.assertEqual(get_survey_results(self.survey), {'cached': True})
+        timer.join()
+
+    def test_cache_stats_super_only(self):
+        """Test that cache counters are only visible to super users."""
+        url = reverse('survey-results-cache-stats')
+        self.client.force_authenticate(user=self.author)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.author.permission_level = User.PermissionLevel.SUPER
+        self.author.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('hits', response.data)
+
+
+class ResultsETagTests(SurveyFixtures, APITestCase):
+    """Tests for conditional requests on the results endpoint."""
+
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.survey, _ = self.create_survey(self.author, ['Option A', 'Option B'])
+        self.url = reverse('survey-results', args=[self.survey.id])
+        self.client.force_authenticate(user=self.author)
+
+    def test_unchanged_results_return_304(self):
+        """Test that a matching If-None-Match skips the results body."""
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        Survey.objects.filter(pk=self.survey.pk).update(results_version=1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_closed_survey_results_revalidate(self):
+        """Test that closed surveys' results are revalidated, since they can be reopened."""
+        self.survey.is_active = False
+        self.survey.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertNotIn('max-age', response['Cache-Control'])
+
+        self.survey.is_active = True
+        self.survey.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class ResultsStreamTests(SurveyFixtures, APITestCase):
+    """Tests for the live results event stream."""
+
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.survey, (self.choice1, self.choice2) = self.create_survey(
+            self.author, ['Option A', 'Option B']
+        )
+        self.url = reverse('survey-results-stream', args=[self.survey.id])
+        self.client.force_authenticate(user=self.author)
+        self.ticket = self.client.post(
+            reverse('survey-results-stream-ticket', args=[self.survey.id])
+        ).data['ticket']
+
+    def _add_response(self):
+        response = SurveyResponse.objects.create(survey=self.survey)
+        RankedChoiceAnswer.objects.create(response=response, choice=self.choice1, rank=1)
+        RankedChoiceAnswer.objects.create(response=response, choice=self.choice2, rank=2)
+        Survey.objects.filter(pk=self.survey.pk).update(results_version=F('results_version') + 1)
+        results_broadcaster.publish(self.survey.pk)
+
+    async def test_stream_pushes_new_results(self):
+        """Test that the stream sends a snapshot, then another after a response."""
+        response = await self.async_client.get(self.url, {'ticket': self.ticket})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = response.streaming_content
+
+        first = (await anext(events)).decode()
+        self.assertTrue(first.startswith('event: results\nid: 0\n'))
+
+        await sync_to_async(self._add_response)()
+        second = (await anext(events)).decode()
+        self.assertTrue(second.startswith('event: results\nid: 1\n'))
+        payload = json.loads(second.split('data: ', 1)[1])
+        self.assertEqual(payload['total_responses'], 1)
+        await events.aclose()
+
+    async def test_stream_requires_permission(self):
+        """Test that streams are refused without a valid ticket."""
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        # Access tokens are not accepted in the URL
+        access_token = str(AccessToken.for_user(self.author))
+        response = await self.async_client.get(self.url, {'access_token': access_token})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        # A ticket only opens the stream of its own survey
+        other = await sync_to_async(Survey.objects.create)(
+            title='Other', question='Question', author=self.author
+        )
+        other_url = reverse('survey-results-stream', args=[other.id])
+        response = await self.async_client.get(other_url, {'ticket': self.ticket})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(RESULTS_STREAM_TICKET_MAX_AGE=-1)
+    def test_stream_ticket_expires(self):
+        """Test that a ticket stops opening the stream once it has expired."""
+        response = self.client.get(self.url, {'ticket': self.ticket})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stream_ticket_requires_results_access(self):
+        """Test that tickets are only issued to users who may view the results."""
+        viewer = self.create_user('viewer')
+        SurveyAudience.add([(viewer.id, self.survey.id, SurveyAudience.Relation.MEMBER)])
+        self.client.force_authenticate(user=viewer)
+        url = reverse('survey-results-stream-ticket', args=[self.survey.id])
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_broadcaster_shares_one_load(self):
+        """Test that concurrent watchers of one survey share a single load."""
+        broadcaster = ResultsBroadcaster()
+        loads = []
+
+        def load(survey_id, previous=None):
+            loads.append(survey_id)
+            return 0, {'results': []}
+
+        async def watch():
+            stream = results_events(self.survey.pk, broadcaster)
+            message = await anext(stream)
+            await stream.aclose()
+            return message
+
+        async def watch_all():
+            return await asyncio.gather(*[watch() for _ in range(20)])
+
+        with mock.patch('apps.surveys.streams.load_results_snapshot', load):
+            messages = asyncio.run(watch_all())
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(len(set(messages)), 1)
+
+
+class ResultsDeltaTests(SurveyFixtures, APITestCase):
+    """Tests for since_version delta results."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = self.create_user('author')
+        self.survey, self.choices = self.create_survey(
+            self.author, survey_type=Survey.SurveyType.FIVE_STONES
+        )
+        self.url = reverse('survey-results', args=[self.survey.id])
+        self.client.force_authenticate(user=self.author)
+
+    def _add_response(self, allocation):
+        code = STONE_ALLOCATIONS.index(tuple(allocation))
+        SurveyResponse.objects.create(survey=self.survey, stones_allocation=code)
+        StonesAllocationTally.record_ballot(self.survey, code)
+        Survey.objects.filter(pk=self.survey.pk).update(results_version=F('results_version') + 1)
+
+    def test_unchanged_since_current_version(self):
+        """Test that polling with the current version returns no results."""
+        response = self.client.get(self.url, {'since_version': 0})
+        self.assertEqual(response.data, {'unchanged': True, 'version': 0})
+
+    def test_delta_lists_changed_fields_only(self):
+        """Test that only the changed fields of each choice are returned."""
+        self._add_response([5, 0, 0])
+        self.client.get(self.url)
+
+        self._add_response([3, 2, 0])
+        response = self.client.get(self.url, {'since_version': 1})
+        self.assertEqual(response.data['version'], 2)
+        self.assertEqual(response.data['since_version'], 1)
+
+        changes = {result['id']: result for result in response.data['results']}
+        self.assertEqual(changes[str(self.choices[0].id)]['stones'], 8)
+        self.assertEqual(
+            changes[str(self.choices[2].id)],
+            {'id': str(self.choices[2].id), 'histogram': [2, 0, 0, 0, 0, 0]}
+        )
+        self.assertEqual(response.data['removed'], [])
+
+    def test_delta_lists_removed_choices(self):
+        """Test that choices replaced since the base version are reported as removed."""
+        self._add_response([5, 0, 0])
+        self.client.get(self.url)
+
+        response = self.client.patch(
+            reverse('survey-detail', args=[self.survey.id]),
+            {'choices': [{'text': 'Option 1'}, {'text': 'New B'}, {'text': 'New C'}]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        Survey.objects.filter(pk=self.survey.pk).update(results_version=F('results_version') + 1)
+
+        response = self.client.get(self.url, {'since_version': 1})
+        self.assertEqual(response.data['since_version'], 1)
+        self.assertEqual(
+            sorted(response.data['removed']), sorted(str(choice.id) for choice in self.choices)
+        )
+        self.assertEqual(
+            [result['text'] for result in response.data['results']], ['Option 1', 'New B', 'New C']
+        )
+
+    def test_delta_falls_back_to_full_results(self):
+        """Test that an unknown base version returns the full results."""
+        self._add_response([5, 0, 0])
+        response = self.client.get(self.url, {'since_version': 0})
+        self.assertNotIn('since_version', response.data)
+        self.assertEqual(len(response.data['results']), 3)
+
+        response = self.client.get(self.url, {'since_version': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PackedBallotTests(SurveyFixtures, APITestCase):
+    """Tests for packed ranked choice ballot storage."""
+
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.survey, self.choices = self.create_survey(
+            self.author, ballot_storage=Survey.BallotStorage.PACKED
+        )
+        self.voter = self.create_user('voter')
+
+    def _respond(self, ranks):
+        self.client.force_authenticate(user=self.voter)
+        url = reverse('survey-respond', args=[self.survey.id])
+        data = {
+            'ranked_answers': [
+                {'choice_id': str(choice.id), 'rank': rank}
+                for choice, rank in zip(self.choices, ranks)
+            ]
+        }
+        return self.client.post(url, data, format='json')
+
+    def test_packed_response_writes_no_answer_rows(self):
+        """Test that a packed ballot is stored on the response row only."""
+        response = self._respond([2, 3, 1])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(RankedChoiceAnswer.objects.exists())
+        self.assertEqual(SurveyResponse.objects.get().packed_ranking, '201')
+
+        ResultTally.objects.all().delete()
+        results = self.survey.get_results()
+        self.assertEqual(
+            {result['text']: result['histogram'] for result in results['results']},
+            {'Option 1': [0, 1, 0], 'Option 2': [0, 0, 1], 'Option 3': [1, 0, 0]}
+        )
+
+        self.client.force_authenticate(user=self.author)
+        url = reverse('survey-responses', args=[self.survey.id])
+        answers = self.client.get(url).data['results'][0]['ranked_answers']
+        self.assertEqual(
+            answers,
+            [
+                {'choice': 'Option 3', 'rank': 1},
+                {'choice': 'Option 1', 'rank': 2},
+                {'choice': 'Option 2', 'rank': 3},
+            ]
+        )
+
+    def test_ranks_must_be_consecutive(self):
+        """Test that ranks outside 1..N are rejected."""
+        response = self._respond([1, 2, 4])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pack_ballots_command(self):
+        """Test migrating answer rows to packed ballots."""
+        self.survey.ballot_storage = Survey.BallotStorage.ROWS
+        self.survey.save()
+        response = SurveyResponse.objects.create(survey=self.survey)
+        for choice, rank in zip(self.choices, [3, 1, 2]):
+            RankedChoiceAnswer.objects.create(response=response, choice=choice, rank=rank)
+        before = self.survey._counted_histograms([choice.id for choice in self.choices])
+
+        call_command('pack_ballots', str(self.survey.id), '--drop-rows', stdout=StringIO())
+
+        self.survey.refresh_from_db()
+        self.assertEqual(self.survey.ballot_storage, Survey.BallotStorage.PACKED)
+        self.assertEqual(SurveyResponse.objects.get().packed_ranking, '120')
+        self.assertFalse(RankedChoiceAnswer.objects.exists())
+        self.assertEqual(
+            self.survey._counted_histograms([choice.id for choice in self.choices]), before
+        )
+
+    def test_pack_ballots_skips_partial_ballots(self):
+        """Test that partial legacy ballots are reported and keep their answer rows."""
+        self.survey.ballot_storage = Survey.BallotStorage.ROWS
+        self.survey.save()
+        full = SurveyResponse.objects.create(survey=self.survey)
+        partial = SurveyResponse.objects.create(survey=self.survey)
+        for choice, rank in zip(self.choices, [3, 1, 2]):
+            RankedChoiceAnswer.objects.create(response=full, choice=choice, rank=rank)
+        for choice, rank in zip(self.choices, [1, 2]):
+            RankedChoiceAnswer.objects.create(response=partial, choice=choice, rank=rank)
+
+        out = StringIO()
+        call_command('pack_ballots', str(self.survey.id), '--drop-rows', stdout=out)
+
+        self.assertIn(f'Skipped partial or invalid ballot of response {partial.id}', out.getvalue())
+        self.assertIn('Packed 1 ballots', out.getvalue())
+        full.refresh_from_db()
+        partial.refresh_from_db()
+        self.assertEqual((full.packed_ranking, partial.packed_ranking), ('120', ''))
+        self.assertEqual(
+            list(RankedChoiceAnswer.objects.values_list('response_id', flat=True)), [partial.id] * 2
+        )
+
+
+class StonesAllocationTests(SurveyFixtures, APITestCase):
+    """Tests for 5 Stones allocation codes and their tallies."""
+
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.survey, self.choices = self.create_survey(
+            self.author, survey_type=Survey.SurveyType.FIVE_STONES
+        )
+        self.voters = [self.create_user(f'voter{i}') for i in range(2)]
+
+    def _respond(self, voter, allocation):
+        self.client.force_authenticate(user=voter)
+        url = reverse('survey-respond', args=[self.survey.id])
+        data = {
+            'stones_answers': [
+                {'choice_id': str(choice.id), 'stones': stones}
+                for choice, stones in zip(self.choices, allocation)
+            ]
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_allocation_codes_cover_every_ballot(self):
+        """Test that the 21 allocation codes round-trip."""
+        self.assertEqual(len(STONE_ALLOCATIONS), 21)
+        choice_ids = [choice.id for choice in self.choices]
+        for code, allocation in enumerate(STONE_ALLOCATIONS):
+            self.assertEqual(sum(allocation), 5)
+            self.assertEqual(
+                SurveyResponse.encode_allocation(choice_ids, list(zip(choice_ids, allocation))), code
+            )
+
+    def test_results_from_allocation_tallies(self):
+        """Test that results are derived from the allocation table."""
+        self._respond(self.voters[0], [3, 2, 0])
+        self._respond(self.voters[1], [0, 0, 5])
+        self.assertFalse(ResultTally.objects.exists())
+
+        # Answer rows are ignored once tallies are in place
+        FiveStonesAnswer.objects.all().delete()
+        results = self.survey.get_results()
+        self.assertEqual(
+            {result['text']: (result['stones'], result['histogram']) for result in results['results']},
+            {
+                'Option 1': (3, [1, 0, 0, 1, 0, 0]),
+                'Option 2': (2, [1, 0, 1, 0, 0, 0]),
+                'Option 3': (5, [1, 0, 0, 0, 0, 1]),
+            }
+        )
+
+        StonesAllocationTally.objects.all().delete()
+        self.assertEqual(self.survey.get_results()['results'], results['results'])
+
+    def test_packed_response_writes_no_answer_rows(self):
+        """Test that packed 5 Stones ballots are stored as a code only."""
+        self.survey.ballot_storage = Survey.BallotStorage.PACKED
+        self.survey.save()
+        self._respond(self.voters[0], [1, 1, 3])
+        self.assertFalse(FiveStonesAnswer.objects.exists())
+
+        self.client.force_authenticate(user=self.author)
+        url = reverse('survey-responses', args=[self.survey.id])
+        answers = self.client.get(url).data['results'][0]['stones_answers']
+        self.assertEqual([answer['stones'] for answer in answers], [1, 1, 3])
+
+    def test_rebuild_counts_legacy_answer_rows(self):
+        """Test rebuilding allocation tallies from coded and uncoded responses."""
+        self._respond(self.voters[0], [3, 2, 0])
+        response = SurveyResponse.objects.create(survey=self.survey)
+        for choice, stones in zip(self.choices, [0, 1, 4]):
+            FiveStonesAnswer.objects.create(response=response, choice=choice, stones=stones)
+
+        call_command('rebuild_result_tallies', str(self.survey.id), stdout=StringIO())
+        call_command('rebuild_result_tallies', str(self.survey.id), '--verify', stdout=StringIO())
+        self.assertEqual(StonesAllocationTally.objects.filter(survey=self.survey).count(), 21)
+        self.assertEqual(
+            sum(StonesAllocationTally.objects.values_list('count', flat=True)), 2
+        )
+
+    def test_deleted_ballots_leave_the_tallies(self):
+        """Test that deleting coded and legacy responses takes their ballots out of the tallies."""
+        self._respond(self.voters[0], [3, 2, 0])
+        self._respond(self.voters[1], [0, 0, 5])
+        legacy = SurveyResponse.objects.create(survey=self.survey)
+        for choice, stones in zip(self.choices, [0, 1, 4]):
+            FiveStonesAnswer.objects.create(response=legacy, choice=choice, stones=stones)
+        call_command('rebuild_result_tallies', str(self.survey.id), stdout=StringIO())
+
+        legacy.delete()
+        SurveyResponse.objects.get(user=self.voters[1]).delete()
+        with self.assertNoLogs('apps.surveys.models', level='WARNING'):
+            results = self.survey.get_results()
+        self.assertEqual(results['total_responses'], 1)
+        self.assertEqual([result['stones'] for result in results['results']], [3, 2, 0])
+
+
+@override_settings(RESULT_TALLY_SHARDS=1)
+class RespondQueryTests(SurveyFixtures, APITestCase):
+    """Tests for the query budget and race handling of the respond endpoint."""
+
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.voter = self.create_user('voter')
+        self.survey, self.choices = self.create_survey(self.author, [f'Option {i}' for i in range(1, 6)])
+        ResultTally.create_buckets(self.survey, [choice.id for choice in self.choices], shard=0)
+        ResponseCounter.objects.create(survey=self.survey, shard=0)
+        self.invitation = AnonymousInvitation.objects.create(
+            survey=self.survey,
+            email='invited@example.com'
+        )
+        self.url = reverse('survey-respond', args=[self.survey.id])
+        self.data = {
+            'ranked_answers': [
+                {'choice_id': str(choice.id), 'rank': rank}
+                for rank, choice in enumerate(self.choices, start=1)
+            ]
+        }
+        cache.clear()
+        get_survey_definition(self.survey.id)
+
+    def test_logged_in_response_query_count(self):
+        """Test that a logged-in response takes a fixed number of queries."""
+        # survey, savepoint, choices, response, count, user stats, answers, tallies, invitations, release
+        self.client.force_authenticate(user=self.voter)
+        with self.assertNumQueries(10):
+            response = self.client.post(self.url, self.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(RankedChoiceAnswer.objects.count(), 5)
+
+    def test_token_response_query_count(self):
+        """Test that a response with an invitation token takes a fixed number of queries."""
+        # survey, invitation, savepoint, choices, claim, response, count, answers, tallies, release
+        with self.assertNumQueries(10):
+            response = self.client.post(
+                self.url, {**self.data, 'token': self.invitation.token}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.invitation.refresh_from_db()
+        self.assertTrue(self.invitation.is_used)
+
+    def test_invitation_claimed_once(self):
+        """Test that an invitation used after validation cannot be claimed again."""
+        request = mock.Mock(user=AnonymousUser(), META={'REMOTE_ADDR': '127.0.0.1'})
+        serializer = SurveyResponseCreateSerializer(
+            data={**self.data, 'token': self.invitation.token},
+            context={'request': request, 'survey': self.survey}
+        )
+        self.assertTrue(serializer.is_valid())
+
+        # Another request claims the invitation in the meantime
+        AnonymousInvitation.objects.filter(pk=self.invitation.pk).update(is_used=True)
+        with self.assertRaises(ValidationError):
+            serializer.save()
+        self.assertFalse(SurveyResponse.objects.exists())
+
+    def test_changed_choices_rejected(self):
+        """Test that choices replaced after validation against the cached definition are refused."""
+        request = mock.Mock(user=self.voter, META={'REMOTE_ADDR': '127.0.0.1'})
+        serializer = SurveyResponseCreateSerializer(
+            data=self.data, context={'request': request, 'survey': self.survey}
+        )
+        self.assertTrue(serializer.is_valid())
+
+        # The author replaces a choice in the meantime
+        self.choices[0].delete()
+        SurveyChoice.objects.create(survey=self.survey, text='Option 1', order=1)
+        with self.assertRaises(ValidationError) as raised:
+            serializer.save()
+        self.assertEqual(raised.exception.detail['error_code'], 'SURVEY_CHANGED')
+        self.assertFalse(SurveyResponse.objects.exists())
+
+    def test_duplicate_response_rejected_by_constraint(self):
+        """Test that a second response from the same user is refused."""
+        SurveyResponse.objects.create(survey=self.survey, user=self.voter)
+        self.client.force_authenticate(user=self.voter)
+        response = self.client.post(self.url, self.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error_code'], ['ALREADY_RESPONDED'])
+        self.assertEqual(SurveyResponse.objects.count(), 1)
+
+
+class SurveyDefinitionTests(SurveyFixtures, APITestCase):
+    """Tests for the cached survey definition."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = self.create_user('author')
+        self.theme = Theme.objects.create(name='Survey Theme', is_default=True)
+        self.survey, self.choices = self.create_survey(self.author, theme=self.theme)
+        self.url = reverse('public-survey', args=[self.survey.id])
+
+    def test_public_view_served_from_cache(self):
+        """Test that repeated public views of a survey skip the database."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['author_name'], 'Author User')
+        self.assertEqual(response.data['theme_data']['name'], 'Survey Theme')
+        self.assertEqual([choice['text'] for choice in response.data['choices']],
+                         ['Option 1', 'Option 2', 'Option 3'])
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.data, response.data)
+
+    def test_saving_survey_invalidates_definition(self):
+        """Test that edits to a survey show up straight away."""
+        definition = get_survey_definition(self.survey.id)
+        self.assertEqual(definition.choice_id_set, {choice.id for choice in self.choices})
+
+        self.survey.title = 'Renamed Survey'
+        self.survey.save()
+        self.assertEqual(self.client.get(self.url).data['title'], 'Renamed Survey')
+
+        self.survey.is_active = False
+        self.survey.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_has_live_response_count(self):
+        """Test that the survey detail endpoint counts responses on every request."""
+        url = reverse('survey-detail', args=[self.survey.id])
+        self.assertEqual(self.client.get(url).data['response_count'], 0)
+        SurveyResponse.objects.create(survey=self.survey)
+        self.assertEqual(self.client.get(url).data['response_count'], 1)
+
+    def test_retrieve_parses_survey_id(self):
+        """Test that a malformed id is a 404 and other spellings share the cached definition."""
+        response = self.client.get(reverse('survey-detail', args=['not-a-uuid']))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        url = reverse('survey-detail', args=[str(self.survey.id).upper()])
+        self.assertEqual(self.client.get(url).data['title'], 'Ranked Survey')
+        self.survey.title = 'Renamed Survey'
+        self.survey.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data['title'], 'Renamed Survey')
+
+    def test_bootstrap_in_one_query(self):
+        """Test that the bootstrap endpoint needs only the response status lookup."""
+        invitation = AnonymousInvitation.objects.create(survey=self.survey, email='invited@example.com')
+        url = reverse('survey-bootstrap', args=[self.survey.id])
+        self.client.get(url)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'token': invitation.token})
+        self.assertEqual(response.data['survey']['title'], 'Ranked Survey')
+        self.assertEqual(response.data['theme']['name'], 'Survey Theme')
+        self.assertTrue(response.data['can_respond'])
+        self.assertFalse(response.data['has_responded'])
+
+    def test_bootstrap_falls_back_to_default_theme(self):
+        """Test that a survey without a theme gets the default theme."""
+        self.survey.theme = None
+        self.survey.save()
+        response = self.client.get(reverse('survey-bootstrap', args=[self.survey.id]))
+        self.assertEqual(response.data['theme']['name'], 'Survey Theme')
+        self.assertFalse(response.data['can_respond'])
+
+
+class SurveyAudienceTests(SurveyFixtures, APITestCase):
+    """Tests for the maintained survey audience index."""
+
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.member = self.create_user('member')
+        self.group = DistributionGroup.objects.create(name='Group', owner=self.author)
+        self.group.add_member(self.member.email)
+        self.survey, _ = self.create_survey(
+            self.author, [], title='Group Survey', question='Test question', distribution_group=self.group
+        )
+
+    def visible(self, user):
+        return set(Survey.objects.visible_to(user).values_list('title', flat=True))
+
+    def test_author_and_members_see_survey(self):
+        """Test that creating a survey indexes its author and group members."""
+        self.assertEqual(self.visible(self.author), {'Group Survey'})
+        self.assertEqual(self.visible(self.member), {'Group Survey'})
+        self.assertNotIn('DISTINCT', str(Survey.objects.visible_to(self.member).query))
+
+    def test_membership_changes_update_audience(self):
+        """Test that joining and leaving a group adds and removes its surveys."""
+        newcomer = User.objects.create_user(
+            email='newcomer@example.com',
+            username='newcomer',
+            password='testpass123',
+            first_name='New',
+            last_name='Comer'
+        )
+        self.group.add_members([newcomer.email])
+        self.assertEqual(self.visible(newcomer), {'Group Survey'})
+
+        self.group.remove_member(self.member.email)
+        self.assertEqual(self.visible(self.member), set())
+
+        self.group.members.get(email=newcomer.email).delete()
+        self.assertEqual(self.visible(newcomer), set())
+
+    def test_moving_survey_to_another_group(self):
+        """Test that changing a survey's group swaps its member audience."""
+        other_group = DistributionGroup.objects.create(name='Other', owner=self.author)
+        survey = Survey.objects.get(pk=self.survey.pk)
+        survey.distribution_group = other_group
+        survey.save()
+        self.assertEqual(self.visible(self.member), set())
+
+        # Saves that keep the group leave the audience alone
+        survey.title = 'Renamed'
+        with self.assertNumQueries(1):
+            survey.save()
+        self.assertEqual(self.visible(self.author), {'Renamed'})
+
+    def test_deleting_group_removes_member_audience(self):
+        """Test that members lose a survey whose group is deleted."""
+        self.group.delete()
+        self.assertEqual(self.visible(self.member), set())
+        self.assertEqual(self.visible(self.author), {'Group Survey'})
+
+    def test_registration_links_memberships_and_invitations(self):
+        """Test that a new account sees the surveys it was invited to."""
+        self.group.add_member('late@example.com')
+        invited = Survey.objects.create(title='Invited Survey', question='Test question', author=self.author)
+        AnonymousInvitation.objects.create(survey=invited, email='late@example.com')
+
+        response = self.client.post(reverse('register'), {
+            'email': 'late@example.com',
+            'username': 'late',
+            'password': 'newpass123',
+            'password_confirm': 'newpass123',
+            'first_name': 'Late',
+            'last_name': 'User'
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        late = User.objects.get(email='late@example.com')
+        self.assertEqual(self.visible(late), {'Group Survey', 'Invited Survey'})
+        self.assertEqual(
+            set(Survey.objects.visible_to(late, relation=SurveyAudience.Relation.MEMBER)),
+            {self.survey}
+        )
+
+    def test_rebuild_command(self):
+        """Test that rebuild_survey_audience restores a wiped index."""
+        expected = set(SurveyAudience.objects.values_list('user_id', 'survey_id', 'relation'))
+        SurveyAudience.objects.all().delete()
+        call_command('rebuild_survey_audience', stdout=StringIO())
+        self.assertEqual(
+            set(SurveyAudience.objects.values_list('user_id', 'survey_id', 'relation')), expected
+        )
+
+    def test_list_uses_cursor_pagination(self):
+        """Test that the survey list pages by cursor."""
+        for i in range(25):
+            Survey.objects.create(title=f'Survey {i}', question='Test question', author=self.author)
+
+        self.client.force_authenticate(user=self.author)
+        response = self.client.get(reverse('survey-list'))
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertNotIn('count', response.data)
+        self.assertIn('cursor=', response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertIsNone(response.data['next'])
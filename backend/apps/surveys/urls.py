@@ -6,7 +6,11 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     SurveyViewSet,
     PublicSurveyView,
+    SurveyBootstrapView,
     MySurveysView,
+    survey_results_stream,
+    survey_responses_export,
+    survey_export,
 )
 
 router = DefaultRouter()
@@ -15,5 +19,9 @@ router.register('', SurveyViewSet, basename='survey')
 urlpatterns = [
     path('my-surveys/', MySurveysView.as_view(), name='my-surveys'),
     path('public/<uuid:pk>/', PublicSurveyView.as_view(), name='public-survey'),
+    path('public/<uuid:pk>/bootstrap/', SurveyBootstrapView.as_view(), name='survey-bootstrap'),
+    path('<uuid:pk>/results/stream/', survey_results_stream, name='survey-results-stream'),
+    path('<uuid:pk>/responses/export/', survey_responses_export, name='survey-responses-export'),
+    path('<uuid:pk>/export/', survey_export, name='survey-export'),
     path('', include(router.urls)),
 ]
@@ -1,206 +1,164 @@
 """
 Utility functions for the surveys app.
 """
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
+import secrets
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def create_anonymous_invitations(survey):
-    """Create invitations with unique tokens for ALL group members."""
+def create_anonymous_invitations(survey, chunk_size=1000):
+    """
+    Create invitations with unique tokens for ALL group members.
+
+    Members are streamed and invitations inserted in chunks, skipping
+    members who already have one. Returns the number created.
+    """
     from .models import AnonymousInvitation
 
     if not survey.distribution_group:
-        return []
+        return 0
+
+    existing = survey.anonymous_invitations.count()
+    expires_at = survey.deadline or timezone.now() + timedelta(days=30)
+    members = survey.distribution_group.members.values_list('email', 'user_id')
 
-    invitations = []
-    for member in survey.distribution_group.members.all():
-        # Create invitation for ALL members (registered or not)
-        # This ensures everyone gets a unique token URL
-        invitation, created = AnonymousInvitation.objects.get_or_create(
+    # Create invitation for ALL members (registered or not)
+    # This ensures everyone gets a unique token URL
+    chunk = []
+    for email, user_id in members.iterator(chunk_size=chunk_size):
+        chunk.append(AnonymousInvitation(
             survey=survey,
-            email=member.email,
-            defaults={
-                'user': member.user,  # Link to user if registered
-                'expires_at': survey.deadline or timezone.now() + timedelta(days=30)
-            }
-        )
-        if created:
-            invitations.append(invitation)
+            email=email.lower(),
+            token=secrets.token_urlsafe(48),
+            user_id=user_id,  # Link to user if registered
+            expires_at=expires_at
+        ))
+        if len(chunk) >= chunk_size:
+            _insert_invitations(chunk)
+            chunk = []
+    _insert_invitations(chunk)
+
+    return survey.anonymous_invitations.count() - existing
+
+
+def _insert_invitations(invitations):
+    from .models import AnonymousInvitation, SurveyAudience
+
+    AnonymousInvitation.objects.bulk_create(invitations, ignore_conflicts=True)
+    SurveyAudience.add(
+        (invitation.user_id, invitation.survey_id, SurveyAudience.Relation.INVITED)
+        for invitation in invitations if invitation.user_id
+    )
+
 
-    return invitations
+def queue_survey_notifications(survey, is_new=True, chunk_size=500):
+    """
+    Queue email notifications for a survey in the outbox.
 
+    Invitations are streamed and the emails inserted in chunks, so memory
+    does not grow with the size of the group.
+    """
+    from apps.notifications.models import OutboundEmail
 
-def send_survey_notifications(survey, is_new=True):
-    """Send email notifications for a survey."""
     if not survey.distribution_group:
         return
 
-    # Send to ALL members using their unique invitation token URLs
-    for invitation in survey.anonymous_invitations.filter(is_used=False):
-        try:
-            # Get recipient name - use first name if registered, otherwise "there"
-            if invitation.user:
-                recipient_name = invitation.user.first_name
-                is_anonymous = False
-            else:
-                recipient_name = "there"
-                is_anonymous = True
-
-            send_survey_email(
-                recipient_email=invitation.email,
-                recipient_name=recipient_name,
-                survey=survey,
-                survey_url=invitation.survey_url,  # Unique token URL for each user
-                is_new=is_new,
-                is_anonymous=is_anonymous
-            )
-        except Exception as e:
-            logger.error(f"Failed to send survey notification to {invitation.email}: {e}")
-
-
-def send_survey_email(recipient_email, recipient_name, survey, survey_url, is_new=True, is_anonymous=False):
-    """Send a survey notification email."""
-    action = "invited you to take" if is_new else "updated"
+    # Rendered once per survey (and per link type); see survey_email_templates
+    templates = {}
 
-    subject = f"{'New Survey' if is_new else 'Survey Updated'}: {survey.title}"
-
-    # Plain text message
-    message = f"""
-Hi {recipient_name},
-
-{survey.author.full_name} has {action} a survey: "{survey.title}"
-
-Question: {survey.question}
-
-{survey.description if survey.description else ''}
-
-{'This is a one-time use link for your response.' if is_anonymous else ''}
-
-Take the survey here: {survey_url}
-
-{'Deadline: ' + survey.deadline.strftime('%B %d, %Y at %I:%M %p') if survey.deadline else ''}
+    # Send to ALL members using their unique invitation token URLs
+    invitations = survey.anonymous_invitations.filter(is_used=False).select_related('user')
+    emails = []
+    for invitation in invitations.iterator(chunk_size=chunk_size):
+        # Get recipient name - use first name if registered, otherwise "there"
+        if invitation.user:
+            recipient_name = invitation.user.first_name
+            is_anonymous = False
+        else:
+            recipient_name = "there"
+            is_anonymous = True
+
+        if is_anonymous not in templates:
+            templates[is_anonymous] = survey_email_templates(survey, is_new, is_anonymous)
+        subject, text, html = templates[is_anonymous]
+
+        # Unique token URL for each user
+        recipient = {'recipient_name': recipient_name, 'survey_url': invitation.survey_url}
+        emails.append(OutboundEmail(
+            to_email=invitation.email,
+            subject=subject,
+            body=text.render(**recipient),
+            html_body=html.render(**recipient)
+        ))
+        if len(emails) >= chunk_size:
+            OutboundEmail.objects.bulk_create(emails)
+            emails = []
+    OutboundEmail.objects.bulk_create(emails)
+
+
+def survey_email_templates(survey, is_new=True, is_anonymous=False):
+    """
+    Return (subject, text, html) for a survey notification.
+
+    text and html are PreparedTemplates; fill in recipient_name and
+    survey_url with their render() method.
+    """
+    from apps.notifications.utils import PreparedTemplate
+
+    heading = 'New Survey' if is_new else 'Survey Updated'
+    context = {
+        'survey': survey,
+        'heading': heading,
+        'action': "invited you to take" if is_new else "updated",
+        'author_name': survey.author.full_name,
+        'deadline': survey.deadline.strftime('%B %d, %Y at %I:%M %p') if survey.deadline else '',
+        'is_anonymous': is_anonymous,
+    }
+    fields = ['recipient_name', 'survey_url']
+    return (
+        f"{heading}: {survey.title}",
+        PreparedTemplate('surveys/emails/survey_notification.txt', context, fields),
+        PreparedTemplate('surveys/emails/survey_notification.html', context, fields),
+    )
 
-Best,
-The Group Choice Team
-"""
 
-    # HTML message
-    html_message = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <style>
-        body {{ font-family: 'Inter', -apple-system, sans-serif; line-height: 1.6; color: #2D3748; }}
-        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-        .header {{ background-color: #4A5568; color: white; padding: 20px; border-radius: 8px 8px 0 0; }}
-        .content {{ background-color: #F7FAFC; padding: 20px; border-radius: 0 0 8px 8px; }}
-        .button {{ display: inline-block; background-color: #48BB78; color: white; padding: 12px 24px;
-                   text-decoration: none; border-radius: 6px; margin-top: 16px; }}
-        .button:hover {{ background-color: #38A169; }}
-        .footer {{ margin-top: 20px; font-size: 12px; color: #718096; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1 style="margin: 0;">{'New Survey' if is_new else 'Survey Updated'}</h1>
-        </div>
-        <div class="content">
-            <p>Hi {recipient_name},</p>
-            <p><strong>{survey.author.full_name}</strong> has {action} a survey:</p>
-            <h2 style="color: #4A5568;">{survey.title}</h2>
-            <p><strong>Question:</strong> {survey.question}</p>
-            {'<p>' + survey.description + '</p>' if survey.description else ''}
-            {'<p style="color: #E53E3E;"><em>This is a one-time use link for your response.</em></p>' if is_anonymous else ''}
-            <a href="{survey_url}" class="button">Take the Survey</a>
-            {'<p style="margin-top: 16px;"><strong>Deadline:</strong> ' + survey.deadline.strftime('%B %d, %Y at %I:%M %p') + '</p>' if survey.deadline else ''}
-        </div>
-        <div class="footer">
-            <p>This email was sent by Group Choice. If you didn't expect this email, you can ignore it.</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
+def queue_invitation_email(email, inviter, group=None, survey=None):
+    """Queue an invitation email to create an account."""
+    queue_invitation_emails([email], inviter, group=group, survey=survey)
 
-    send_mail(
-        subject=subject,
-        message=message,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[recipient_email],
-        html_message=html_message,
-        fail_silently=False
-    )
 
+def queue_invitation_emails(emails, inviter, group=None, survey=None):
+    """Queue account invitation emails to many addresses, rendering the templates once."""
+    from apps.notifications.models import OutboundEmail
+    from apps.notifications.utils import PreparedTemplate
 
-def send_invitation_email(email, inviter, group=None, survey=None):
-    """Send an invitation email to create an account."""
     subject = "You've been invited to Group Choice"
 
-    register_url = f"{settings.FRONTEND_URL}/register?email={email}"
-
-    context = ""
+    invited_to = ""
     if group:
-        context = f"to the distribution group '{group.name}'"
+        invited_to = f"to the distribution group '{group.name}'"
     if survey:
-        context = f"to take the survey '{survey.title}'"
-
-    message = f"""
-Hi there,
-
-{inviter.full_name} has invited you {context}.
-
-Group Choice is a collaborative decision-making tool that helps groups make choices together.
-
-To get started, create your account here: {register_url}
-
-Best,
-The Group Choice Team
-"""
-
-    html_message = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <style>
-        body {{ font-family: 'Inter', -apple-system, sans-serif; line-height: 1.6; color: #2D3748; }}
-        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-        .header {{ background-color: #4A5568; color: white; padding: 20px; border-radius: 8px 8px 0 0; }}
-        .content {{ background-color: #F7FAFC; padding: 20px; border-radius: 0 0 8px 8px; }}
-        .button {{ display: inline-block; background-color: #48BB78; color: white; padding: 12px 24px;
-                   text-decoration: none; border-radius: 6px; margin-top: 16px; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1 style="margin: 0;">You're Invited!</h1>
-        </div>
-        <div class="content">
-            <p>Hi there,</p>
-            <p><strong>{inviter.full_name}</strong> has invited you {context}.</p>
-            <p>Group Choice is a collaborative decision-making tool that helps groups make choices together.</p>
-            <a href="{register_url}" class="button">Create Your Account</a>
-        </div>
-    </div>
-</body>
-</html>
-"""
-
-    try:
-        send_mail(
+        invited_to = f"to take the survey '{survey.title}'"
+
+    context = {
+        'inviter_name': inviter.full_name,
+        'invited_to': invited_to,
+    }
+    fields = ['register_url']
+    text = PreparedTemplate('surveys/emails/account_invitation.txt', context, fields)
+    html = PreparedTemplate('surveys/emails/account_invitation.html', context, fields)
+
+    outbox = []
+    for email in emails:
+        register_url = f"{settings.FRONTEND_URL}/register?email={email}"
+        outbox.append(OutboundEmail(
+            to_email=email,
             subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            html_message=html_message,
-            fail_silently=False
-        )
-    except Exception as e:
-        logger.error(f"Failed to send invitation email to {email}: {e}")
+            body=text.render(register_url=register_url),
+            html_body=html.render(register_url=register_url)
+        ))
+    OutboundEmail.objects.bulk_create(outbox, batch_size=500)
@@ -1,20 +1,41 @@
 """
 Views for the surveys app.
 """
+import json
 import logging
+import uuid
 from rest_framework import viewsets, status, generics
+from rest_framework.serializers import as_serializer_error
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
 from django.shortcuts import get_object_or_404
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.db.models import Q
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 
 logger = logging.getLogger(__name__)
 
+# Responses fetched (and written out) at a time by the responses export
+RESPONSES_EXPORT_CHUNK_SIZE = 1000
+
+# Keeps results stream tickets from being valid as any other signed value
+STREAM_TICKET_SALT = 'apps.surveys.results-stream'
+
 from .models import (
     Survey, SurveyChoice, SurveyResponse,
-    AnonymousInvitation
+    AnonymousInvitation, SurveyAudience
 )
 from .serializers import (
     SurveySerializer,
@@ -26,13 +47,33 @@ from .serializers import (
     SurveyResultsSerializer,
     AnonymousInvitationSerializer,
 )
+from .cache import (
+    get_survey_results, get_survey_results_delta, results_cache_stats,
+    get_survey_definition, get_default_theme_data
+)
+from .streams import results_events
+from .exports import EXPORT_CONTENT_TYPES, export_ballots
 from apps.users.permissions import IsSuperUser
 
 
+class SurveyCursorPagination(CursorPagination):
+    """Keyset pagination, newest first: no COUNT and no OFFSET scans on deep pages."""
+
+    ordering = ('-created_at', '-id')
+
+
+class ResponseCursorPagination(CursorPagination):
+    """Keyset pagination of a survey's responses, newest first."""
+
+    ordering = ('-submitted_at', '-id')
+
+
 class SurveyViewSet(viewsets.ModelViewSet):
     """ViewSet for Survey model."""
 
     permission_classes = [IsAuthenticated]
+    pagination_class = SurveyCursorPagination
+    ordering = ['-created_at', '-id']
     filterset_fields = ['survey_type', 'is_active', 'is_anonymous', 'author']
     search_fields = ['title', 'question', 'description']
     ordering_fields = ['created_at', 'updated_at', 'deadline', 'title']
@@ -49,25 +90,11 @@ class SurveyViewSet(viewsets.ModelViewSet):
         if not user.is_authenticated:
             return Survey.objects.none()
 
-        # Super users can see all surveys
-        if user.is_super():
-            return Survey.objects.all()
-
         # Regular users see surveys they authored or are invited to
-        authored = Q(author=user)
-
-        # Surveys from groups they're members of
-        member_groups = user.distribution_group_memberships.values_list(
-            'group_id', flat=True
-        )
-        group_surveys = Q(distribution_group_id__in=member_groups)
-
-        # Surveys they have anonymous invitations for
-        invited_surveys = Q(
-            id__in=user.anonymous_invitations.values_list('survey_id', flat=True)
-        )
-
-        return Survey.objects.filter(authored | group_surveys | invited_surveys).distinct()
+        surveys = Survey.objects.visible_to(user)
+        if self.action == 'list':
+            return surveys.for_listing().with_response_status(user)
+        return surveys
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -81,8 +108,26 @@ class SurveyViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ['retrieve', 'respond', 'public_results']:
             return [AllowAny()]
+        if self.action == 'results_cache_stats':
+            return [IsSuperUser()]
         return [IsAuthenticated()]
 
+    def retrieve(self, request, pk=None):
+        """Get a survey from its cached definition, with a live response count."""
+        try:
+            # One cache key per survey, however the id is spelled
+            survey_id = str(uuid.UUID(pk))
+        except ValueError:
+            raise Http404
+        definition = get_survey_definition(survey_id)
+        if definition is None or not definition.is_active:
+            raise Http404
+        data = definition.payload()
+        data['response_count'] = Survey.objects.filter(pk=definition.id).with_response_count().values_list(
+            'response_count', flat=True
+        ).first()
+        return Response(data)
+
     def perform_destroy(self, instance):
         # Only author or super user can delete
         if instance.author != self.request.user and not self.request.user.is_super():
@@ -92,7 +137,12 @@ class SurveyViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def results(self, request, pk=None):
-        """Get survey results (author only unless results_public)."""
+        """
+        Get survey results (author only unless results_public).
+
+        Pass ?detail=raw to include every individual rank/stone count, or
+        ?since_version=N to get only the choices that changed since version N.
+        """
         survey = self.get_object()
 
         # Check permissions
@@ -102,14 +152,67 @@ class SurveyViewSet(viewsets.ModelViewSet):
                     {'error': 'Results are not public for this survey.'},
                     status=status.HTTP_403_FORBIDDEN
                 )
-            if survey.author != request.user and not request.user.is_super():
+            if survey.author_id != request.user.id and not request.user.is_super():
                 return Response(
                     {'error': 'You do not have permission to view these results.'},
                     status=status.HTTP_403_FORBIDDEN
                 )
 
-        results = survey.get_results()
-        return Response(results)
+        raw = request.query_params.get('detail') == 'raw'
+        since_version = request.query_params.get('since_version')
+        if since_version is not None:
+            try:
+                since_version = int(since_version)
+            except ValueError:
+                return Response(
+                    {'error': 'since_version must be an integer.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            variant = f"since-{since_version}"
+        else:
+            variant = 'raw' if raw else 'compact'
+
+        etag = f'"{survey.pk}-{survey.results_version}-{variant}"'
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        elif since_version == survey.results_version:
+            response = Response({'unchanged': True, 'version': survey.results_version})
+        elif since_version is not None:
+            results = get_survey_results_delta(survey, since_version)
+            response = Response(SurveyResultsSerializer(results).data)
+        else:
+            results = get_survey_results(survey, raw=raw)
+            response = Response(SurveyResultsSerializer(results).data)
+
+        response['ETag'] = etag
+        # Closed surveys revalidate too: the author can reopen them, extend the
+        # deadline or replace the choices, and the ETag makes revalidation cheap
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @action(detail=True, methods=['post'])
+    def results_stream_ticket(self, request, pk=None):
+        """Issue a short-lived ticket that opens this survey's live results stream."""
+        survey = self.get_object()
+
+        # Check permissions
+        if not survey.results_public:
+            if survey.author_id != request.user.id and not request.user.is_super():
+                return Response(
+                    {'error': 'You do not have permission to view these results.'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+        return Response({
+            'ticket': signing.dumps([str(request.user.pk), str(survey.pk)], salt=STREAM_TICKET_SALT),
+            'expires_in': settings.RESULTS_STREAM_TICKET_MAX_AGE,
+        })
+
+    @action(detail=False, methods=['get'])
+    def results_cache_stats(self, request):
+        """Get results cache hit/miss counters (super users only)."""
+        return Response(results_cache_stats())
 
     @action(detail=True, methods=['get'])
     def responses(self, request, pk=None):
@@ -117,7 +220,7 @@ class SurveyViewSet(viewsets.ModelViewSet):
         survey = self.get_object()
 
         # Check permissions
-        if survey.author != request.user and not request.user.is_super():
+        if survey.author_id != request.user.id and not request.user.is_super():
             return Response(
                 {'error': 'You do not have permission to view responses.'},
                 status=status.HTTP_403_FORBIDDEN
@@ -129,9 +232,13 @@ class SurveyViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        responses = survey.responses.all()
-        serializer = SurveyResponseSerializer(responses, many=True)
-        return Response(serializer.data)
+        # No view: the viewset's survey ordering does not apply to responses
+        paginator = ResponseCursorPagination()
+        page = paginator.paginate_queryset(survey.responses.with_answers(survey), request)
+        serializer = SurveyResponseSerializer(
+            page, many=True, context={'choices': list(survey.choices.all())}
+        )
+        return paginator.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['post'])
     def respond(self, request, pk=None):
@@ -150,7 +257,11 @@ class SurveyViewSet(viewsets.ModelViewSet):
             )
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        response = serializer.save()
+        try:
+            response = serializer.save()
+        except ValidationError as exc:
+            # Lost a race on the invitation or the one-response-per-user constraint
+            return Response(as_serializer_error(exc), status=status.HTTP_400_BAD_REQUEST)
 
         return Response(
             {'message': 'Response submitted successfully.', 'response_id': str(response.id)},
@@ -199,7 +310,7 @@ class SurveyViewSet(viewsets.ModelViewSet):
             )
 
         if request.user.is_authenticated:
-            has_responded = survey.responses.filter(user=request.user).exists()
+            has_responded = _has_responded(survey.pk, request.user)
             return Response({
                 'can_respond': not has_responded and survey.is_active and not survey.is_expired,
                 'has_responded': has_responded
@@ -221,9 +332,12 @@ class PublicSurveyView(generics.RetrieveAPIView):
     lookup_field = 'pk'
 
     def retrieve(self, request, *args, **kwargs):
-        survey = self.get_object()
+        survey = get_survey_definition(self.kwargs['pk'])
         token = request.query_params.get('token')
 
+        if survey is None or not survey.is_active:
+            raise Http404
+
         # Check if survey can be accessed
         if survey.is_expired:
             return Response(
@@ -231,34 +345,62 @@ class PublicSurveyView(generics.RetrieveAPIView):
                 status=status.HTTP_410_GONE
             )
 
-        if not survey.is_active:
+        data = survey.payload()
+        data.update(_response_status(survey, request, token))
+        return Response(data)
+
+
+class SurveyBootstrapView(APIView):
+    """
+    Everything a survey taker's page needs in one request: the survey,
+    its theme (falling back to the default theme) and whether this user
+    or invitation token can still respond.
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request, pk):
+        survey = get_survey_definition(pk)
+        if survey is None or not survey.is_active:
+            raise Http404
+        if survey.is_expired:
             return Response(
-                {'error': 'This survey is no longer active.'},
+                {'error': 'This survey has expired.'},
                 status=status.HTTP_410_GONE
             )
 
-        # Validate token for anonymous access
-        can_respond = False
-        has_responded = False
+        return Response({
+            'survey': survey.payload(),
+            'theme': survey.data['theme_data'] or get_default_theme_data(),
+            **_response_status(survey, request, request.query_params.get('token')),
+        })
 
-        if token:
-            invitation = AnonymousInvitation.objects.filter(
-                survey=survey,
-                token=token
-            ).first()
-            if invitation:
-                can_respond = invitation.is_valid
-                has_responded = invitation.is_used
-        elif request.user.is_authenticated:
-            has_responded = survey.responses.filter(user=request.user).exists()
-            can_respond = not has_responded
 
-        serializer = self.get_serializer(survey)
-        data = serializer.data
-        data['can_respond'] = can_respond
-        data['has_responded'] = has_responded
+def _response_status(survey, request, token):
+    """Return can_respond/has_responded for a token or the signed-in user (one query)."""
+    can_respond = False
+    has_responded = False
+
+    if token:
+        invitation = AnonymousInvitation.objects.filter(
+            survey_id=survey.id,
+            token=token
+        ).first()
+        if invitation:
+            can_respond = invitation.is_valid
+            has_responded = invitation.is_used
+    elif request.user.is_authenticated:
+        has_responded = _has_responded(survey.id, request.user)
+        can_respond = not has_responded
+
+    return {'can_respond': can_respond, 'has_responded': has_responded}
 
-        return Response(data)
+
+def _has_responded(survey_id, user):
+    """Whether the user has answered the survey, by the rules of with_response_status() (one query)."""
+    return Survey.objects.filter(pk=survey_id).with_response_status(user).values_list(
+        'has_responded', flat=True
+    ).first() or False
 
 
 class MySurveysView(APIView):
@@ -272,14 +414,11 @@ class MySurveysView(APIView):
         search = request.query_params.get('search', '')
 
         # Get authored surveys
-        authored = Survey.objects.filter(author=user)
+        authored = Survey.objects.for_listing().with_response_status(user).filter(author=user)
 
         # Get invited surveys
-        member_groups = user.distribution_group_memberships.values_list(
-            'group_id', flat=True
-        )
-        invited = Survey.objects.filter(
-            distribution_group_id__in=member_groups
+        invited = Survey.objects.for_listing().with_response_status(user).visible_to(
+            user, relation=SurveyAudience.Relation.MEMBER
         ).exclude(author=user)
 
         # Apply search filter
@@ -291,24 +430,166 @@ class MySurveysView(APIView):
                 Q(title__icontains=search) | Q(description__icontains=search)
             )
 
-        # Filter by type
-        if filter_type == 'authored':
-            surveys = authored
-        elif filter_type == 'invited':
-            surveys = invited
-        else:
-            surveys = None
-
+        # Each list is its own cursor page; its next link asks for that list alone
         response_data = {}
+        for name, surveys in [('authored', authored), ('invited', invited)]:
+            if filter_type not in ['all', name]:
+                continue
+            paginator = SurveyCursorPagination()
+            paginator.cursor_query_param = f'{name}_cursor'
+            page = paginator.paginate_queryset(surveys, request)
+            response_data[name] = SurveyListSerializer(page, many=True).data
+            next_link = paginator.get_next_link()
+            response_data[f'{name}_next'] = next_link and replace_query_param(next_link, 'type', name)
 
-        if filter_type in ['all', 'authored']:
-            response_data['authored'] = SurveyListSerializer(
-                authored.order_by('-created_at'), many=True
-            ).data
+        return Response(response_data)
 
-        if filter_type in ['all', 'invited']:
-            response_data['invited'] = SurveyListSerializer(
-                invited.order_by('-created_at'), many=True
-            ).data
 
-        return Response(response_data)
+def _request_user(request):
+    """Authenticate a plain Django view by JWT in the Authorization header, or by session."""
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    if authenticated:
+        return authenticated[0]
+    return request.user if request.user.is_authenticated else None
+
+
+def _stream_user(request, pk):
+    """
+    Authenticate a stream request like _request_user, or by ?ticket=.
+
+    EventSource cannot send headers, so browsers open the stream with a
+    ticket from results_stream_ticket instead of their access token. It only
+    opens this survey's stream and expires after RESULTS_STREAM_TICKET_MAX_AGE
+    seconds, so a URL kept by logs or browser history grants nothing else.
+    """
+    ticket = request.GET.get('ticket')
+    if not ticket:
+        return _request_user(request)
+    try:
+        user_id, survey_id = signing.loads(
+            ticket, salt=STREAM_TICKET_SALT, max_age=settings.RESULTS_STREAM_TICKET_MAX_AGE
+        )
+    except signing.BadSignature:
+        return None
+    if survey_id != str(pk):
+        return None
+    return get_user_model().objects.filter(pk=user_id, is_active=True).first()
+
+
+def _can_stream_results(request, pk):
+    user = _stream_user(request, pk)
+    if user is None:
+        return False
+    survey = Survey.objects.visible_to(user).filter(pk=pk).first()
+    if survey is None:
+        return False
+    return survey.results_public or survey.author_id == user.id or user.is_super()
+
+
+async def survey_results_stream(request, pk):
+    """Stream survey results as Server-Sent Events, one event per new version."""
+    if not await sync_to_async(_can_stream_results)(request, pk):
+        return JsonResponse(
+            {'error': 'You do not have permission to view these results.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    response = StreamingHttpResponse(results_events(pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _exportable_survey(request, pk):
+    """Return the survey if the requester may read its responses, else None."""
+    user = _request_user(request)
+    if user is None:
+        return None
+    survey = Survey.objects.visible_to(user).filter(pk=pk).first()
+    if survey is None or (survey.author_id != user.id and not user.is_super()):
+        return None
+    return survey
+
+
+def _response_export_chunks(survey, chunk_size=RESPONSES_EXPORT_CHUNK_SIZE):
+    """Yield the survey's responses as a JSON array, chunk_size responses per piece."""
+    serializer = SurveyResponseSerializer(context={'choices': list(survey.choices.all())})
+    responses = survey.responses.with_answers(survey).order_by('-submitted_at', '-id')
+
+    yield '['
+    separator = ''
+    rows = []
+    for response in responses.iterator(chunk_size=chunk_size):
+        rows.append(json.dumps(serializer.to_representation(response), cls=DjangoJSONEncoder))
+        if len(rows) == chunk_size:
+            yield separator + ','.join(rows)
+            separator = ','
+            rows = []
+    if rows:
+        yield separator + ','.join(rows)
+    yield ']'
+
+
+async def _iterate_in_sync_thread(iterator):
+    """
+    Advance a sync iterator from async code.
+
+    Every step runs in the same thread, so a database cursor held by the
+    iterator stays usable; ASGI would otherwise buffer the whole iterator.
+    """
+    step = sync_to_async(next)
+    while True:
+        chunk = await step(iterator, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+async def survey_responses_export(request, pk):
+    """Stream every individual response of a survey as one JSON array."""
+    survey = await sync_to_async(_exportable_survey)(request, pk)
+    if survey is None:
+        return JsonResponse(
+            {'error': 'You do not have permission to view responses.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    if survey.is_anonymous:
+        return JsonResponse(
+            {'error': 'Individual responses are not available for anonymous surveys.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    response = StreamingHttpResponse(
+        _iterate_in_sync_thread(_response_export_chunks(survey)),
+        content_type='application/json'
+    )
+    response['Content-Disposition'] = f'attachment; filename="responses-{survey.pk}.json"'
+    return response
+
+
+async def survey_export(request, pk):
+    """Stream a survey's ballots, one row per ballot, as ?format=csv (default) or ndjson."""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_CONTENT_TYPES:
+        return JsonResponse(
+            {'error': f"Unsupported format. Use one of: {', '.join(EXPORT_CONTENT_TYPES)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    survey = await sync_to_async(_exportable_survey)(request, pk)
+    if survey is None:
+        return JsonResponse(
+            {'error': 'You do not have permission to export responses.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    # Anonymous surveys export their ballots without respondent columns
+    response = StreamingHttpResponse(
+        _iterate_in_sync_thread(export_ballots(survey, export_format)),
+        content_type=EXPORT_CONTENT_TYPES[export_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="survey-{survey.pk}.{export_format}"'
+    return response
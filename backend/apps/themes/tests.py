@@ -128,3 +128,20 @@ class ThemeAPITests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['name'], 'Default Theme')
+
+    def test_theme_queries_do_not_grow_with_page_size(self):
+        """Test that listing and retrieving themes take a fixed number of queries."""
+        themes = [
+            Theme.objects.create(name=f'Theme {i}', created_by=self.admin_user)
+            for i in range(5)
+        ]
+
+        # page count, page
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('theme-list'))
+        self.assertEqual(len(response.data['results']), 5)
+
+        # theme joined with its creator
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('theme-detail', args=[themes[0].id]))
+        self.assertEqual(response.data['created_by_name'], 'Admin User')
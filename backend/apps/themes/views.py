@@ -42,7 +42,11 @@ class ThemeViewSet(viewsets.ModelViewSet):
         # Non-admin users only see active themes
         if not self.request.user.is_authenticated or not self.request.user.is_admin():
             queryset = queryset.filter(is_active=True)
-        return queryset
+
+        if self.action == 'list':
+            return queryset.only(*ThemeListSerializer.Meta.fields)
+        # ThemeSerializer renders the creator's name
+        return queryset.select_related('created_by')
 
     @action(detail=False, methods=['get'])
     def default(self, request):
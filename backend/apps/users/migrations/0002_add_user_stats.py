@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:13
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_user_stats(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    UserStats = apps.get_model('users', 'UserStats')
+    Survey = apps.get_model('surveys', 'Survey')
+    SurveyResponse = apps.get_model('surveys', 'SurveyResponse')
+
+    authored = dict(Survey.objects.values_list('author_id').annotate(total=Count('id')).order_by())
+    responses = dict(
+        SurveyResponse.objects.filter(user__isnull=False).values_list('user_id').annotate(
+            total=Count('id')
+        ).order_by()
+    )
+    UserStats.objects.bulk_create([
+        UserStats(
+            user_id=user_id,
+            authored_surveys=authored.get(user_id, 0),
+            responses_submitted=responses.get(user_id, 0)
+        )
+        for user_id in User.objects.values_list('id', flat=True).iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('surveys', '0010_add_survey_audience'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('authored_surveys', models.PositiveIntegerField(default=0)),
+                ('responses_submitted', models.PositiveIntegerField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'user_stats',
+            },
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
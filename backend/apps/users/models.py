@@ -4,6 +4,8 @@ User models for Group Choice application.
 import uuid
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 
 
@@ -73,6 +75,12 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return f"{self.username} ({self.email})"
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            UserStats.objects.create(user=self)
+
     @property
     def full_name(self):
         """Return the user's full name."""
@@ -97,3 +105,76 @@ class User(AbstractBaseUser, PermissionsMixin):
     def can_delete_any(self):
         """Check if user can delete any resource."""
         return self.is_super()
+
+
+class UserStats(models.Model):
+    """
+    Per-user dashboard counters, updated as surveys and responses are saved
+    and deleted (see apps.surveys.signals).
+
+    Every user gets a row when created; reconcile_counts recomputes them.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats'
+    )
+    authored_surveys = models.PositiveIntegerField(default=0)
+    responses_submitted = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'user_stats'
+
+    def __str__(self):
+        return f"Stats of {self.user_id}"
+
+    @classmethod
+    def adjust(cls, user_id, **deltas):
+        """Add deltas to a user's counters with F() expressions."""
+        if not user_id:
+            return
+        changes = {field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()}
+        stats = cls.objects.filter(user_id=user_id)
+        if not stats.update(**changes) and any(delta > 0 for delta in deltas.values()):
+            # Users created without save() (e.g. bulk_create) have no row yet;
+            # a user being deleted has lost theirs, and must not get it back
+            cls.objects.bulk_create([cls(user_id=user_id)], ignore_conflicts=True)
+            stats.update(**changes)
+
+    @classmethod
+    def adjust_many(cls, user_ids, **deltas):
+        """Add deltas to the counters of every listed user with one UPDATE; `user_ids` may be a queryset."""
+        changes = {field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()}
+        cls.objects.filter(user_id__in=user_ids).update(**changes)
+
+    @classmethod
+    def for_user(cls, user):
+        """Return the user's stats, or an unsaved all-zero row if they have none."""
+        return cls.objects.filter(user=user).first() or cls(user=user)
+
+    @classmethod
+    def reconcile(cls):
+        """Recount every user's stats and fix the ones that drifted. Returns the number fixed."""
+        from apps.surveys.models import Survey, SurveyResponse
+
+        missing = User.objects.filter(stats__isnull=True).values_list('id', flat=True)
+        cls.objects.bulk_create(
+            [cls(user_id=user_id) for user_id in missing], batch_size=1000, ignore_conflicts=True
+        )
+
+        def counted(model, field):
+            counts = model.objects.filter(**{field: OuterRef('user_id')}).order_by().values(field).annotate(
+                total=Count('id')
+            ).values('total')
+            return Coalesce(Subquery(counts), Value(0))
+
+        authored = counted(Survey, 'author')
+        responses = counted(SurveyResponse, 'user')
+        stale = cls.objects.annotate(authored=authored, responses=responses).exclude(
+            authored_surveys=F('authored'), responses_submitted=F('responses')
+        )
+        return cls.objects.filter(pk__in=stale.values('pk')).update(
+            authored_surveys=authored, responses_submitted=responses
+        )
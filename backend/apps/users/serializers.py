@@ -81,6 +81,10 @@ class UserCreateSerializer(serializers.ModelSerializer):
             user__isnull=True
         ).update(user=user)
 
+        # Let them see the surveys those memberships and invitations cover
+        from apps.surveys.models import SurveyAudience
+        SurveyAudience.add_user(user)
+
         return user
 
 
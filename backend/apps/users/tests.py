@@ -171,3 +171,83 @@ class UserAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.user.refresh_from_db()
         self.assertEqual(self.user.first_name, 'Updated')
+
+    def test_dashboard_queries_do_not_grow_with_surveys(self):
+        """Test that the dashboard takes a fixed number of queries."""
+        from apps.groups.models import DistributionGroup
+        from apps.surveys.models import Survey, AnonymousInvitation
+
+        other = User.objects.create_user(
+            email='other@example.com',
+            username='other',
+            password='testpass123',
+            first_name='Other',
+            last_name='User'
+        )
+        for i in range(3):
+            Survey.objects.create(title=f'Mine {i}', question='Question', author=self.user)
+            group = DistributionGroup.objects.create(name=f'Group {i}', owner=other)
+            group.add_member(self.user.email)
+            Survey.objects.create(
+                title=f'Group {i}', question='Question', author=other, distribution_group=group
+            )
+            invited = Survey.objects.create(title=f'Invited {i}', question='Question', author=other)
+            AnonymousInvitation.objects.create(survey=invited, email=self.user.email, user=self.user)
+
+        self.client.force_authenticate(user=self.user)
+        # stats, authored, invited with their total
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(len(response.data['authored_surveys']), 3)
+        self.assertEqual(len(response.data['invited_surveys']), 6)
+        self.assertEqual(response.data['stats']['invited_count'], 6)
+        self.assertEqual(response.data['invited_surveys'][0]['author_name'], 'Other User')
+        self.assertEqual(response.data['stats']['authored_count'], 3)
+
+    def test_stats_follow_surveys_and_responses(self):
+        """Test that user stats are kept current and can be reconciled."""
+        from io import StringIO
+        from django.core.management import call_command
+        from apps.surveys.models import Survey, SurveyResponse
+        from .models import UserStats
+
+        survey = Survey.objects.create(title='Mine', question='Question', author=self.user)
+        Survey.objects.create(title='Other', question='Question', author=self.user).delete()
+        response = SurveyResponse.objects.create(survey=survey, user=self.user)
+
+        stats = UserStats.for_user(self.user)
+        self.assertEqual((stats.authored_surveys, stats.responses_submitted), (1, 1))
+
+        SurveyResponse.objects.filter(pk=response.pk).delete()
+        stats = UserStats.for_user(self.user)
+        self.assertEqual((stats.authored_surveys, stats.responses_submitted), (1, 0))
+
+        # Counters changed behind the models' back are fixed when reconciled
+        UserStats.objects.filter(user=self.user).update(authored_surveys=5)
+        call_command('reconcile_counts', stdout=StringIO())
+        self.assertEqual(UserStats.for_user(self.user).authored_surveys, 1)
+
+    def test_stats_follow_cascading_deletes(self):
+        """Test that deleting a survey or its author takes their responses off respondents' stats."""
+        from apps.surveys.models import Survey, SurveyResponse
+        from .models import UserStats
+
+        author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            password='testpass123',
+            first_name='Author',
+            last_name='User'
+        )
+        for title in ['First', 'Second']:
+            survey = Survey.objects.create(title=title, question='Question', author=author)
+            SurveyResponse.objects.create(survey=survey, user=self.user)
+        self.assertEqual(UserStats.for_user(self.user).responses_submitted, 2)
+
+        survey.delete()
+        self.assertEqual(UserStats.for_user(self.user).responses_submitted, 1)
+        self.assertEqual(UserStats.for_user(author).authored_surveys, 1)
+
+        author.delete()
+        self.assertEqual(UserStats.for_user(self.user).responses_submitted, 0)
+        self.assertFalse(UserStats.objects.filter(user_id=author.pk).exists())
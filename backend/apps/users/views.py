@@ -7,6 +7,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
+from django.db.models import Count, Exists, OuterRef, Window
 
 from .serializers import (
     UserSerializer,
@@ -16,6 +17,7 @@ from .serializers import (
     PasswordChangeSerializer,
     EmailCheckSerializer,
 )
+from .models import UserStats
 from .permissions import CanManageUsers, IsAdminOrSuper
 
 User = get_user_model()
@@ -130,41 +132,44 @@ class DashboardView(APIView):
     def get(self, request):
         user = request.user
 
-        # Get surveys authored by user
-        authored_surveys = user.authored_surveys.all().order_by('-created_at')[:10]
-
-        # Get surveys user has been invited to
-        from apps.surveys.models import Survey, SurveyResponse
+        from apps.surveys.models import Survey, SurveyAudience, AnonymousInvitation
         from apps.surveys.serializers import SurveyListSerializer
 
-        # Get groups user is a member of
-        member_groups = user.distribution_group_memberships.all()
-        invited_survey_ids = []
-        for membership in member_groups:
-            invited_survey_ids.extend(
-                membership.group.surveys.values_list('id', flat=True)
-            )
+        stats = UserStats.for_user(user)
 
-        # Also check anonymous invitations
-        anonymous_invites = user.anonymous_invitations.filter(
+        # Get surveys authored by user
+        authored_surveys = Survey.objects.for_listing().with_response_status(user).filter(
+            author=user
+        ).order_by('-created_at')[:10]
+
+        # Get surveys user has been invited to: through the groups they're
+        # a member of, or through an unused anonymous invitation
+        is_member = SurveyAudience.objects.filter(
+            user=user,
+            survey=OuterRef('pk'),
+            relation=SurveyAudience.Relation.MEMBER
+        )
+        has_invitation = AnonymousInvitation.objects.filter(
+            user=user,
+            survey=OuterRef('pk'),
             is_used=False
-        ).values_list('survey_id', flat=True)
-        invited_survey_ids.extend(anonymous_invites)
-
-        invited_surveys = Survey.objects.filter(
-            id__in=set(invited_survey_ids)
-        ).exclude(author=user).order_by('-created_at')[:10]
-
-        # Get response counts
-        responses_submitted = SurveyResponse.objects.filter(user=user).count()
+        )
+        # Each row carries the total, so the count needs no query of its own
+        invited_surveys = list(
+            Survey.objects.for_listing().with_response_status(user).filter(
+                Exists(is_member) | Exists(has_invitation)
+            ).exclude(
+                author=user
+            ).annotate(total=Window(Count('id'))).order_by('-created_at')[:10]
+        )
 
         return Response({
             'user': UserSerializer(user).data,
             'authored_surveys': SurveyListSerializer(authored_surveys, many=True).data,
             'invited_surveys': SurveyListSerializer(invited_surveys, many=True).data,
             'stats': {
-                'authored_count': user.authored_surveys.count(),
-                'invited_count': len(set(invited_survey_ids)),
-                'responses_submitted': responses_submitted,
+                'authored_count': stats.authored_surveys,
+                'invited_count': invited_surveys[0].total if invited_surveys else 0,
+                'responses_submitted': stats.responses_submitted,
             }
         })
@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     'apps.themes',
     'apps.groups',
     'apps.surveys',
+    'apps.notifications',
 ]
 
 MIDDLEWARE = [
@@ -139,6 +140,33 @@ EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.environ.get('EMAIL_HOST_USER', 'noreply@groupchoice.com')
 
+# Email outbox (drained by `manage.py send_queued_emails`)
+EMAIL_OUTBOX_WORKERS = int(os.environ.get('EMAIL_OUTBOX_WORKERS', 4))
+# Emails sent over one SMTP connection before it is closed
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', 50))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+# Seconds before the first retry; doubled after every further failure
+EMAIL_OUTBOX_RETRY_DELAY = int(os.environ.get('EMAIL_OUTBOX_RETRY_DELAY', 60))
+
+# Cache - per-process memory by default; production can point at Redis
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Survey results
+# Number of counter rows per tally bucket; more shards means less lock
+# contention between concurrent respondents on the same survey.
+RESULT_TALLY_SHARDS = int(os.environ.get('RESULT_TALLY_SHARDS', 8))
+
+# Seconds a live results stream ticket can be used to open the stream
+RESULTS_STREAM_TICKET_MAX_AGE = int(os.environ.get('RESULTS_STREAM_TICKET_MAX_AGE', 60))
+
+# Ballot storage for new surveys: 'rows' also writes one answer row per
+# choice, 'packed' keeps each ballot in a single survey_responses row.
+SURVEY_BALLOT_STORAGE = os.environ.get('SURVEY_BALLOT_STORAGE', 'rows')
+
 # URLs for email links
 FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
 BACKEND_URL = os.environ.get('BACKEND_URL', 'http://localhost:8000')
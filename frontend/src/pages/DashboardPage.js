@@ -172,6 +172,9 @@ const SurveyCard = ({ survey, isAuthor = false }) => {
   };
 
   const getStatusBadge = () => {
+    if (survey.has_responded) {
+      return <span className="badge bg-moss-50 text-moss-700">Responded</span>;
+    }
     if (survey.is_expired) {
       return <span className="badge bg-stone-100 text-stone-600">Expired</span>;
     }
@@ -7,6 +7,8 @@ const GroupDetailPage = () => {
   const navigate = useNavigate();
 
   const [group, setGroup] = useState(null);
+  const [members, setMembers] = useState([]);
+  const [membersNext, setMembersNext] = useState(null);
   const [loading, setLoading] = useState(true);
   const [addMemberEmail, setAddMemberEmail] = useState('');
   const [addMemberUsername, setAddMemberUsername] = useState('');
@@ -22,8 +24,13 @@ const GroupDetailPage = () => {
 
   const loadGroup = async () => {
     try {
-      const response = await groupsAPI.getById(id);
+      const [response, membersRes] = await Promise.all([
+        groupsAPI.getById(id),
+        groupsAPI.getMembers(id),
+      ]);
       setGroup(response.data);
+      setMembers(membersRes.data.results);
+      setMembersNext(membersRes.data.next);
       setEditData({
         name: response.data.name,
         description: response.data.description || '',
@@ -35,6 +42,16 @@ const GroupDetailPage = () => {
     setLoading(false);
   };
 
+  const loadMoreMembers = async () => {
+    try {
+      const response = await groupsAPI.getPage(membersNext);
+      setMembers((prev) => [...prev, ...response.data.results]);
+      setMembersNext(response.data.next);
+    } catch (error) {
+      console.error('Failed to load members:', error);
+    }
+  };
+
   const handleAddMember = async (e) => {
     e.preventDefault();
     setAddingMember(true);
@@ -257,9 +274,9 @@ const GroupDetailPage = () => {
           Members ({group.member_count})
         </h2>
 
-        {group.members && group.members.length > 0 ? (
+        {members.length > 0 ? (
           <div className="space-y-3">
-            {group.members.map((member) => (
+            {members.map((member) => (
               <div
                 key={member.id}
                 className="flex items-center justify-between p-3 bg-stone-50 rounded-xl"
@@ -326,6 +343,14 @@ const GroupDetailPage = () => {
                 </div>
               </div>
             ))}
+            {membersNext && (
+              <button
+                onClick={loadMoreMembers}
+                className="w-full text-moss-600 text-sm hover:text-moss-700 py-2"
+              >
+                Load more members
+              </button>
+            )}
           </div>
         ) : (
           <p className="text-stone-500 text-center py-4">
@@ -11,6 +11,7 @@ const SurveyDetailPage = () => {
   const [survey, setSurvey] = useState(null);
   const [results, setResults] = useState(null);
   const [responses, setResponses] = useState(null);
+  const [responsesNext, setResponsesNext] = useState(null);
   const [loading, setLoading] = useState(true);
   const [showResponses, setShowResponses] = useState(false);
   const [deleteConfirm, setDeleteConfirm] = useState(false);
@@ -39,7 +40,8 @@ const SurveyDetailPage = () => {
     if (!survey.is_anonymous) {
       try {
         const response = await surveysAPI.getResponses(id);
-        setResponses(response.data);
+        setResponses(response.data.results);
+        setResponsesNext(response.data.next);
       } catch (error) {
         console.error('Failed to load responses:', error);
       }
@@ -47,6 +49,30 @@ const SurveyDetailPage = () => {
     setShowResponses(true);
   };
 
+  const loadMoreResponses = async () => {
+    try {
+      const response = await surveysAPI.getPage(responsesNext);
+      setResponses((prev) => [...prev, ...response.data.results]);
+      setResponsesNext(response.data.next);
+    } catch (error) {
+      console.error('Failed to load responses:', error);
+    }
+  };
+
+  const downloadExport = async (request, filename) => {
+    try {
+      const response = await request();
+      const url = URL.createObjectURL(response.data);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = filename;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (error) {
+      console.error('Failed to export:', error);
+    }
+  };
+
   const toggleResultsVisibility = async () => {
     try {
       const response = await surveysAPI.toggleResultsVisibility(id);
@@ -208,12 +234,22 @@ const SurveyDetailPage = () => {
             <h2 className="font-display text-lg font-semibold text-stone-800">
               Results
             </h2>
-            <Link
-              to={`/surveys/${id}/results`}
-              className="text-moss-600 text-sm hover:text-moss-700"
-            >
-              View Full Results
-            </Link>
+            <div className="flex items-center gap-4">
+              {canEdit && (
+                <button
+                  onClick={() => downloadExport(() => surveysAPI.exportBallots(id), `survey-${id}.csv`)}
+                  className="text-moss-600 text-sm hover:text-moss-700"
+                >
+                  Download CSV
+                </button>
+              )}
+              <Link
+                to={`/surveys/${id}/results`}
+                className="text-moss-600 text-sm hover:text-moss-700"
+              >
+                View Full Results
+              </Link>
+            </div>
           </div>
 
           {results.total_responses > 0 ? (
@@ -247,14 +283,22 @@ const SurveyDetailPage = () => {
             <h2 className="font-display text-lg font-semibold text-stone-800">
               Individual Responses
             </h2>
-            {!showResponses && (
+            <div className="flex items-center gap-4">
               <button
-                onClick={loadResponses}
+                onClick={() => downloadExport(() => surveysAPI.exportResponses(id), `responses-${id}.json`)}
                 className="text-moss-600 text-sm hover:text-moss-700"
               >
-                View Responses
+                Export JSON
               </button>
-            )}
+              {!showResponses && (
+                <button
+                  onClick={loadResponses}
+                  className="text-moss-600 text-sm hover:text-moss-700"
+                >
+                  View Responses
+                </button>
+              )}
+            </div>
           </div>
 
           {showResponses && responses ? (
@@ -291,6 +335,14 @@ const SurveyDetailPage = () => {
                     )}
                   </div>
                 ))}
+                {responsesNext && (
+                  <button
+                    onClick={loadMoreResponses}
+                    className="w-full text-moss-600 text-sm hover:text-moss-700 py-2"
+                  >
+                    Load more responses
+                  </button>
+                )}
               </div>
             ) : (
               <p className="text-stone-500 text-center py-4">
@@ -23,6 +23,24 @@ const SurveyListPage = () => {
     setLoading(false);
   };
 
+  // Each list pages on its own: its next link returns only that list
+  const loadMore = async (list) => {
+    try {
+      const response = await surveysAPI.getPage(surveys[`${list}_next`]);
+      setSurveys((prev) => ({
+        ...prev,
+        [list]: [...prev[list], ...response.data[list]],
+        [`${list}_next`]: response.data[`${list}_next`],
+      }));
+    } catch (error) {
+      console.error('Failed to load surveys:', error);
+    }
+  };
+
+  const moreLists = ['authored', 'invited'].filter(
+    (list) => (filter === 'all' || filter === list) && surveys[`${list}_next`]
+  );
+
   const handleFilterChange = (newFilter) => {
     setFilter(newFilter);
     setSearchParams(newFilter !== 'all' ? { type: newFilter } : {});
@@ -105,6 +123,15 @@ const SurveyListPage = () => {
           {displaySurveys.map((survey) => (
             <SurveyCard key={survey.id} survey={survey} />
           ))}
+          {moreLists.map((list) => (
+            <button
+              key={list}
+              onClick={() => loadMore(list)}
+              className="text-moss-600 text-sm hover:text-moss-700 py-2"
+            >
+              {list === 'authored' ? 'Load more created surveys' : 'Load more invited surveys'}
+            </button>
+          ))}
         </div>
       ) : (
         <div className="card p-12 text-center">
@@ -139,6 +166,9 @@ const SurveyCard = ({ survey }) => {
   };
 
   const getStatusBadge = () => {
+    if (survey.has_responded) {
+      return <span className="badge bg-moss-50 text-moss-700">Responded</span>;
+    }
     if (survey.is_expired) {
       return <span className="badge bg-stone-100 text-stone-600">Expired</span>;
     }
@@ -16,6 +16,39 @@ const SurveyResultsPage = () => {
     loadResults();
   }, [id]);
 
+  // Live updates: the server pushes a new snapshot whenever a response lands
+  useEffect(() => {
+    let source = null;
+    let stopped = false;
+
+    const open = async () => {
+      try {
+        source = await surveysAPI.streamResults(id);
+      } catch (error) {
+        return;
+      }
+      if (stopped) {
+        source.close();
+        return;
+      }
+      source.addEventListener('results', (event) => {
+        setResults(JSON.parse(event.data));
+      });
+      // Reconnecting reuses the expired ticket, so fetch a new one instead
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED && !stopped) {
+          open();
+        }
+      };
+    };
+
+    open();
+    return () => {
+      stopped = true;
+      if (source) source.close();
+    };
+  }, [id]);
+
   const loadResults = async () => {
     try {
       const [surveyRes, resultsRes] = await Promise.all([
@@ -249,12 +282,11 @@ const ResultItem = ({ result, index, type, maxScore, totalResponses }) => {
       </div>
 
       {/* Distribution stats for 5 stones */}
-      {type === 'five_stones' && result.distribution && (
+      {type === 'five_stones' && result.histogram && (
         <div className="mt-2 flex gap-1 items-center">
           <span className="text-xs text-stone-400">Distribution:</span>
           <div className="flex gap-0.5">
-            {[0, 1, 2, 3, 4, 5].map((val) => {
-              const count = result.distribution.filter((d) => d === val).length;
+            {result.histogram.map((count, val) => {
               if (count === 0) return null;
               return (
                 <span
@@ -176,13 +176,13 @@ const SurveyTakePage = () => {
 
   const loadSurvey = async () => {
     try {
-      const response = await surveysAPI.getPublic(id, token);
-      const surveyData = response.data;
+      const response = await surveysAPI.bootstrap(id, token);
+      const surveyData = response.data.survey;
 
       setSurvey(surveyData);
-      setCanRespond(surveyData.can_respond);
+      setCanRespond(response.data.can_respond);
 
-      if (surveyData.has_responded) {
+      if (response.data.has_responded) {
         setSubmitted(true);
       }
 
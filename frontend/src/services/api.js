@@ -117,6 +117,10 @@ export const surveysAPI = {
   getPublic: (id, token) =>
     api.get(`/surveys/public/${id}/`, { params: { token } }),
 
+  // Survey, theme and response status in one request
+  bootstrap: (id, token) =>
+    api.get(`/surveys/public/${id}/bootstrap/`, { params: { token } }),
+
   create: (data) =>
     api.post('/surveys/', data),
 
@@ -132,9 +136,33 @@ export const surveysAPI = {
   getResults: (id) =>
     api.get(`/surveys/${id}/results/`),
 
+  // EventSource cannot send headers, so the stream is opened with a
+  // short-lived ticket for this survey instead of the access token
+  streamResults: async (id) => {
+    const { data } = await api.post(`/surveys/${id}/results_stream_ticket/`);
+    return new EventSource(
+      `${API_URL}/surveys/${id}/results/stream/?ticket=${encodeURIComponent(data.ticket)}`
+    );
+  },
+
   getResponses: (id) =>
     api.get(`/surveys/${id}/responses/`),
 
+  // Downloads are fetched as blobs so the token goes in the Authorization
+  // header, never in a URL that logs or browser history could keep
+
+  // Streamed JSON download of every individual response
+  exportResponses: (id) =>
+    api.get(`/surveys/${id}/responses/export/`, { responseType: 'blob' }),
+
+  // Streamed download of every ballot, one row each (format: csv or ndjson)
+  exportBallots: (id, format = 'csv') =>
+    api.get(`/surveys/${id}/export/`, { params: { format }, responseType: 'blob' }),
+
+  // Follow a `next` link from a cursor-paginated listing
+  getPage: (url) =>
+    api.get(url),
+
   toggleResultsVisibility: (id) =>
     api.post(`/surveys/${id}/toggle_results_visibility/`),
 
@@ -186,11 +214,25 @@ export const groupsAPI = {
   addMember: (id, data) =>
     api.post(`/groups/${id}/add_member/`, data),
 
+  getMembers: (id) =>
+    api.get(`/groups/${id}/members/`),
+
+  getPage: (url) =>
+    api.get(url),
+
   removeMember: (id, email) =>
     api.post(`/groups/${id}/remove_member/`, { email }),
 
   addMembersBulk: (id, emails) =>
     api.post(`/groups/${id}/add_members_bulk/`, { emails }),
+
+  importMembers: (id, file) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    return api.post(`/groups/${id}/import_members/`, formData, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    });
+  },
 };
 
 export default api;